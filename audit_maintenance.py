@@ -0,0 +1,83 @@
+# audit_maintenance.py
+"""
+Audit log maintenance.
+
+Converts audit_logs to monthly partitions the first time it runs (a one-off
+rewrite of the table under an exclusive lock, which the application never
+does on its own), makes sure the partitions exist ahead of time, then moves
+every month older than the retention window out of the database: each month is
+exported with COPY to a gzip file under the archive directory, checked row by
+row count, checksummed and listed in the archive manifest before its partition
+is detached and dropped. Archived months stay searchable from the Audit Logs
+dialog. Run it from cron or a scheduled task, e.g. once a month.
+
+Usage: python audit_maintenance.py [--retention-months 12] [--archive-dir DIR] [--dry-run] [--list]
+"""
+import argparse
+import sys
+
+from database.db_connector import DatabaseConnection
+from database.schema import AUDIT_LOGS_MIGRATION, apply_schema_updates
+from database.audit_partitions import archive_audit_partitions, get_audit_partitions, load_manifest
+from utils.audit import get_audit_config, get_archive_dir
+
+
+def list_audit_months(db, archive_dir):
+    """Print the months still in the database and the archived ones"""
+    print("Partitions in the database:")
+    for name, month in get_audit_partitions(db):
+        print(f"  {month:%Y-%m}  {name}")
+
+    print(f"\nArchived months ({archive_dir}):")
+    for entry in sorted(load_manifest(archive_dir), key=lambda e: e['month']):
+        print(f"  {entry['month']}  {entry['file']}  {entry['rows']} rows  sha256 {entry['sha256'][:12]}")
+
+
+def run_maintenance(retention_months, archive_dir, dry_run=False):
+    """Create upcoming partitions and archive the expired ones; returns True on success"""
+    db = DatabaseConnection()
+    try:
+        # Migrates audit_logs to partitions if needed and creates the months ahead
+        apply_schema_updates(db, () if dry_run else (AUDIT_LOGS_MIGRATION,))
+
+        archived = archive_audit_partitions(db, retention_months, archive_dir, dry_run)
+        if dry_run:
+            print(f"Would archive {len(archived)} month(s):")
+            for name in archived:
+                print(f"  {name}")
+        else:
+            print(f"Archived {len(archived)} month(s):")
+            for entry in archived:
+                print(f"  {entry['month']}: {entry['rows']} rows -> {entry['file']}")
+        return True
+    except Exception as e:
+        print(f"Audit maintenance error: {str(e)}")
+        return False
+    finally:
+        db.close_all_connections()
+
+
+if __name__ == "__main__":
+    config = get_audit_config()
+    parser = argparse.ArgumentParser(description="Archive audit log months older than the retention window")
+    parser.add_argument("--retention-months", type=int,
+                        default=config.getint('audit', 'retention_months', fallback=12),
+                        help="whole months before the current one kept in the database")
+    parser.add_argument("--archive-dir", default=get_archive_dir(), help="directory for the archive files")
+    parser.add_argument("--dry-run", action="store_true", help="only list the months that would be archived")
+    parser.add_argument("--list", action="store_true", help="list live partitions and archived months, then exit")
+    args = parser.parse_args()
+
+    print("Audit Log Maintenance")
+    print("=====================")
+    if args.list:
+        db = DatabaseConnection()
+        try:
+            list_audit_months(db, args.archive_dir)
+        finally:
+            db.close_all_connections()
+        sys.exit(0)
+
+    success = run_maintenance(args.retention_months, args.archive_dir, args.dry_run)
+    print(f"\nMaintenance {'successful' if success else 'failed'}!")
+    sys.exit(0 if success else 1)
@@ -0,0 +1,61 @@
+# check_sale_counters.py
+"""
+Consistency check for the item counters stored on sales.
+
+Checkout writes item_count, branded_count and generic_count on each sale so
+the sales listings don't have to group sale_items. This compares them with
+the sale_items actually recorded and lists the sales that drifted, e.g.
+after items were edited by hand. With --fix the drifted sales are recounted.
+
+Usage: python check_sale_counters.py [--limit 20] [--fix]
+"""
+import argparse
+import sys
+
+from database.db_connector import DatabaseConnection
+from database.models import SaleModel
+from database.schema import apply_schema_updates
+
+
+def check_counters(limit, fix=False):
+    """Report drifted sales; returns True when none are left"""
+    db = DatabaseConnection()
+    try:
+        # Adds and backfills the counters if this database doesn't have them yet
+        apply_schema_updates(db)
+        sale_model = SaleModel()
+
+        drift = sale_model.get_item_count_drift(limit)
+        if not drift:
+            print("All sale item counters match their sale_items")
+            return True
+
+        print(f"Sales with drifted counters (first {limit}):")
+        for sale_id, invoice, *counts in drift:
+            stored, actual = counts[:3], counts[3:]
+            print(f"  {invoice} (sale {sale_id}): stored items/branded/generic {stored}, actual {actual}")
+
+        if not fix:
+            return False
+
+        fixed = sale_model.repair_item_counts()
+        print(f"\nRecounted {fixed} sales")
+        return True
+    except Exception as e:
+        print(f"Counter check error: {str(e)}")
+        return False
+    finally:
+        db.close_all_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the item counters stored on sales against sale_items")
+    parser.add_argument("--limit", type=int, default=20, help="drifted sales to list")
+    parser.add_argument("--fix", action="store_true", help="recount every drifted sale")
+    args = parser.parse_args()
+
+    print("Sale Item Counter Check")
+    print("=======================")
+    success = check_counters(args.limit, args.fix)
+    print(f"\nCheck {'passed' if success else 'FAILED'}!")
+    sys.exit(0 if success else 1)
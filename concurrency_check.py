@@ -0,0 +1,210 @@
+# concurrency_check.py
+"""
+Concurrency check for voids running alongside sales.
+
+Creates scratch products, records a batch of sales of all of them, then
+voids every one of those sales twice from several threads while other
+threads keep selling the same products. Carts list the products in varying
+order, so a void and a sale that lock shared products in different orders
+deadlock and show up as errors. When everything has finished, each product's
+stock must equal the starting stock minus the concurrent sales. A lost
+update on either side, or a sale restored twice, shows up as a mismatch.
+
+The check never writes to the configured database. It runs against a scratch
+copy (CREATE DATABASE ... TEMPLATE), so the schema updates, sales, items,
+sale keys, invoice counters, rollup deltas and audit rows it produces all go
+with the copy, which is dropped at the end. Copying needs every other session
+on the configured database closed, including the application's.
+
+Usage: python concurrency_check.py [--sales 50] [--threads 8] [--concurrent-sales 200] [--products 3]
+"""
+import argparse
+import threading
+import uuid
+
+import psycopg2
+
+from psycopg2 import sql
+
+from db_helper import get_db_config
+from database.db_connector import DatabaseConnection
+from database.models import SaleModel
+from database.schema import apply_schema_updates
+
+INITIAL_STOCK = 100000
+
+
+def create_scratch_database(db_config, run_id):
+    """Copy the configured database into a scratch one and return its name"""
+    scratch = f"{db_config['database']}_check_{run_id}"
+    # CREATE DATABASE can't run in a transaction, nor while connected to the template
+    admin = psycopg2.connect(**dict(db_config, database='postgres'))
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(sql.SQL("CREATE DATABASE {} TEMPLATE {}").format(
+                sql.Identifier(scratch), sql.Identifier(db_config['database'])
+            ))
+    finally:
+        admin.close()
+    return scratch
+
+
+def drop_scratch_database(db_config, scratch):
+    """Drop the scratch copy and with it every row the check wrote"""
+    DatabaseConnection().close_all_connections()
+    admin = psycopg2.connect(**dict(db_config, database='postgres'))
+    admin.autocommit = True
+    try:
+        with admin.cursor() as cursor:
+            cursor.execute(sql.SQL("DROP DATABASE IF EXISTS {} WITH (FORCE)").format(sql.Identifier(scratch)))
+    finally:
+        admin.close()
+
+
+def get_check_user(cursor):
+    """Pick an existing active user to own the scratch sales"""
+    cursor.execute("SELECT user_id FROM users WHERE is_active = TRUE ORDER BY user_id LIMIT 1")
+    row = cursor.fetchone()
+    if not row:
+        raise RuntimeError("No active user found; create one before running the check")
+    return row[0]
+
+
+def create_products(cursor, run_id, count):
+    """Create the scratch products the check sells and voids against"""
+    product_ids = []
+    for i in range(count):
+        cursor.execute("""
+            INSERT INTO products (product_name, description, unit_price, cost_price, stock_quantity, reorder_level)
+            VALUES (%s, %s, 1, 1, %s, 0)
+            RETURNING product_id
+        """, (f"Concurrency check {run_id} #{i + 1}", "Created by concurrency_check.py", INITIAL_STOCK))
+        product_ids.append(cursor.fetchone()[0])
+    return product_ids
+
+
+def sell(sale_model, user_id, product_ids, quantity, run_id):
+    """Record one sale of every product, in the given cart order, through the POS checkout path"""
+    sale_id, invoice_number = sale_model.checkout(
+        user_id,
+        [{'product_id': product_id, 'quantity': quantity, 'unit_price': 1, 'subtotal': quantity}
+         for product_id in product_ids],
+        "Cash",
+        notes=f"concurrency check {run_id}"
+    )
+    return sale_id
+
+
+def run_check(sale_count, thread_count, concurrent_sales, product_count):
+    """Run the check and return True when no stock update was lost"""
+    db_config = get_db_config()
+    run_id = uuid.uuid4().hex[:6]
+    scratch = create_scratch_database(db_config, run_id)
+    print(f"Running against scratch database {scratch}")
+    DatabaseConnection.database_override = scratch
+    conn = psycopg2.connect(**dict(db_config, database=scratch))
+    cursor = conn.cursor()
+    errors = []
+
+    try:
+        # The void relies on the status columns added by the schema updates
+        apply_schema_updates(DatabaseConnection())
+
+        user_id = get_check_user(cursor)
+        product_ids = create_products(cursor, run_id, product_count)
+        conn.commit()
+
+        sale_model = SaleModel()
+
+        # Sales that will be voided; quantities vary so a missed line is visible,
+        # and every other cart lists the products backwards
+        sale_ids = []
+        for i in range(sale_count):
+            cart = product_ids if i % 2 == 0 else product_ids[::-1]
+            sale_ids.append(sell(sale_model, user_id, cart, 1 + i % 3, run_id))
+        sold_then_voided = sum(1 + i % 3 for i in range(sale_count))
+        print(f"Recorded {sale_count} sales ({sold_then_voided} units) to void")
+
+        void_results = []
+        results_lock = threading.Lock()
+
+        def void_worker(worker_ids):
+            for sale_id in worker_ids:
+                try:
+                    invoice = sale_model.void_sale(sale_id, user_id)
+                    with results_lock:
+                        void_results.append((sale_id, invoice))
+                except Exception as e:
+                    errors.append(f"void {sale_id}: {e}")
+
+        def sell_worker(worker_index, count):
+            try:
+                for i in range(count):
+                    cart = product_ids if (worker_index + i) % 2 == 0 else product_ids[::-1]
+                    sell(sale_model, user_id, cart, 1, run_id)
+            except Exception as e:
+                errors.append(f"sell worker {worker_index}: {e}")
+
+        # Every sale is voided by two different threads to exercise the status guard
+        void_threads = max(thread_count // 2, 1)
+        sell_threads = max(thread_count - void_threads, 1)
+        doubled = sale_ids + sale_ids[::-1]
+        threads = [
+            threading.Thread(target=void_worker, args=(doubled[i::void_threads],))
+            for i in range(void_threads)
+        ]
+        per_seller = concurrent_sales // sell_threads
+        threads += [
+            threading.Thread(target=sell_worker, args=(i, per_seller))
+            for i in range(sell_threads)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        successful_voids = [sale_id for sale_id, invoice in void_results if invoice]
+        expected_stock = INITIAL_STOCK - per_seller * sell_threads
+
+        cursor.execute(
+            "SELECT stock_quantity FROM products WHERE product_id = ANY(%s) ORDER BY product_id",
+            (product_ids,)
+        )
+        final_stocks = [row[0] for row in cursor.fetchall()]
+        cursor.execute("""
+            SELECT COUNT(*) FROM audit_logs
+            WHERE action_type = 'void' AND table_affected = 'sales' AND record_id = ANY(%s)
+        """, (sale_ids,))
+        void_audits = cursor.fetchone()[0]
+        conn.commit()
+
+        print(f"Void attempts: {len(doubled)}, successful: {len(successful_voids)} (expected {sale_count})")
+        print(f"Void audit rows: {void_audits} (expected {sale_count})")
+        print(f"Final stock: {', '.join(map(str, final_stocks))} (expected {expected_stock} each)")
+        for error in errors:
+            print(f"Error: {error}")
+
+        return (not errors
+                and len(successful_voids) == sale_count
+                and len(set(successful_voids)) == sale_count
+                and void_audits == sale_count
+                and final_stocks == [expected_stock] * len(product_ids))
+    finally:
+        cursor.close()
+        conn.close()
+        drop_scratch_database(db_config, scratch)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check that voids and concurrent sales never lose stock updates")
+    parser.add_argument("--sales", type=int, default=50, help="sales to record and then void")
+    parser.add_argument("--threads", type=int, default=8, help="worker threads (half void, half sell); all share the app's connection pool")
+    parser.add_argument("--concurrent-sales", type=int, default=200, help="sales made while voiding")
+    parser.add_argument("--products", type=int, default=3, help="scratch products in every sale")
+    args = parser.parse_args()
+
+    print("Void Concurrency Check")
+    print("======================")
+    success = run_check(args.sales, args.threads, args.concurrent_sales, args.products)
+    print(f"\nCheck {'passed' if success else 'FAILED'}!")
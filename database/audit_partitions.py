@@ -0,0 +1,350 @@
+"""
+Monthly range partitioning and archival of audit_logs.
+
+audit_logs is partitioned by month on timestamp (audit_logs_y2025m01, ...)
+with a default partition as a safety net. Partitions are created a year
+ahead at every start. Months older than the retention window can be
+archived: the month is exported with COPY to a gzip'd CSV, read back and
+checksummed, recorded in the archive manifest, and only then detached and
+dropped. Archived months stay searchable through read_audit_archive.
+"""
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+from datetime import date, datetime
+
+DEFAULT_PARTITION = "audit_logs_default"
+PARTITION_PATTERN = re.compile(r"^audit_logs_y(\d{4})m(\d{2})$")
+MANIFEST_FILE = "manifest.json"
+
+# Archived rows carry the user's name, since the user may be gone by the time they are read
+ARCHIVE_QUERY = """
+    COPY (
+        SELECT l.log_id, l.timestamp, l.user_id, l.action_type, l.table_affected,
+               l.record_id, l.action_details, l.ip_address, u.username, u.full_name
+        FROM {partition} l
+        LEFT JOIN users u ON u.user_id = l.user_id
+        ORDER BY l.timestamp, l.log_id
+    ) TO STDOUT WITH (FORMAT csv, HEADER)
+"""
+
+
+def month_start(day):
+    return date(day.year, day.month, 1)
+
+
+def add_months(month, months):
+    index = month.month - 1 + months
+    return date(month.year + index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"audit_logs_y{month.year}m{month.month:02d}"
+
+
+def is_partitioned(cursor):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = 'audit_logs'::regclass")
+    return cursor.fetchone()[0] == 'p'
+
+
+def create_month_partition(cursor, month):
+    """
+    Create the partition for one month if it doesn't exist
+
+    Rows the default partition caught for that month are moved into it, since
+    PostgreSQL refuses a new partition whose range has rows in the default.
+
+    Returns:
+    - bool: True if the partition was created
+    """
+    name = partition_name(month)
+    cursor.execute("SELECT to_regclass(%s)", (name,))
+    if cursor.fetchone()[0]:
+        return False
+
+    bounds = (month.isoformat(), add_months(month, 1).isoformat())
+    cursor.execute(
+        f"SELECT COUNT(*) FROM {DEFAULT_PARTITION} WHERE timestamp >= %s AND timestamp < %s", bounds
+    )
+    stray_rows = cursor.fetchone()[0]
+
+    if stray_rows:
+        cursor.execute(f"ALTER TABLE audit_logs DETACH PARTITION {DEFAULT_PARTITION}")
+    cursor.execute(f"CREATE TABLE {name} PARTITION OF audit_logs FOR VALUES FROM (%s) TO (%s)", bounds)
+    if stray_rows:
+        cursor.execute(
+            f"INSERT INTO {name} SELECT * FROM {DEFAULT_PARTITION} WHERE timestamp >= %s AND timestamp < %s",
+            bounds
+        )
+        cursor.execute(f"DELETE FROM {DEFAULT_PARTITION} WHERE timestamp >= %s AND timestamp < %s", bounds)
+        cursor.execute(f"ALTER TABLE audit_logs ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT")
+        logging.info(f"Moved {stray_rows} audit rows from the default partition to {name}")
+    return True
+
+
+def ensure_audit_partitions(db, months_ahead=12):
+    """Create the monthly partitions from this month to `months_ahead` months from now"""
+    with db.transaction() as cursor:
+        if not is_partitioned(cursor):
+            return
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF audit_logs DEFAULT")
+        this_month = month_start(date.today())
+        for offset in range(months_ahead + 1):
+            create_month_partition(cursor, add_months(this_month, offset))
+
+
+def migrate_audit_logs(db):
+    """
+    Convert a plain audit_logs table into a monthly partitioned one
+
+    Rewrites the whole table under an ACCESS EXCLUSIVE lock, so it is one of
+    the schema MIGRATIONS run by audit_maintenance.py, never at startup.
+    Runs in one transaction: the new partitioned table is created next to the
+    old one, every month from the oldest entry onwards gets a partition, the
+    rows are copied, log_id keeps using the same sequence and the old table
+    is dropped. Does nothing once audit_logs is partitioned.
+    """
+    with db.transaction() as cursor:
+        if is_partitioned(cursor):
+            return
+
+        cursor.execute("LOCK TABLE audit_logs IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("SELECT pg_get_serial_sequence('audit_logs', 'log_id')")
+        sequence = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(timestamp)::date, COUNT(*) FROM audit_logs")
+        oldest, row_count = cursor.fetchone()
+
+        cursor.execute("ALTER TABLE audit_logs RENAME TO audit_logs_unpartitioned")
+        cursor.execute("""
+            CREATE TABLE audit_logs (
+                log_id INTEGER NOT NULL,
+                user_id INTEGER REFERENCES users(user_id),
+                action_type VARCHAR(50) NOT NULL,
+                table_affected VARCHAR(50),
+                record_id INTEGER,
+                action_details TEXT,
+                ip_address VARCHAR(50),
+                timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (log_id, timestamp)
+            ) PARTITION BY RANGE (timestamp)
+        """)
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF audit_logs DEFAULT")
+
+        month = month_start(oldest or date.today())
+        last_month = add_months(month_start(date.today()), 12)
+        while month <= last_month:
+            create_month_partition(cursor, month)
+            month = add_months(month, 1)
+
+        cursor.execute("""
+            INSERT INTO audit_logs
+            (log_id, user_id, action_type, table_affected, record_id, action_details, ip_address, timestamp)
+            SELECT log_id, user_id, action_type, table_affected, record_id, action_details, ip_address,
+                   COALESCE(timestamp, CURRENT_TIMESTAMP)
+            FROM audit_logs_unpartitioned
+        """)
+
+        if sequence:
+            cursor.execute(f"ALTER TABLE audit_logs ALTER COLUMN log_id SET DEFAULT nextval('{sequence}')")
+            # Move ownership first, or dropping the old table would drop the sequence too
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY audit_logs.log_id")
+
+        cursor.execute("DROP TABLE audit_logs_unpartitioned")
+
+    logging.info(f"audit_logs converted to monthly partitions ({row_count} rows moved)")
+
+
+def get_audit_partitions(db):
+    """
+    Get the monthly partitions currently attached to audit_logs
+
+    Returns:
+    - list: (partition name, first day of the month), oldest first
+    """
+    rows = db.execute_query("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = 'audit_logs'::regclass
+    """, fetchall=True)
+
+    partitions = []
+    for (name,) in rows:
+        match = PARTITION_PATTERN.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    partitions.sort(key=lambda partition: partition[1])
+    return partitions
+
+
+def parse_timestamp(text):
+    """Parse a timestamp as COPY writes it, with 0 to 6 fractional digits"""
+    whole, _, fraction = text.partition('.')
+    value = datetime.strptime(whole, "%Y-%m-%d %H:%M:%S")
+    if fraction:
+        value = value.replace(microsecond=int(fraction[:6].ljust(6, '0')))
+    return value
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(archive_dir):
+    path = os.path.join(archive_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_manifest(archive_dir, entries):
+    path = os.path.join(archive_dir, MANIFEST_FILE)
+    temp_path = path + ".tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(entries, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+
+
+def archive_partition(db, name, month, archive_dir):
+    """
+    Export one month to a compressed, checksummed file, then drop it
+
+    The partition is only detached and dropped after the file has been read
+    back with the expected row count and recorded in the manifest.
+
+    Returns:
+    - dict: the manifest entry of the archive
+    """
+    file_name = f"{name}.csv.gz"
+    path = os.path.join(archive_dir, file_name)
+    temp_path = path + ".part"
+
+    connection = db.get_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {name}")
+            expected_rows = cursor.fetchone()[0]
+            # The raw file stays open after gzip's trailer is written, so it can be fsync'd
+            # through a writable handle (fsync on a read-only one fails on Windows)
+            with open(temp_path, 'wb') as raw:
+                with gzip.open(raw, 'wt', encoding='utf-8', newline='') as f:
+                    cursor.copy_expert(ARCHIVE_QUERY.format(partition=name), f)
+                raw.flush()
+                os.fsync(raw.fileno())
+        connection.rollback()
+    finally:
+        db.release_connection(connection)
+
+    with gzip.open(temp_path, 'rt', encoding='utf-8', newline='') as f:
+        archived_rows = sum(1 for _ in csv.reader(f)) - 1
+    if archived_rows != expected_rows:
+        os.remove(temp_path)
+        raise RuntimeError(f"{name}: archived {archived_rows} rows, expected {expected_rows}")
+
+    os.replace(temp_path, path)
+    checksum = file_sha256(path)
+    with open(path + ".sha256", 'w', encoding='utf-8') as f:
+        f.write(f"{checksum}  {file_name}\n")
+
+    entry = {
+        'month': month.strftime("%Y-%m"),
+        'file': file_name,
+        'rows': expected_rows,
+        'sha256': checksum,
+        'archived_at': datetime.now().isoformat(timespec='seconds')
+    }
+    manifest = [e for e in load_manifest(archive_dir) if e['month'] != entry['month']]
+    manifest.append(entry)
+    manifest.sort(key=lambda e: e['month'])
+    save_manifest(archive_dir, manifest)
+
+    with db.transaction() as cursor:
+        cursor.execute(f"ALTER TABLE audit_logs DETACH PARTITION {name}")
+        cursor.execute(f"DROP TABLE {name}")
+
+    logging.info(f"Archived {name} ({expected_rows} rows) to {path}")
+    return entry
+
+
+def archive_audit_partitions(db, retention_months, archive_dir, dry_run=False):
+    """
+    Archive every month older than the retention window
+
+    Parameters:
+    - retention_months: Number of whole months before this one to keep in the database
+    - archive_dir: Directory receiving the archive files and manifest
+    - dry_run: Only report which partitions would be archived
+
+    Returns:
+    - list: manifest entries (or partition names for a dry run)
+    """
+    cutoff = add_months(month_start(date.today()), -retention_months)
+    due = [(name, month) for name, month in get_audit_partitions(db) if month < cutoff]
+    if dry_run:
+        return [name for name, month in due]
+
+    if not os.path.exists(archive_dir):
+        os.makedirs(archive_dir)
+    return [archive_partition(db, name, month, archive_dir) for name, month in due]
+
+
+def read_audit_archive(archive_dir, month, filters=None):
+    """
+    Read the archived audit logs of one month, newest first
+
+    The file is checked against its manifest checksum before it is read.
+
+    Parameters:
+    - month: 'YYYY-MM' as listed in the manifest
+    - filters: Optional user_id, action_type, table_affected and search filters
+
+    Returns:
+    - list: rows shaped like AuditTrail.get_audit_logs results
+    """
+    entry = next((e for e in load_manifest(archive_dir) if e['month'] == month), None)
+    if entry is None:
+        raise FileNotFoundError(f"No audit archive for {month}")
+
+    path = os.path.join(archive_dir, entry['file'])
+    if file_sha256(path) != entry['sha256']:
+        raise ValueError(f"Audit archive {entry['file']} does not match its checksum")
+
+    filters = filters or {}
+    search = (filters.get('search') or "").lower()
+    rows = []
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+        for record in csv.DictReader(f):
+            user_id = int(record['user_id']) if record['user_id'] else None
+            if filters.get('user_id') and user_id != filters['user_id']:
+                continue
+            if filters.get('action_type') and record['action_type'] != filters['action_type']:
+                continue
+            if filters.get('table_affected') and record['table_affected'] != filters['table_affected']:
+                continue
+            if search and search not in record['action_details'].lower():
+                continue
+            rows.append((
+                int(record['log_id']),
+                parse_timestamp(record['timestamp']),
+                record['action_type'],
+                record['table_affected'] or None,
+                int(record['record_id']) if record['record_id'] else None,
+                record['action_details'] or None,
+                record['ip_address'] or None,
+                record['username'] or "",
+                record['full_name'] or ""
+            ))
+
+    rows.reverse()
+    return rows
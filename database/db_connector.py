@@ -3,12 +3,16 @@ from psycopg2 import pool
 import os
 import logging
 from configparser import ConfigParser
+from contextlib import contextmanager
 
 class DatabaseConnection:
     """Singleton class to manage database connections using connection pooling"""
     
     _instance = None
     _connection_pool = None
+    # Database to use instead of the one in config.ini; set before the first
+    # connection by checks that run against a scratch copy
+    database_override = None
     
     def __new__(cls):
         if cls._instance is None:
@@ -26,15 +30,21 @@ class DatabaseConnection:
             # Get database configuration
             db_config = {
                 'host': config.get('database', 'host', fallback='localhost'),
-                'database': config.get('database', 'database', fallback='pharmacy_db'),
+                'database': self.database_override or config.get('database', 'database', fallback='pharmacy_db'),
                 'user': config.get('database', 'user', fallback='postgres'),
                 'password': config.get('database', 'password', fallback='your_new_password'),  # Change this to a secure password
                 'port': config.get('database', 'port', fallback='5432')
             }
             
+            self.db_config = db_config
+            
             min_connections = config.getint('database', 'min_connections', fallback=1)
             max_connections = config.getint('database', 'max_connections', fallback=10)
             
+            # Checkout is idempotent, so it can run with a short timeout and be retried
+            self.checkout_timeout_ms = config.getint('database', 'checkout_timeout_ms', fallback=5000)
+            self.checkout_attempts = config.getint('database', 'checkout_attempts', fallback=3)
+            
             # Create connection pool
             self._connection_pool = pool.ThreadedConnectionPool(
                 min_connections,
@@ -58,6 +68,10 @@ class DatabaseConnection:
         self.ensure_connection_pool()
         return self._connection_pool.getconn()
     
+    def create_connection(self):
+        """Open a connection outside the pool, for sessions held open such as LISTEN"""
+        return psycopg2.connect(**self.db_config)
+    
     def release_connection(self, connection):
         """Return a connection to the pool"""
         self.ensure_connection_pool()
@@ -70,8 +84,42 @@ class DatabaseConnection:
             self._connection_pool = None
             logging.info("All database connections closed")
     
-    def execute_query(self, query, params=None, fetchone=False, fetchall=False):
-        """Execute a query and return the result"""
+    @contextmanager
+    def transaction(self, statement_timeout_ms=None):
+        """
+        Run several statements in one transaction on a pooled connection
+        
+        Yields a cursor; commits when the block finishes and rolls back if it raises.
+        With statement_timeout_ms, any statement in the block running longer
+        than that is cancelled by the server.
+        """
+        connection = self.get_connection()
+        cursor = connection.cursor()
+        try:
+            if statement_timeout_ms:
+                self.set_statement_timeout(cursor, statement_timeout_ms)
+            yield cursor
+            connection.commit()
+        except Exception:
+            # A dropped link leaves nothing to roll back; the pool discards closed connections
+            if not connection.closed:
+                connection.rollback()
+            raise
+        finally:
+            cursor.close()
+            self.release_connection(connection)
+    
+    def set_statement_timeout(self, cursor, statement_timeout_ms):
+        """Cancel any statement of the cursor's current transaction running longer than this"""
+        cursor.execute("SET LOCAL statement_timeout = %s", (int(statement_timeout_ms),))
+    
+    def execute_query(self, query, params=None, fetchone=False, fetchall=False, commit=False):
+        """
+        Execute a query and return the result
+        
+        Statements without a fetch are always committed; pass commit=True to
+        also commit a fetching statement such as INSERT ... RETURNING.
+        """
         self.ensure_connection_pool()
         connection = None
         cursor = None
@@ -83,8 +131,12 @@ class DatabaseConnection:
             result = None
             if fetchone:
                 result = cursor.fetchone()
+                if commit:
+                    connection.commit()
             elif fetchall:
                 result = cursor.fetchall()
+                if commit:
+                    connection.commit()
             else:
                 # IMPORTANT: Make sure to commit changes for INSERT, UPDATE, DELETE
                 connection.commit()
@@ -1,6 +1,29 @@
 from database.db_connector import DatabaseConnection
+from database.sales_partitions import sale_date_range
+from database.schema import SALE_ITEM_COUNTS
+from database.report_cache import INVALIDATION_CHANNEL, notify_sales_changed, sales_changed
+from database.sales_summary import chart_bucket
+from database.stock_alerts import EXPIRY_WINDOW_DAYS
 import logging
-from datetime import datetime, date
+import psycopg2
+import psycopg2.errors
+import psycopg2.extras
+import time
+from datetime import datetime, date, timedelta
+
+
+class InsufficientStockError(Exception):
+    """Raised when checkout cannot take the requested quantity of some products"""
+    
+    def __init__(self, failed_lines):
+        # Each line: {'product_id', 'requested', 'available'}
+        self.failed_lines = failed_lines
+        details = ", ".join(
+            f"product {line['product_id']}: requested {line['requested']}, available {line['available']}"
+            for line in failed_lines
+        )
+        super().__init__(f"Insufficient stock ({details})")
+
 
 class BaseModel:
     """Base model class for database operations"""
@@ -19,11 +42,140 @@ class BaseModel:
         else:
             escaped_value = str(value).replace("'", "''")
             return f"'{escaped_value}'"
+    
+    def _escape_like(self, value):
+        """Escape LIKE wildcards so user input is matched literally"""
+        return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
 
 
 class ProductModel(BaseModel):
     """Model for product-related database operations"""
     
+    EXPIRING_SOON_DAYS = EXPIRY_WINDOW_DAYS
+    # In the order they take precedence: an inactive product out of stock is 'Inactive'
+    INVENTORY_STATUSES = ("Inactive", "Out of Stock", "Low Stock", "Expired", "Expiring Soon", "OK")
+    
+    def inventory_query(self, filters=None, count_statuses=False):
+        """
+        Build the inventory query shared by the inventory report and the products list
+        
+        Each product comes with its days to expiry and its status, both worked
+        out by the server against CURRENT_DATE, so the status filters run
+        there and only matching rows are sent back.
+        
+        Parameters:
+        - filters: Optional dict with
+          - category_id: Category to list
+          - is_generic: True for generic, False for branded, None for both
+          - active: True for active products only, False for inactive only, None for both
+          - stock: 'out', 'low' (at or below the reorder level) or 'in' (above it)
+          - expiry: 'expired', 'soon' (within EXPIRING_SOON_DAYS) or 'valid' (not expired)
+        - count_statuses: Build the per-status count query instead; it
+          ignores the stock and expiry filters
+        
+        Returns:
+        - tuple: (SQL query, list of parameters). The rows are product_id,
+          product_name, description, is_generic, unit_measurement,
+          category_name, unit_price, cost_price, stock_quantity,
+          reorder_level, expiry_date, is_active, days_to_expiry, status
+        """
+        filters = filters or {}
+        conditions, params = ["TRUE"], []
+        
+        if filters.get('category_id') is not None:
+            conditions.append("category_id = %s")
+            params.append(filters['category_id'])
+        if filters.get('is_generic') is not None:
+            conditions.append("is_generic = %s")
+            params.append(filters['is_generic'])
+        if filters.get('active') is not None:
+            conditions.append("is_active = %s")
+            params.append(filters['active'])
+        
+        if not count_statuses:
+            stock = filters.get('stock')
+            if stock == "out":
+                conditions.append("stock_quantity <= 0")
+            elif stock == "low":
+                conditions.append("stock_quantity > 0 AND stock_quantity <= reorder_level")
+            elif stock == "in":
+                conditions.append("stock_quantity > reorder_level")
+            
+            expiry = filters.get('expiry')
+            if expiry == "expired":
+                conditions.append("days_to_expiry < 0")
+            elif expiry == "soon":
+                conditions.append("days_to_expiry BETWEEN 0 AND %s")
+                params.append(self.EXPIRING_SOON_DAYS)
+            elif expiry == "valid":
+                conditions.append("days_to_expiry >= 0")
+        
+        inventory = """
+            SELECT p.product_id, p.product_name, p.description, COALESCE(p.is_generic, FALSE) AS is_generic,
+                   p.unit_measurement, c.name AS category_name, p.category_id, p.unit_price, p.cost_price,
+                   p.stock_quantity, p.reorder_level, p.expiry_date, p.is_active,
+                   p.expiry_date - CURRENT_DATE AS days_to_expiry,
+                   CASE
+                       WHEN NOT p.is_active THEN 'Inactive'
+                       WHEN p.stock_quantity <= 0 THEN 'Out of Stock'
+                       WHEN p.stock_quantity <= p.reorder_level THEN 'Low Stock'
+                       WHEN p.expiry_date < CURRENT_DATE THEN 'Expired'
+                       WHEN p.expiry_date <= CURRENT_DATE + %s THEN 'Expiring Soon'
+                       ELSE 'OK'
+                   END AS status
+            FROM products p
+            LEFT JOIN categories c ON p.category_id = c.category_id
+        """
+        params.insert(0, self.EXPIRING_SOON_DAYS)
+        where = " AND ".join(conditions)
+        
+        if count_statuses:
+            return f"SELECT status, COUNT(*) FROM ({inventory}) inventory WHERE {where} GROUP BY status", params
+        
+        query = f"""
+            SELECT product_id, product_name, description, is_generic, unit_measurement, category_name,
+                   unit_price, cost_price, stock_quantity, reorder_level, expiry_date, is_active,
+                   days_to_expiry, status
+            FROM ({inventory}) inventory
+            WHERE {where}
+            ORDER BY is_active DESC, product_name
+        """
+        return query, params
+    
+    def get_inventory(self, filters=None):
+        """
+        Get the products matching the inventory filters, with the count of each status
+        
+        Parameters:
+        - filters: as for inventory_query
+        
+        Returns:
+        - dict: products (rows as described in inventory_query) and
+          status_counts {status: count} over every status, counted without
+          the stock and expiry filters
+        """
+        try:
+            with self.db.transaction() as cursor:
+                cursor.execute(*self.inventory_query(filters))
+                products = cursor.fetchall()
+                counts = self.get_inventory_status_counts(filters, cursor)
+            return {'products': products, 'status_counts': counts}
+        except Exception as e:
+            logging.error(f"Error getting inventory: {e}")
+            raise
+    
+    def get_inventory_status_counts(self, filters=None, cursor=None):
+        """Get the number of products in each inventory status, on `cursor` if given"""
+        query, params = self.inventory_query(filters, count_statuses=True)
+        if cursor is None:
+            rows = self.db.execute_query(query, params, fetchall=True)
+        else:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+        counts = dict.fromkeys(self.INVENTORY_STATUSES, 0)
+        counts.update(rows)
+        return counts
+    
     def get_all_products(self):
         """Get all products"""
         try:
@@ -151,6 +303,67 @@ class ProductModel(BaseModel):
             logging.error(f"Error getting low stock products: {e}")
             raise
     
+    def get_stock_alerts(self, days=EXPIRING_SOON_DAYS):
+        """
+        Get the low stock and the expired or expiring products in one query
+        
+        Each half of the UNION ALL matches one of the partial indexes on
+        active products: the shortfall (reorder_level - stock_quantity) one for
+        low stock and the expiry_date one for expiring products.
+        
+        Parameters:
+        - days: Products expiring within this many days are included
+        
+        Returns:
+        - dict: low_stock rows, largest shortfall first, and expiring rows,
+          soonest first; each row is product_id, product_name, is_generic,
+          category_name, stock_quantity, reorder_level, expiry_date, days_to_expiry
+        """
+        try:
+            query = """
+                SELECT alert, a.product_id, a.product_name, COALESCE(a.is_generic, FALSE), c.name,
+                       a.stock_quantity, a.reorder_level, a.expiry_date, a.expiry_date - CURRENT_DATE
+                FROM (
+                    SELECT 'low_stock' AS alert, p.*, p.reorder_level - p.stock_quantity AS shortfall
+                    FROM products p
+                    WHERE p.is_active AND p.reorder_level - p.stock_quantity >= 0
+                    UNION ALL
+                    SELECT 'expiring', p.*, NULL
+                    FROM products p
+                    WHERE p.is_active AND p.expiry_date <= CURRENT_DATE + %s
+                ) a
+                LEFT JOIN categories c ON a.category_id = c.category_id
+                ORDER BY alert, a.shortfall DESC, CASE WHEN alert = 'expiring' THEN a.expiry_date END,
+                         a.product_name
+            """
+            alerts = {'low_stock': [], 'expiring': []}
+            for alert, *row in self.db.execute_query(query, (days,), fetchall=True):
+                alerts[alert].append(tuple(row))
+            return alerts
+        except Exception as e:
+            logging.error(f"Error getting stock alerts: {e}")
+            raise
+    
+    def count_stock_alerts(self, days=EXPIRING_SOON_DAYS):
+        """
+        Count the products get_stock_alerts would list, for the alert badge
+        
+        Returns:
+        - dict: low_stock and expiring counts
+        """
+        try:
+            query = """
+                SELECT (SELECT COUNT(*) FROM products
+                        WHERE is_active AND reorder_level - stock_quantity >= 0),
+                       (SELECT COUNT(*) FROM products
+                        WHERE is_active AND expiry_date <= CURRENT_DATE + %s)
+            """
+            low_stock, expiring = self.db.execute_query(query, (days,), fetchone=True)
+            return {'low_stock': low_stock, 'expiring': expiring}
+        except Exception as e:
+            logging.error(f"Error counting stock alerts: {e}")
+            raise
+    
     def get_expiring_products(self, days=30):
         """Get products expiring within a number of days"""
         try:
@@ -244,39 +457,22 @@ class CategoryModel(BaseModel):
 class SaleModel(BaseModel):
     """Model for sale-related database operations"""
     
+    RANKING_METRICS = {'units': "Units Sold", 'revenue': "Revenue", 'margin': "Margin"}
+    
     def create_sale(self, user_id, total_amount, payment_method, notes=None):
         """Create a new sale"""
         try:
-            # Generate invoice number (format: INV-YYYYMMDD-XXXX)
-            today = datetime.now()
-            date_part = today.strftime("%Y%m%d")
-            
-            # Get latest invoice number
-            query = """
-                SELECT invoice_number FROM sales 
-                WHERE invoice_number LIKE %s 
-                ORDER BY invoice_number DESC LIMIT 1
-            """
-            result = self.db.execute_query(query, (f"INV-{date_part}-%",), fetchone=True)
-            
-            if result:
-                last_number = int(result[0].split('-')[-1])
-                invoice_number = f"INV-{date_part}-{last_number + 1:04d}"
-            else:
-                invoice_number = f"INV-{date_part}-0001"
-            
-            # Insert sale
-            query = """
-                INSERT INTO sales 
-                (invoice_number, user_id, total_amount, payment_method, notes)
-                VALUES (%s, %s, %s, %s, %s)
-                RETURNING sale_id
-            """
-            return self.db.execute_query(
-                query, 
-                (invoice_number, user_id, total_amount, payment_method, notes),
-                fetchone=True
-            )[0]
+            with self.db.transaction() as cursor:
+                invoice_number = self.next_invoice_number(cursor)
+                
+                # Insert sale
+                cursor.execute("""
+                    INSERT INTO sales 
+                    (invoice_number, user_id, total_amount, payment_method, notes)
+                    VALUES (%s, %s, %s, %s, %s)
+                    RETURNING sale_id
+                """, (invoice_number, user_id, total_amount, payment_method, notes))
+                return cursor.fetchone()[0]
         except Exception as e:
             logging.error(f"Error creating sale: {e}")
             raise
@@ -286,21 +482,370 @@ class SaleModel(BaseModel):
         try:
             subtotal = quantity * unit_price - discount
             
+            # Items live in the monthly partition of their sale's date; the
+            # sale's item counters follow (the item is recorded as branded)
             query = """
-                INSERT INTO sale_items
-                (sale_id, product_id, quantity, unit_price, discount, subtotal)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING item_id
+                WITH item AS (
+                    INSERT INTO sale_items
+                    (sale_id, sale_date, product_id, quantity, unit_price, discount, subtotal, is_generic)
+                    VALUES (%s, (SELECT sale_date FROM sales WHERE sale_id = %s), %s, %s, %s, %s, %s, FALSE)
+                    RETURNING item_id, sale_id, sale_date
+                )
+                UPDATE sales s
+                SET item_count = s.item_count + 1, branded_count = s.branded_count + 1
+                FROM item
+                WHERE s.sale_id = item.sale_id AND s.sale_date = item.sale_date
+                RETURNING item.item_id
             """
             return self.db.execute_query(
                 query, 
-                (sale_id, product_id, quantity, unit_price, discount, subtotal),
+                (sale_id, sale_id, product_id, quantity, unit_price, discount, subtotal),
                 fetchone=True
             )[0]
         except Exception as e:
             logging.error(f"Error adding sale item: {e}")
             raise
     
+    def checkout(self, user_id, items, payment_method, notes=None,
+                 cash_tendered=None, change_amount=None, idempotency_key=None):
+        """
+        Record a complete sale and take its stock in one transaction
+        
+        `items` are dicts with product_id, quantity, unit_price, subtotal and
+        optionally is_generic and unit_measurement. Each product is
+        decremented with a conditional UPDATE (stock_quantity >= quantity),
+        so two terminals can never sell the same last unit; only the product
+        rows involved are locked, always in product_id order to rule out
+        deadlocks between carts. If any line cannot be fulfilled the whole
+        sale is rolled back and InsufficientStockError lists those lines.
+        
+        `idempotency_key` is a client-generated UUID identifying this cart.
+        If a sale with the same key already exists, that sale is returned
+        and nothing new is written, so the same checkout can safely be sent
+        again when the connection drops before the result arrives. With a
+        key, timeouts and connection errors are retried automatically.
+        
+        Returns (sale_id, invoice_number).
+        """
+        attempts = self.db.checkout_attempts if idempotency_key else 1
+        
+        for attempt in range(1, attempts + 1):
+            try:
+                result = self._checkout_once(
+                    user_id, items, payment_method, notes,
+                    cash_tendered, change_amount, idempotency_key
+                )
+                sales_changed([date.today()])
+                return result
+            except InsufficientStockError:
+                raise
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # Covers statement timeouts and dropped connections; the commit
+                # may or may not have happened, the key sorts that out on retry
+                if attempt == attempts:
+                    logging.error(f"Error during checkout after {attempts} attempts: {e}")
+                    raise
+                logging.warning(f"Checkout attempt {attempt} failed, retrying: {e}")
+                time.sleep(0.2 * 2 ** (attempt - 1))
+            except Exception as e:
+                logging.error(f"Error during checkout: {e}")
+                raise
+    
+    def _checkout_once(self, user_id, items, payment_method, notes,
+                       cash_tendered, change_amount, idempotency_key):
+        """Run a single checkout attempt; see checkout()"""
+        total_amount = sum(item['subtotal'] for item in items)
+        
+        # Several cart lines for the same product are taken together
+        requested = {}
+        for item in items:
+            requested[item['product_id']] = requested.get(item['product_id'], 0) + item['quantity']
+        
+        with self.db.transaction(self.db.checkout_timeout_ms) as cursor:
+            if idempotency_key:
+                existing = self._find_checkout(cursor, idempotency_key)
+                if existing:
+                    return existing
+            
+            # The number is taken in its own short transaction on this
+            # connection, so the checkout that follows needs its timeout again
+            invoice_number = self.next_invoice_number(cursor)
+            self.db.set_statement_timeout(cursor, self.db.checkout_timeout_ms)
+            
+            # The sale row comes first so a wait on a retry recording the same
+            # idempotency key never happens while this transaction holds product locks
+            sale_id, invoice_number, sale_date = self._insert_sale(
+                cursor, invoice_number, user_id, total_amount, payment_method, notes,
+                cash_tendered, change_amount, idempotency_key, self.count_items(items)
+            )
+            if sale_id is None:
+                # A retry of this checkout committed while we were inserting
+                return self._find_checkout(cursor, idempotency_key)
+            
+            failed_lines = []
+            for product_id in sorted(requested):
+                cursor.execute("""
+                    UPDATE products
+                    SET stock_quantity = stock_quantity - %s
+                    WHERE product_id = %s AND stock_quantity >= %s
+                    RETURNING stock_quantity
+                """, (requested[product_id], product_id, requested[product_id]))
+                if cursor.fetchone() is None:
+                    failed_lines.append(product_id)
+            
+            if failed_lines:
+                cursor.execute(
+                    "SELECT product_id, stock_quantity FROM products WHERE product_id = ANY(%s)",
+                    (failed_lines,)
+                )
+                available = dict(cursor.fetchall())
+                raise InsufficientStockError([
+                    {'product_id': product_id,
+                     'requested': requested[product_id],
+                     'available': available.get(product_id, 0)}
+                    for product_id in failed_lines
+                ])
+            
+            psycopg2.extras.execute_values(cursor, """
+                INSERT INTO sale_items
+                (sale_id, sale_date, product_id, quantity, unit_price, subtotal, is_generic, unit_measurement)
+                VALUES %s
+            """, [
+                (sale_id, sale_date, item['product_id'], item['quantity'], item['unit_price'],
+                 item['subtotal'], item.get('is_generic', False), item.get('unit_measurement', ''))
+                for item in items
+            ])
+        
+        return sale_id, invoice_number
+    
+    def _find_checkout(self, cursor, idempotency_key):
+        """Get (sale_id, invoice_number) of the sale recorded under an idempotency key"""
+        cursor.execute(
+            "SELECT sale_id, invoice_number FROM sale_keys WHERE idempotency_key = %s",
+            (str(idempotency_key),)
+        )
+        existing = cursor.fetchone()
+        if existing:
+            logging.info(f"Checkout {idempotency_key} already recorded as {existing[1]}")
+        return existing
+    
+    def count_items(self, items):
+        """Get the (item_count, branded_count, generic_count) stored on a sale"""
+        generic_count = sum(1 for item in items if item.get('is_generic', False))
+        return len(items), len(items) - generic_count, generic_count
+    
+    def next_invoice_number(self, cursor, commit=True):
+        """
+        Allocate the next INV-YYYYMMDD-XXXX invoice number on a transaction's cursor
+        
+        The day's counter row is bumped and, with commit, committed straight
+        away in its own short transaction on the cursor's connection, so
+        terminals only wait on each other for that one statement, never for
+        a whole checkout, and no second pooled connection is needed. Call it
+        first in a transaction: anything done before on the cursor is
+        committed with it. A number taken by a checkout that then rolls back
+        is not reused, so the day's numbers can have gaps. The first number
+        of a day follows any invoice already recorded for it; numbers not
+        ending in digits (entered by hand) are ignored.
+        """
+        today = datetime.now().date()
+        cursor.execute("""
+            UPDATE invoice_counters SET last_number = last_number + 1
+            WHERE invoice_day = %s
+            RETURNING last_number
+        """, (today,))
+        counter = cursor.fetchone()
+        
+        if counter is None:
+            cursor.execute("""
+                INSERT INTO invoice_counters (invoice_day, last_number)
+                SELECT %s, COALESCE(MAX(split_part(invoice_number, '-', 3)::integer), 0) + 1
+                FROM sale_keys
+                WHERE invoice_number LIKE %s AND split_part(invoice_number, '-', 3) ~ '^[0-9]{1,9}$'
+                ON CONFLICT (invoice_day) DO UPDATE SET last_number = invoice_counters.last_number + 1
+                RETURNING last_number
+            """, (today, f"INV-{today:%Y%m%d}-%"))
+            counter = cursor.fetchone()
+        
+        if commit:
+            cursor.connection.commit()
+        return f"INV-{today:%Y%m%d}-{counter[0]:04d}"
+    
+    def _insert_sale(self, cursor, invoice_number, user_id, total_amount, payment_method, notes,
+                     cash_tendered, change_amount, idempotency_key=None, item_counts=(0, 0, 0),
+                     attempts=3):
+        """
+        Insert a sale under invoice_number, or the next free one if it is taken
+        
+        `item_counts` is (item_count, branded_count, generic_count) as given
+        by count_items, stored with the sale so listings need no GROUP BY.
+        
+        Returns (sale_id, invoice_number, sale_date), or (None, None, None)
+        if another transaction has just recorded a sale with the same
+        idempotency key.
+        """
+        for attempt in range(attempts):
+            if attempt:
+                # Rare enough that holding the counter row until this sale commits is fine
+                invoice_number = self.next_invoice_number(cursor, commit=False)
+            
+            # sale_keys keeps invoice numbers unique as a safety net, e.g. against
+            # a number entered by hand; a clash just takes the next number
+            cursor.execute("SAVEPOINT sale_invoice")
+            try:
+                cursor.execute("""
+                    INSERT INTO sales 
+                    (invoice_number, user_id, total_amount, payment_method, notes, cash_tendered,
+                     change_amount, idempotency_key, item_count, branded_count, generic_count)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                    RETURNING sale_id, sale_date
+                """, (invoice_number, user_id, total_amount, payment_method, notes,
+                      cash_tendered, change_amount,
+                      str(idempotency_key) if idempotency_key else None) + tuple(item_counts))
+                sale_id, sale_date = cursor.fetchone()
+                cursor.execute("RELEASE SAVEPOINT sale_invoice")
+                return sale_id, invoice_number, sale_date
+            except psycopg2.errors.UniqueViolation as e:
+                cursor.execute("ROLLBACK TO SAVEPOINT sale_invoice")
+                if e.diag.constraint_name == 'sale_keys_idempotency_key':
+                    return None, None, None
+        
+        raise RuntimeError(f"Could not allocate an invoice number after {attempts} attempts")
+    
+    def replay_offline_sales(self, sales):
+        """
+        Record a batch of sales journaled offline, in one transaction
+        
+        `sales` are journal entries from OfflineStore.get_pending_sales. Sales,
+        items, stock and audit rows are each written with one bulk statement.
+        Sales whose idempotency key is already on the server (the checkout got
+        through before the link dropped) are skipped. The goods have already
+        left the store, so a sale is recorded even when stock runs short; the
+        stock then stops at zero and the shortfall is reported as a conflict.
+        
+        Returns a dict with 'recorded' (idempotency key -> sale_id, for every
+        sale in the batch) and 'conflicts' (product_id, product_name,
+        requested, available, invoices).
+        """
+        try:
+            with self.db.transaction() as cursor:
+                product_ids = sorted({item['product_id'] for sale in sales for item in sale['items']})
+                # Lock in product_id order like checkout does, so the two never deadlock
+                cursor.execute("""
+                    SELECT product_id, product_name, stock_quantity
+                    FROM products
+                    WHERE product_id = ANY(%s)
+                    ORDER BY product_id
+                    FOR UPDATE
+                """, (product_ids,))
+                products = {row[0]: (row[1], row[2]) for row in cursor.fetchall()}
+                
+                # Keys are unique through sale_keys, which ON CONFLICT can't target
+                # from sales, so sales already on the server are filtered out first
+                keys = [sale['idempotency_key'] for sale in sales]
+                cursor.execute(
+                    "SELECT idempotency_key::text FROM sale_keys WHERE idempotency_key = ANY(%s::uuid[])",
+                    (keys,)
+                )
+                already_recorded = {row[0] for row in cursor.fetchall()}
+                new_sales = {}
+                pending = [sale for sale in sales if sale['idempotency_key'] not in already_recorded]
+                if pending:
+                    inserted = psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO sales
+                        (invoice_number, user_id, sale_date, total_amount, payment_method, notes,
+                         cash_tendered, change_amount, idempotency_key,
+                         item_count, branded_count, generic_count)
+                        VALUES %s
+                        RETURNING idempotency_key::text, sale_id
+                    """, [
+                        (sale['invoice_number'], sale['user_id'], sale['sale_date'], sale['total_amount'],
+                         sale['payment_method'], sale['notes'], sale['cash_tendered'],
+                         sale['change_amount'], sale['idempotency_key'])
+                        + self.count_items([item for item in sale['items'] if item['product_id'] in products])
+                        for sale in pending
+                    ], fetch=True)
+                    new_sales = dict(inserted)
+                
+                cursor.execute(
+                    "SELECT idempotency_key::text, sale_id FROM sale_keys WHERE idempotency_key = ANY(%s::uuid[])",
+                    (keys,)
+                )
+                recorded = dict(cursor.fetchall())
+                
+                item_rows = []
+                audit_rows = []
+                sold = {}
+                invoices = {}
+                for sale in sales:
+                    sale_id = new_sales.get(sale['idempotency_key'])
+                    if sale_id is None:
+                        continue
+                    audit_rows.append((
+                        sale['user_id'], "sale", "sales", sale_id,
+                        f"Created offline sale: {sale['invoice_number']}, amount: ₱{float(sale['total_amount']):.2f}"
+                    ))
+                    for item in sale['items']:
+                        product_id = item['product_id']
+                        sold[product_id] = sold.get(product_id, 0) + item['quantity']
+                        invoices.setdefault(product_id, []).append(sale['invoice_number'])
+                        if product_id in products:
+                            item_rows.append((
+                                sale_id, sale['sale_date'], product_id, item['quantity'],
+                                item['unit_price'], item['subtotal'],
+                                item.get('is_generic', False), item.get('unit_measurement', '')
+                            ))
+                
+                if item_rows:
+                    psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO sale_items
+                        (sale_id, sale_date, product_id, quantity, unit_price, subtotal,
+                         is_generic, unit_measurement)
+                        VALUES %s
+                    """, item_rows)
+                
+                stock_rows = [(product_id, quantity) for product_id, quantity in sold.items()
+                              if product_id in products]
+                if stock_rows:
+                    psycopg2.extras.execute_values(cursor, """
+                        UPDATE products p
+                        SET stock_quantity = GREATEST(p.stock_quantity - v.quantity, 0)
+                        FROM (VALUES %s) AS v(product_id, quantity)
+                        WHERE p.product_id = v.product_id
+                    """, stock_rows)
+                
+                if audit_rows:
+                    psycopg2.extras.execute_values(cursor, """
+                        INSERT INTO audit_logs
+                        (user_id, action_type, table_affected, record_id, action_details)
+                        VALUES %s
+                    """, audit_rows)
+                
+                notify_sales_changed(cursor, {sale['sale_date'] for sale in sales})
+                
+                # Products sold offline beyond the server's stock, or deleted meanwhile
+                conflicts = []
+                for product_id in sorted(sold):
+                    name, available = products.get(product_id, (None, None))
+                    if available is None or sold[product_id] > available:
+                        conflicts.append({
+                            'product_id': product_id,
+                            'product_name': name,
+                            'requested': sold[product_id],
+                            'available': available,
+                            'invoices': invoices[product_id]
+                        })
+                        logging.warning(
+                            f"Offline sales of product {product_id} exceed stock: "
+                            f"sold {sold[product_id]}, available {available}"
+                        )
+            
+            sales_changed({sale['sale_date'] for sale in sales})
+            return {'recorded': recorded, 'conflicts': conflicts}
+        except Exception as e:
+            logging.error(f"Error replaying offline sales: {e}")
+            raise
+    
     def get_sale_by_id(self, sale_id):
         """Get sale by ID"""
         try:
@@ -332,25 +877,137 @@ class SaleModel(BaseModel):
             logging.error(f"Error getting items for sale {sale_id}: {e}")
             raise
     
+    def void_sale(self, sale_id, user_id):
+        """
+        Void a completed sale
+        
+        Marking the sale voided, restoring stock for all of its items, writing
+        the audit row and telling other terminals about a past day changing
+        happen in one statement, so they commit or fail together in a single
+        round trip. The products are locked in product_id order before their
+        stock is restored, as checkout does, so a void and a checkout sharing
+        products can never deadlock. Stock is restored relative to its current
+        value, so concurrent sales are never lost, and the status guard means
+        a sale voided twice only restores stock once.
+        
+        Returns the invoice number, or None if the sale was not found or was
+        already voided.
+        """
+        try:
+            query = """
+                WITH voided AS (
+                    UPDATE sales
+                    SET status = 'Voided', void_date = NOW(), voided_by = %(user_id)s
+                    WHERE sale_id = %(sale_id)s AND status = 'Completed'
+                    RETURNING sale_id, sale_date, invoice_number
+                ), returned AS (
+                    SELECT si.product_id, SUM(si.quantity) AS quantity
+                    FROM sale_items si
+                    JOIN voided v ON v.sale_id = si.sale_id AND v.sale_date = si.sale_date
+                    GROUP BY si.product_id
+                ), locked AS (
+                    -- A locking CTE is never inlined: every row is locked, in
+                    -- product_id order, before the join below lets one be updated
+                    SELECT product_id
+                    FROM products
+                    WHERE product_id IN (SELECT product_id FROM returned)
+                    ORDER BY product_id
+                    FOR UPDATE
+                ), restored AS (
+                    UPDATE products p
+                    SET stock_quantity = p.stock_quantity + r.quantity
+                    FROM returned r
+                    JOIN locked l ON l.product_id = r.product_id
+                    WHERE p.product_id = r.product_id
+                    RETURNING p.product_id
+                ), logged AS (
+                    INSERT INTO audit_logs
+                    (user_id, action_type, table_affected, record_id, action_details)
+                    SELECT %(user_id)s, 'void', 'sales', sale_id, 'Voided sale ' || invoice_number
+                    FROM voided
+                    RETURNING log_id
+                )
+                SELECT v.invoice_number, v.sale_date,
+                       (SELECT COUNT(*) FROM restored),
+                       (SELECT COUNT(*) FROM logged),
+                       -- Same payload as notify_sales_changed; today's cache entries expire on their own
+                       CASE WHEN v.sale_date::date < CURRENT_DATE
+                            THEN pg_notify(%(channel)s, to_char(v.sale_date, 'YYYY-MM-DD'))
+                       END
+                FROM voided v
+            """
+            result = self.db.execute_query(
+                query,
+                {'sale_id': sale_id, 'user_id': user_id, 'channel': INVALIDATION_CHANNEL},
+                fetchone=True,
+                commit=True
+            )
+            if not result:
+                return None
+            
+            # The voided sale's day changes, however long ago it was
+            sales_changed([result[1]])
+            return result[0]
+        except Exception as e:
+            logging.error(f"Error voiding sale {sale_id}: {e}")
+            raise
+    
+    def get_sales_page(self, start_date, end_date, invoice_prefix=None, status=None,
+                       after=None, limit=100):
+        """
+        Get one page of sales, newest first, using keyset pagination
+        
+        `after` is the (sale_date, sale_id) of the last row of the previous
+        page, so each page is an index range scan no matter how deep it is.
+        """
+        try:
+            query = """
+                SELECT s.sale_id, s.invoice_number, s.sale_date, u.full_name, 
+                       s.total_amount, s.payment_method, s.status
+                FROM sales s
+                JOIN users u ON s.user_id = u.user_id
+                WHERE s.sale_date >= %s AND s.sale_date < %s
+            """
+            
+            params = [start_date, end_date + timedelta(days=1)]
+            
+            if invoice_prefix:
+                query += " AND s.invoice_number LIKE %s"
+                params.append(self._escape_like(invoice_prefix) + "%")
+            
+            if status:
+                query += " AND s.status = %s"
+                params.append(status)
+            
+            if after:
+                query += " AND (s.sale_date, s.sale_id) < (%s, %s)"
+                params.extend(after)
+            
+            query += " ORDER BY s.sale_date DESC, s.sale_id DESC LIMIT %s"
+            params.append(limit)
+            
+            return self.db.execute_query(query, params, fetchall=True)
+        except Exception as e:
+            logging.error(f"Error getting sales page: {e}")
+            raise
+    
     def get_sales_by_date_range(self, start_date, end_date, payment_method=None):
         """Get sales within a date range"""
         try:
-            query = """
+            # Item counts are stored on the sale, so this is a range scan over sales alone
+            sales_range, params = sale_date_range("s", start_date, end_date)
+            query = f"""
                 SELECT s.sale_id, s.invoice_number, s.sale_date, s.total_amount, 
-                       s.payment_method, u.full_name, COUNT(si.item_id) as item_count
+                       s.payment_method, u.full_name, s.item_count
                 FROM sales s
                 JOIN users u ON s.user_id = u.user_id
-                JOIN sale_items si ON s.sale_id = si.sale_id
-                WHERE s.sale_date::date BETWEEN %s AND %s
+                WHERE {sales_range}
             """
             
-            params = [start_date, end_date]
-            
             if payment_method:
                 query += " AND s.payment_method = %s"
                 params.append(payment_method)
             
-            query += " GROUP BY s.sale_id, s.invoice_number, s.sale_date, s.total_amount, s.payment_method, u.full_name"
             query += " ORDER BY s.sale_date DESC"
             
             return self.db.execute_query(query, params, fetchall=True)
@@ -358,43 +1015,287 @@ class SaleModel(BaseModel):
             logging.error(f"Error getting sales by date range: {e}")
             raise
     
-    def get_daily_sales_totals(self, start_date, end_date, payment_method=None):
-        """Get daily sales totals within a date range"""
+    def get_item_count_drift(self, limit=100):
+        """
+        Get sales whose stored item counters don't match their sale_items
+        
+        Parameters:
+        - limit: Maximum number of sales to return
+        
+        Returns:
+        - list: (sale_id, invoice_number, stored item/branded/generic counts,
+          actual item/branded/generic counts), by sale_id
+        """
         try:
-            query = """
-                SELECT DATE(s.sale_date) as sale_day, SUM(s.total_amount) as daily_total
+            query = f"""
+                SELECT s.sale_id, s.invoice_number,
+                       s.item_count, s.branded_count, s.generic_count,
+                       COALESCE(c.item_count, 0), COALESCE(c.branded_count, 0), COALESCE(c.generic_count, 0)
                 FROM sales s
-                WHERE s.sale_date::date BETWEEN %s AND %s
+                LEFT JOIN ({SALE_ITEM_COUNTS}) c ON c.sale_id = s.sale_id
+                WHERE (s.item_count, s.branded_count, s.generic_count)
+                      IS DISTINCT FROM (COALESCE(c.item_count, 0), COALESCE(c.branded_count, 0),
+                                        COALESCE(c.generic_count, 0))
+                ORDER BY s.sale_id
+                LIMIT %s
+            """
+            return self.db.execute_query(query, (limit,), fetchall=True)
+        except Exception as e:
+            logging.error(f"Error checking sale item counters: {e}")
+            raise
+    
+    def repair_item_counts(self):
+        """
+        Recount the item counters of every sale that drifted from its sale_items
+        
+        Returns:
+        - int: Number of sales corrected
+        """
+        try:
+            query = f"""
+                UPDATE sales s
+                SET item_count = COALESCE(c.item_count, 0),
+                    branded_count = COALESCE(c.branded_count, 0),
+                    generic_count = COALESCE(c.generic_count, 0)
+                FROM sales x
+                LEFT JOIN ({SALE_ITEM_COUNTS}) c ON c.sale_id = x.sale_id
+                WHERE x.sale_id = s.sale_id AND x.sale_date = s.sale_date
+                  AND (s.item_count, s.branded_count, s.generic_count)
+                      IS DISTINCT FROM (COALESCE(c.item_count, 0), COALESCE(c.branded_count, 0),
+                                        COALESCE(c.generic_count, 0))
+            """
+            return self.db.execute_query(query)
+        except Exception as e:
+            logging.error(f"Error repairing sale item counters: {e}")
+            raise
+    
+    def summary_conditions(self, start_date, end_date, payment_method=None, is_generic=None):
+        """Build the WHERE conditions and parameters for the daily_sales_totals rollup view"""
+        conditions = "sale_day >= %s::date AND sale_day <= %s::date"
+        params = [start_date, end_date]
+        
+        if payment_method:
+            conditions += " AND payment_method = %s"
+            params.append(payment_method)
+        
+        if is_generic is not None:
+            conditions += " AND is_generic = %s"
+            params.append(is_generic)
+        
+        return conditions, params
+    
+    def get_daily_sales_totals(self, start_date, end_date, payment_method=None, is_generic=None):
+        """
+        Get daily sales totals within a date range
+        
+        Reads the daily_sales_totals rollup view, so voided sales are not counted.
+        is_generic limits the totals to generic (True) or branded (False) items.
+        """
+        try:
+            conditions, params = self.summary_conditions(start_date, end_date, payment_method, is_generic)
+            query = f"""
+                SELECT sale_day, SUM(total_amount) as daily_total
+                FROM daily_sales_totals
+                WHERE {conditions}
+                GROUP BY sale_day
+                HAVING SUM(total_amount) <> 0
+                ORDER BY sale_day
             """
-            
-            params = [start_date, end_date]
-            
-            if payment_method:
-                query += " AND s.payment_method = %s"
-                params.append(payment_method)
-            
-            query += " GROUP BY sale_day ORDER BY sale_day"
             
             return self.db.execute_query(query, params, fetchall=True)
         except Exception as e:
             logging.error(f"Error getting daily sales totals: {e}")
             raise
     
-    def get_payment_method_totals(self, start_date, end_date):
-        """Get sales totals by payment method within a date range"""
+    def get_payment_method_totals(self, start_date, end_date, is_generic=None):
+        """Get sales totals by payment method within a date range, from the rollup"""
         try:
-            query = """
-                SELECT s.payment_method, SUM(s.total_amount) as total
-                FROM sales s
-                WHERE s.sale_date::date BETWEEN %s AND %s
-                GROUP BY s.payment_method
+            conditions, params = self.summary_conditions(start_date, end_date, is_generic=is_generic)
+            query = f"""
+                SELECT payment_method, SUM(total_amount) as total
+                FROM daily_sales_totals
+                WHERE {conditions}
+                GROUP BY payment_method
+                HAVING SUM(total_amount) <> 0
                 ORDER BY total DESC
             """
             
-            return self.db.execute_query(query, (start_date, end_date), fetchall=True)
+            return self.db.execute_query(query, params, fetchall=True)
         except Exception as e:
             logging.error(f"Error getting payment method totals: {e}")
             raise
+    
+    def get_sales_report_totals(self, start_date, end_date, payment_method=None, is_generic=None, bucket=None):
+        """
+        Get the totals behind every sales chart with one GROUPING SETS query
+        
+        Each chart keeps its own filters: the totals over time and the grand
+        total use both, the payment method split only the medication type and
+        the medication type split only the payment method, so one pass over the
+        rollup gives all of them.
+        
+        Parameters:
+        - payment_method: Optional payment method filter
+        - is_generic: True for generic, False for branded, None for both
+        - bucket: date_trunc unit of the totals over time; chosen from the
+          length of the range if omitted (see chart_bucket)
+        
+        Returns:
+        - dict: bucket, periods [(first day of period, total)],
+          payment_methods [(method, total)],
+          medication_types [('Branded'/'Generic', total)], total, quantity
+        """
+        try:
+            payment_match, payment_params = "TRUE", []
+            if payment_method:
+                payment_match, payment_params = "payment_method = %s", [payment_method]
+            generic_match, generic_params = "TRUE", []
+            if is_generic is not None:
+                generic_match, generic_params = "is_generic = %s", [is_generic]
+            
+            bucket = bucket or chart_bucket(start_date, end_date)
+            
+            # GROUPING() is a bitmask of the columns a row is aggregated over:
+            # 3 = per period, 5 = per payment method, 6 = per medication type, 7 = grand total
+            query = f"""
+                SELECT GROUPING(period, payment_method, is_generic), period, payment_method, is_generic,
+                       SUM(total_amount) FILTER (WHERE {payment_match} AND {generic_match}),
+                       SUM(total_amount) FILTER (WHERE {generic_match}),
+                       SUM(total_amount) FILTER (WHERE {payment_match}),
+                       SUM(quantity) FILTER (WHERE {payment_match} AND {generic_match})
+                FROM (
+                    SELECT date_trunc(%s, sale_day::timestamp)::date AS period, payment_method, is_generic,
+                           quantity, total_amount
+                    FROM daily_sales_totals
+                    WHERE sale_day >= %s::date AND sale_day <= %s::date
+                ) summary
+                GROUP BY GROUPING SETS ((period), (payment_method), (is_generic), ())
+            """
+            params = (payment_params + generic_params + generic_params + payment_params
+                      + payment_params + generic_params + [bucket, start_date, end_date])
+            rows = self.db.execute_query(query, params, fetchall=True)
+            
+            totals = {'bucket': bucket, 'periods': [], 'payment_methods': [], 'medication_types': [],
+                      'total': 0, 'quantity': 0}
+            for grouping, period, method, generic, filtered, by_generic, by_payment, quantity in rows:
+                if grouping == 3 and filtered:
+                    totals['periods'].append((period, filtered))
+                elif grouping == 5 and by_generic:
+                    totals['payment_methods'].append((method, by_generic))
+                elif grouping == 6 and by_payment:
+                    totals['medication_types'].append((generic, by_payment))
+                elif grouping == 7:
+                    totals['total'] = filtered or 0
+                    totals['quantity'] = quantity or 0
+            
+            totals['periods'].sort()
+            totals['payment_methods'].sort(key=lambda row: row[1], reverse=True)
+            # Branded first, as the charts colour the slices in that order
+            totals['medication_types'] = [
+                ('Generic' if generic else 'Branded', total)
+                for generic, total in sorted(totals['medication_types'])
+            ]
+            return totals
+        except Exception as e:
+            logging.error(f"Error getting sales report totals: {e}")
+            raise
+    
+    def get_product_rankings(self, start_date, end_date, metric='units', slow_movers=False,
+                             category_id=None, limit=25, offset=0):
+        """
+        Get one page of products ranked by units sold, revenue or margin
+        
+        Sales are aggregated per product first; the window functions then rank
+        the aggregates, overall and within each category, in the same query.
+        Active products without sales in the range are added through an
+        anti-join, so slow movers start with the products that didn't sell.
+        
+        Parameters:
+        - metric: One of RANKING_METRICS; margin is revenue less cost_price per unit
+        - slow_movers: Rank lowest first instead of highest first
+        - category_id: Optional category filter
+        - limit, offset: Page to return
+        
+        Returns:
+        - dict: total (number of ranked products) and rows, a list of
+          (rank, category_rank, product_id, product_name, category_name,
+          units, revenue, margin) tuples
+        """
+        if metric not in self.RANKING_METRICS:
+            raise ValueError(f"Unknown ranking metric: {metric}")
+        try:
+            sales_range, params = sale_date_range("s", start_date, end_date)
+            items_range, item_params = sale_date_range("si", start_date, end_date)
+            params += item_params
+            direction = "ASC" if slow_movers else "DESC"
+            
+            category_match = "TRUE"
+            if category_id:
+                category_match = "p.category_id = %s"
+                params.append(category_id)
+            
+            query = f"""
+                WITH sold AS (
+                    SELECT si.product_id, SUM(si.quantity) AS units, SUM(si.subtotal) AS revenue,
+                           SUM(si.subtotal - si.quantity * COALESCE(p.cost_price, 0)) AS margin
+                    FROM sale_items si
+                    JOIN sales s ON s.sale_id = si.sale_id AND s.sale_date = si.sale_date
+                    JOIN products p ON p.product_id = si.product_id
+                    WHERE s.status = 'Completed' AND {sales_range} AND {items_range}
+                    GROUP BY si.product_id
+                ),
+                product_totals AS (
+                    SELECT product_id, units, revenue, margin FROM sold
+                    UNION ALL
+                    SELECT p.product_id, 0, 0, 0
+                    FROM products p
+                    WHERE p.is_active
+                      AND NOT EXISTS (SELECT 1 FROM sold WHERE sold.product_id = p.product_id)
+                ),
+                ranked AS (
+                    SELECT RANK() OVER (ORDER BY t.{metric} {direction}) AS overall_rank,
+                           RANK() OVER (PARTITION BY p.category_id ORDER BY t.{metric} {direction}) AS category_rank,
+                           COUNT(*) OVER () AS total_count,
+                           t.product_id, p.product_name, COALESCE(c.name, 'Uncategorized') AS category_name,
+                           t.units, t.revenue, t.margin
+                    FROM product_totals t
+                    JOIN products p ON p.product_id = t.product_id
+                    LEFT JOIN categories c ON c.category_id = p.category_id
+                    WHERE {category_match}
+                )
+                SELECT overall_rank, category_rank, total_count, product_id, product_name, category_name,
+                       units, revenue, margin
+                FROM ranked
+                ORDER BY overall_rank, product_name, product_id
+                LIMIT %s OFFSET %s
+            """
+            rows = self.db.execute_query(query, params + [limit, offset], fetchall=True) or []
+            
+            return {
+                'total': rows[0][2] if rows else 0,
+                'rows': [row[:2] + row[3:] for row in rows]
+            }
+        except Exception as e:
+            logging.error(f"Error getting product rankings: {e}")
+            raise
+    
+    def get_medication_type_totals(self, start_date, end_date, payment_method=None):
+        """Get branded and generic sales totals within a date range, from the rollup"""
+        try:
+            conditions, params = self.summary_conditions(start_date, end_date, payment_method)
+            query = f"""
+                SELECT CASE WHEN is_generic THEN 'Generic' ELSE 'Branded' END as med_type,
+                       SUM(total_amount) as total
+                FROM daily_sales_totals
+                WHERE {conditions}
+                GROUP BY med_type
+                HAVING SUM(total_amount) <> 0
+            """
+            
+            return self.db.execute_query(query, params, fetchall=True)
+        except Exception as e:
+            logging.error(f"Error getting medication type totals: {e}")
+            raise
 
 
 class UserModel(BaseModel):
@@ -0,0 +1,415 @@
+"""
+Local store that keeps the POS selling while PostgreSQL is unreachable.
+
+The store is a SQLite file next to the application (data/offline_pos.db) in
+WAL mode with synchronous=FULL, so every committed write is fsync'd before
+the call returns. It holds:
+
+- a snapshot of the sellable catalog, refreshed each time the POS loads
+  products online
+- salted password hashes of users who have logged in on this terminal, so
+  they can log in again without the server
+- an append-only journal of sales completed offline, replayed in batches
+  to PostgreSQL once the connection is back
+- the stock conflicts found while replaying
+- the journaled sales the server refused, with its error, kept out of the
+  replay until the next start
+- audit entries the audit sink could not write to the server
+"""
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+
+import psycopg2
+
+STORE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                          'data', 'offline_pos.db')
+
+_store = None
+
+
+class OfflineStore:
+    """SQLite-backed catalog snapshot, credential cache and sales journal"""
+
+    def __init__(self, path=STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+        self.create_tables()
+
+    @contextmanager
+    def connect(self):
+        """Open a connection for one unit of work; commits on success"""
+        # A fresh connection per call keeps the store usable from loader threads
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=FULL")
+            yield connection
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
+
+    def create_tables(self):
+        """Create the local tables if they don't exist"""
+        with self.connect() as connection:
+            connection.executescript("""
+                CREATE TABLE IF NOT EXISTS catalog (
+                    product_id INTEGER PRIMARY KEY,
+                    product_name TEXT NOT NULL,
+                    description TEXT,
+                    is_generic INTEGER,
+                    category TEXT,
+                    unit_measurement TEXT,
+                    unit_price TEXT NOT NULL,
+                    stock_quantity INTEGER NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS store_info (
+                    key TEXT PRIMARY KEY,
+                    value TEXT
+                );
+                CREATE TABLE IF NOT EXISTS cached_users (
+                    username TEXT PRIMARY KEY,
+                    user_id INTEGER NOT NULL,
+                    role TEXT,
+                    full_name TEXT,
+                    salt BLOB NOT NULL,
+                    password_hash BLOB NOT NULL,
+                    cached_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS sales_journal (
+                    local_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    idempotency_key TEXT NOT NULL UNIQUE,
+                    invoice_number TEXT NOT NULL,
+                    sale_date TEXT NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    total_amount TEXT NOT NULL,
+                    payment_method TEXT,
+                    notes TEXT,
+                    cash_tendered TEXT,
+                    change_amount TEXT,
+                    items TEXT NOT NULL,
+                    replayed_at TEXT,
+                    sale_id INTEGER
+                );
+                CREATE INDEX IF NOT EXISTS idx_sales_journal_pending
+                    ON sales_journal (local_id) WHERE replayed_at IS NULL;
+                CREATE TABLE IF NOT EXISTS audit_spill (
+                    spill_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    entry TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS replay_conflicts (
+                    conflict_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    product_id INTEGER NOT NULL,
+                    product_name TEXT,
+                    requested INTEGER NOT NULL,
+                    available INTEGER,
+                    invoices TEXT,
+                    detected_at TEXT NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS failed_replays (
+                    local_id INTEGER PRIMARY KEY REFERENCES sales_journal (local_id),
+                    error TEXT NOT NULL,
+                    failed_at TEXT NOT NULL
+                );
+            """)
+
+    # Catalog snapshot
+
+    def save_catalog(self, products):
+        """
+        Replace the catalog snapshot
+
+        Parameters:
+        - products: rows of (product_id, product_name, description, is_generic,
+          category, unit_measurement, unit_price, stock_quantity)
+        """
+        with self.connect() as connection:
+            connection.execute("DELETE FROM catalog")
+            connection.executemany(
+                "INSERT INTO catalog VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(p[0], p[1], p[2], None if p[3] is None else int(bool(p[3])),
+                  p[4], p[5], str(p[6]), p[7]) for p in products]
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO store_info (key, value) VALUES ('catalog_saved_at', ?)",
+                (datetime.now().isoformat(timespec='seconds'),)
+            )
+
+    def get_catalog(self):
+        """Get the snapshot rows still in stock, in the same shape save_catalog takes"""
+        with self.connect() as connection:
+            rows = connection.execute("""
+                SELECT product_id, product_name, description, is_generic, category,
+                       unit_measurement, unit_price, stock_quantity
+                FROM catalog
+                WHERE stock_quantity > 0
+                ORDER BY product_name
+            """).fetchall()
+        return [row[:3] + (None if row[3] is None else bool(row[3]),) + row[4:] for row in rows]
+
+    def get_catalog_categories(self):
+        """Get the category names in the snapshot"""
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT DISTINCT category FROM catalog WHERE category IS NOT NULL ORDER BY category"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    def get_catalog_saved_at(self):
+        """Get when the catalog snapshot was taken, or None if there is none"""
+        with self.connect() as connection:
+            row = connection.execute(
+                "SELECT value FROM store_info WHERE key = 'catalog_saved_at'"
+            ).fetchone()
+        return row[0] if row else None
+
+    # Cached credentials
+
+    def hash_password(self, password, salt):
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, 100000)
+
+    def remember_user(self, user, password):
+        """Cache a successful online login so the user can log in offline"""
+        salt = os.urandom(16)
+        with self.connect() as connection:
+            connection.execute("""
+                INSERT OR REPLACE INTO cached_users
+                (username, user_id, role, full_name, salt, password_hash, cached_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (user['username'], user['user_id'], user['role'], user['full_name'],
+                  salt, self.hash_password(password, salt),
+                  datetime.now().isoformat(timespec='seconds')))
+
+    def verify_user(self, username, password):
+        """Get the cached user dict if the password matches, otherwise None"""
+        with self.connect() as connection:
+            row = connection.execute("""
+                SELECT user_id, username, role, full_name, salt, password_hash
+                FROM cached_users WHERE username = ?
+            """, (username,)).fetchone()
+        if not row or not hmac.compare_digest(self.hash_password(password, row[4]), row[5]):
+            return None
+        return {'user_id': row[0], 'username': row[1], 'role': row[2], 'full_name': row[3]}
+
+    def has_cached_users(self):
+        with self.connect() as connection:
+            return connection.execute("SELECT 1 FROM cached_users LIMIT 1").fetchone() is not None
+
+    # Sales journal
+
+    def record_sale(self, user_id, items, payment_method, notes=None,
+                    cash_tendered=None, change_amount=None, idempotency_key=None):
+        """
+        Journal a sale completed while offline and take its stock from the snapshot
+
+        Parameters:
+        - items: dicts with product_id, quantity, unit_price, subtotal, is_generic, unit_measurement
+        - idempotency_key: the key of the checkout, so a sale that did reach the
+          server before the connection dropped is not recorded twice on replay
+
+        Returns:
+        - tuple: (local_id, invoice_number)
+        """
+        key = str(idempotency_key or uuid.uuid4())
+        now = datetime.now()
+        invoice_number = f"OFF-{now.strftime('%Y%m%d')}-{key[:8].upper()}"
+        total_amount = sum(float(item['subtotal']) for item in items)
+
+        with self.connect() as connection:
+            cursor = connection.execute("""
+                INSERT INTO sales_journal
+                (idempotency_key, invoice_number, sale_date, user_id, total_amount, payment_method,
+                 notes, cash_tendered, change_amount, items)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """, (key, invoice_number, now.isoformat(), user_id, f"{total_amount:.2f}",
+                  payment_method, notes,
+                  None if cash_tendered is None else f"{float(cash_tendered):.2f}",
+                  None if change_amount is None else f"{float(change_amount):.2f}",
+                  json.dumps(items, default=str)))
+            connection.executemany(
+                "UPDATE catalog SET stock_quantity = stock_quantity - ? WHERE product_id = ?",
+                [(item['quantity'], item['product_id']) for item in items]
+            )
+            local_id = cursor.lastrowid
+
+        logging.info(f"Journaled offline sale {invoice_number} ({len(items)} items)")
+        return local_id, invoice_number
+
+    def get_pending_sales(self, limit=500):
+        """Get the oldest journaled sales that have not been replayed yet"""
+        with self.connect() as connection:
+            rows = connection.execute("""
+                SELECT local_id, idempotency_key, invoice_number, sale_date, user_id, total_amount,
+                       payment_method, notes, cash_tendered, change_amount, items
+                FROM sales_journal
+                WHERE replayed_at IS NULL
+                  AND local_id NOT IN (SELECT local_id FROM failed_replays)
+                ORDER BY local_id
+                LIMIT ?
+            """, (limit,)).fetchall()
+        columns = ('local_id', 'idempotency_key', 'invoice_number', 'sale_date', 'user_id',
+                   'total_amount', 'payment_method', 'notes', 'cash_tendered', 'change_amount', 'items')
+        sales = []
+        for row in rows:
+            sale = dict(zip(columns, row))
+            sale['items'] = json.loads(sale['items'])
+            sales.append(sale)
+        return sales
+
+    def get_pending_count(self):
+        """Count the journaled sales not on the server yet, quarantined ones included"""
+        with self.connect() as connection:
+            return connection.execute(
+                "SELECT COUNT(*) FROM sales_journal WHERE replayed_at IS NULL"
+            ).fetchone()[0]
+
+    def quarantine_sale(self, sale, error):
+        """Keep a sale the server refused out of the replay, with the error it raised"""
+        with self.connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO failed_replays (local_id, error, failed_at) VALUES (?, ?, ?)",
+                (sale['local_id'], error, datetime.now().isoformat(timespec='seconds'))
+            )
+        logging.error(f"Offline sale {sale['invoice_number']} quarantined, the server refused it: {error}")
+
+    def get_failed_sales(self):
+        """Get the quarantined sales as dicts with invoice_number, sale_date, error and failed_at"""
+        with self.connect() as connection:
+            rows = connection.execute("""
+                SELECT j.invoice_number, j.sale_date, f.error, f.failed_at
+                FROM failed_replays f
+                JOIN sales_journal j ON j.local_id = f.local_id
+                WHERE j.replayed_at IS NULL
+                ORDER BY f.local_id
+            """).fetchall()
+        return [dict(zip(('invoice_number', 'sale_date', 'error', 'failed_at'), row)) for row in rows]
+
+    def release_failed_sales(self):
+        """Give the quarantined sales another try, e.g. after the data they needed was fixed"""
+        with self.connect() as connection:
+            connection.execute("DELETE FROM failed_replays")
+
+    def mark_replayed(self, recorded):
+        """Mark journaled sales as replayed; `recorded` maps idempotency key to sale_id"""
+        replayed_at = datetime.now().isoformat(timespec='seconds')
+        with self.connect() as connection:
+            connection.executemany(
+                "UPDATE sales_journal SET replayed_at = ?, sale_id = ? WHERE idempotency_key = ?",
+                [(replayed_at, sale_id, key) for key, sale_id in recorded.items()]
+            )
+
+    def add_conflicts(self, conflicts):
+        """Keep the stock conflicts found while replaying for the user to review"""
+        detected_at = datetime.now().isoformat(timespec='seconds')
+        with self.connect() as connection:
+            connection.executemany("""
+                INSERT INTO replay_conflicts
+                (product_id, product_name, requested, available, invoices, detected_at)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """, [(c['product_id'], c['product_name'], c['requested'], c['available'],
+                   ", ".join(c['invoices']), detected_at) for c in conflicts])
+
+    # Audit spill
+
+    def spill_audit_entries(self, entries):
+        """Keep audit entries the server could not take, so none are lost"""
+        with self.connect() as connection:
+            connection.executemany(
+                "INSERT INTO audit_spill (entry) VALUES (?)",
+                [(json.dumps(entry, default=str),) for entry in entries]
+            )
+
+    def get_spilled_audit_entries(self, limit=500):
+        """Get the oldest spilled audit entries as (last spill_id, entries)"""
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT spill_id, entry FROM audit_spill ORDER BY spill_id LIMIT ?", (limit,)
+            ).fetchall()
+        if not rows:
+            return None, []
+        return rows[-1][0], [json.loads(entry) for _, entry in rows]
+
+    def delete_spilled_audit_entries(self, up_to_id):
+        """Forget spilled audit entries once they are on the server"""
+        with self.connect() as connection:
+            connection.execute("DELETE FROM audit_spill WHERE spill_id <= ?", (up_to_id,))
+
+    def replay_pending(self, sale_model, batch_size=500):
+        """
+        Replay every journaled sale to PostgreSQL in batches
+
+        Each batch is written with bulk inserts in one transaction by
+        SaleModel.replay_offline_sales, then marked replayed locally. When the
+        server refuses a batch (a user deleted since, bad data...) it is split
+        in halves until the sales at fault are found; those are quarantined so
+        the rest still gets through. A lost connection stops the replay; what
+        was not marked is retried next time.
+
+        Returns:
+        - list: [replayed sale count, list of stock conflict dicts,
+          list of quarantined sales still waiting (see get_failed_sales)]
+        """
+        replayed = 0
+        conflicts = []
+        quarantined = 0
+        while True:
+            batch = self.get_pending_sales(batch_size)
+            if not batch:
+                break
+            recorded, failed = self.replay_batch(sale_model, batch, conflicts)
+            replayed += recorded
+            quarantined += failed
+            # Anything left unmarked would come back in the same batch forever
+            if len(batch) < batch_size or recorded + failed < len(batch):
+                break
+
+        if replayed or quarantined:
+            logging.info(f"Replayed {replayed} offline sales ({len(conflicts)} stock conflicts, "
+                         f"{quarantined} quarantined)")
+        return [replayed, conflicts, self.get_failed_sales()]
+
+    def replay_batch(self, sale_model, batch, conflicts):
+        """
+        Replay one batch, bisecting it when the server refuses it
+
+        Returns:
+        - tuple: (sales marked replayed, sales quarantined)
+        """
+        try:
+            result = sale_model.replay_offline_sales(batch)
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            # The server is gone again, not refusing the data; try the whole batch later
+            raise
+        except Exception as e:
+            if len(batch) == 1:
+                self.quarantine_sale(batch[0], str(e).strip())
+                return 0, 1
+            middle = len(batch) // 2
+            first = self.replay_batch(sale_model, batch[:middle], conflicts)
+            second = self.replay_batch(sale_model, batch[middle:], conflicts)
+            return first[0] + second[0], first[1] + second[1]
+
+        self.mark_replayed(result['recorded'])
+        if result['conflicts']:
+            self.add_conflicts(result['conflicts'])
+            conflicts.extend(result['conflicts'])
+        return len(result['recorded']), 0
+
+
+def get_offline_store():
+    """Get the application-wide offline store"""
+    global _store
+    if _store is None:
+        _store = OfflineStore()
+    return _store
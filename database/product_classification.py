@@ -0,0 +1,170 @@
+"""
+ABC/XYZ classification of the products sold in a date range.
+
+ABC ranks products by their share of revenue: the products making up the
+first 80% of revenue are A, the next 15% B and the rest C. XYZ rates how
+steady their demand is, by the coefficient of variation (standard deviation
+over mean) of the units sold per period, periods without sales counting as
+zero: X up to 0.5, Y up to 1.0, Z above (or with too few periods to tell).
+
+One aggregate query brings back units and revenue per product and period;
+the shares, running totals and variations are then worked out for every
+product at once with NumPy, so the full sale history costs one scan and no
+per-product queries. Results are kept in the report cache per date range
+and period length.
+"""
+import logging
+import math
+
+import numpy as np
+
+from database.report_cache import as_date, get_report_cache
+from database.sales_partitions import sale_date_range
+
+ABC_LIMITS = (('A', 0.80), ('B', 0.95))
+XYZ_LIMITS = (('X', 0.5), ('Y', 1.0))
+DEFAULT_PERIOD_DAYS = 7
+
+
+def load_product_periods(db, date_from, date_to, period_days=DEFAULT_PERIOD_DAYS):
+    """
+    Get units and revenue per product and period, from completed sales
+
+    Returns:
+    - tuple: NumPy arrays (product_id, period index, units, revenue)
+    """
+    sales_range, params = sale_date_range("s", date_from, date_to)
+    items_range, item_params = sale_date_range("si", date_from, date_to)
+    rows = db.execute_query(f"""
+        SELECT si.product_id, (si.sale_date::date - %s::date) / %s, SUM(si.quantity), SUM(si.subtotal)
+        FROM sale_items si
+        JOIN sales s ON s.sale_id = si.sale_id AND s.sale_date = si.sale_date
+        WHERE s.status = 'Completed' AND {sales_range} AND {items_range}
+        GROUP BY 1, 2
+    """, [date_from, period_days] + params + item_params, fetchall=True) or []
+    return (
+        np.array([row[0] for row in rows], dtype=np.int64),
+        np.array([row[1] for row in rows], dtype=np.int64),
+        np.array([row[2] for row in rows], dtype=np.float64),
+        np.array([float(row[3]) for row in rows], dtype=np.float64)
+    )
+
+
+def classify_products(product, units, revenue, periods):
+    """
+    Work out the ABC and XYZ class of every product at once
+
+    Parameters:
+    - product, units, revenue: One entry per (product, period) with sales
+    - periods: Number of periods in the range
+
+    Returns:
+    - dict: NumPy arrays, one entry per product ordered by revenue, largest
+      first: product_id, revenue, share, cumulative_share, quantity, mean
+      (units per period), cv (inf without sales), abc and xyz
+    """
+    product_ids, index = np.unique(product, return_inverse=True)
+    count = len(product_ids)
+
+    product_revenue = np.bincount(index, weights=revenue, minlength=count)
+    quantity = np.bincount(index, weights=units, minlength=count)
+    mean = quantity / periods
+    mean_square = np.bincount(index, weights=units * units, minlength=count) / periods
+    std = np.sqrt(np.maximum(mean_square - mean * mean, 0))
+    cv = np.divide(std, mean, out=np.full(count, np.inf), where=mean > 0)
+
+    order = np.argsort(-product_revenue, kind='stable')
+    product_revenue = product_revenue[order]
+    total = product_revenue.sum()
+    share = product_revenue / total if total else np.zeros(count)
+    cumulative_share = np.cumsum(share)
+    # A product is classed by the share reached before it, so the one crossing a limit still belongs above it
+    reached = cumulative_share - share
+
+    abc = np.full(count, 'C')
+    for label, limit in reversed(ABC_LIMITS):
+        abc[reached < limit] = label
+    abc[product_revenue <= 0] = 'C'
+
+    cv = cv[order]
+    xyz = np.full(count, 'Z')
+    for label, limit in reversed(XYZ_LIMITS):
+        xyz[cv <= limit] = label
+    if periods < 2:
+        xyz[:] = 'Z'
+
+    return {
+        'product_id': product_ids[order],
+        'revenue': product_revenue,
+        'share': share,
+        'cumulative_share': cumulative_share,
+        'quantity': quantity[order],
+        'mean': mean[order],
+        'cv': cv,
+        'abc': abc,
+        'xyz': xyz
+    }
+
+
+def get_product_classification(db, date_from, date_to, period_days=DEFAULT_PERIOD_DAYS, refresh=False):
+    """
+    Get the ABC/XYZ classification of the products sold from date_from to date_to
+
+    Parameters:
+    - db: DatabaseConnection
+    - date_from, date_to: Dates or 'YYYY-MM-DD' strings, both included
+    - period_days: Length of the periods demand variability is measured over
+    - refresh: Reclassify even if this range is already cached
+
+    Returns:
+    - dict: periods, period_days, total_revenue, matrix (product count per
+      class pair such as 'AX') and products, a list of (product_id,
+      product_name, revenue, share, cumulative_share, quantity, mean, cv,
+      class) tuples ordered by revenue, largest first
+    """
+    cache = get_report_cache()
+    key = cache.make_key(('product_classification', period_days), date_from, date_to)
+    return cache.get_or_load(key, lambda: classify_sales(db, date_from, date_to, period_days), refresh)
+
+
+def classify_sales(db, date_from, date_to, period_days=DEFAULT_PERIOD_DAYS):
+    """Load and classify the sales of a range; see get_product_classification"""
+    try:
+        days = (as_date(date_to) - as_date(date_from)).days + 1
+        periods = max(math.ceil(days / period_days), 1)
+
+        product, _, units, revenue = load_product_periods(db, date_from, date_to, period_days)
+        classes = classify_products(product, units, revenue, periods)
+
+        product_ids = classes['product_id'].tolist()
+        names = dict(db.execute_query(
+            "SELECT product_id, product_name FROM products WHERE product_id = ANY(%s)",
+            (product_ids,), fetchall=True
+        ) or [])
+
+        labels = np.char.add(classes['abc'], classes['xyz']).tolist()
+        matrix = {abc + xyz: 0 for abc in "ABC" for xyz in "XYZ"}
+        for label in labels:
+            matrix[label] += 1
+
+        products = list(zip(
+            product_ids,
+            [names.get(product_id, f"Product #{product_id}") for product_id in product_ids],
+            classes['revenue'].tolist(),
+            classes['share'].tolist(),
+            classes['cumulative_share'].tolist(),
+            classes['quantity'].astype(np.int64).tolist(),
+            classes['mean'].tolist(),
+            classes['cv'].tolist(),
+            labels
+        ))
+        return {
+            'periods': periods,
+            'period_days': period_days,
+            'total_revenue': float(classes['revenue'].sum()),
+            'matrix': matrix,
+            'products': products
+        }
+    except Exception as e:
+        logging.error(f"Error classifying products: {e}")
+        raise
@@ -0,0 +1,182 @@
+"""
+Running totals of the units each product sold.
+
+product_sales_running holds one row per product and day with sales: the
+units sold that day, and the units and squared daily units sold up to and
+including that day. The sums over any range of days are then the
+difference of two rows per product, so the reorder planner reads two index
+entries per product however long its sales window is, instead of every sale
+item of the window.
+
+Triggers keep it current as the daily sales rollup's do: items inserted for
+a completed sale are added, deleted items and voided sales are subtracted.
+A change on a past day (a void, a replayed offline sale) also moves the
+totals of every later row of that product. Checkouts and voids lock their
+products before their items are written, so the rows of a product are only
+ever updated by one transaction at a time.
+"""
+import logging
+
+
+def create_product_sales_running(db):
+    """
+    Create the per-product running totals and the triggers keeping them current
+
+    The totals are filled from the existing sales when the triggers are first
+    created.
+    """
+    with db.transaction() as cursor:
+        # The totals are included in the key so the planner's lookups are index-only
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS product_sales_running (
+                product_id INTEGER NOT NULL,
+                sale_day DATE NOT NULL,
+                units BIGINT NOT NULL,
+                units_to_date BIGINT NOT NULL,
+                squares_to_date BIGINT NOT NULL,
+                PRIMARY KEY (product_id, sale_day) INCLUDE (units_to_date, squares_to_date)
+            )
+        """)
+        # Changes are applied in (product, day) order; each one moves the totals of
+        # its day and every later day of the product
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION product_sales_running_apply(
+                p_products INTEGER[], p_days DATE[], p_units BIGINT[]
+            ) RETURNS void AS $$
+            DECLARE
+                i INTEGER;
+                day_units BIGINT;
+            BEGIN
+                FOR i IN 1 .. COALESCE(array_length(p_products, 1), 0) LOOP
+                    SELECT units INTO day_units FROM product_sales_running
+                    WHERE product_id = p_products[i] AND sale_day = p_days[i]
+                    FOR UPDATE;
+                    IF NOT FOUND THEN
+                        -- A new day starts from the totals of the product's previous day
+                        INSERT INTO product_sales_running
+                        (product_id, sale_day, units, units_to_date, squares_to_date)
+                        SELECT p_products[i], p_days[i], 0,
+                               COALESCE(MAX(r.units_to_date), 0), COALESCE(MAX(r.squares_to_date), 0)
+                        FROM (
+                            SELECT units_to_date, squares_to_date FROM product_sales_running
+                            WHERE product_id = p_products[i] AND sale_day < p_days[i]
+                            ORDER BY sale_day DESC
+                            LIMIT 1
+                        ) r;
+                        day_units := 0;
+                    END IF;
+                    UPDATE product_sales_running
+                    SET units = units + CASE WHEN sale_day = p_days[i] THEN p_units[i] ELSE 0 END,
+                        units_to_date = units_to_date + p_units[i],
+                        squares_to_date = squares_to_date
+                            + (day_units + p_units[i]) * (day_units + p_units[i]) - day_units * day_units
+                    WHERE product_id = p_products[i] AND sale_day >= p_days[i];
+                END LOOP;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION product_sales_running_items() RETURNS trigger AS $$
+            DECLARE
+                products INTEGER[];
+                days DATE[];
+                units BIGINT[];
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    SELECT array_agg(product_id ORDER BY product_id, sale_day),
+                           array_agg(sale_day ORDER BY product_id, sale_day),
+                           array_agg(quantity ORDER BY product_id, sale_day)
+                    INTO products, days, units
+                    FROM (
+                        SELECT n.product_id, s.sale_date::date AS sale_day, SUM(n.quantity) AS quantity
+                        FROM new_items n
+                        JOIN sales s ON s.sale_id = n.sale_id AND s.sale_date = n.sale_date
+                        WHERE s.status = 'Completed'
+                        GROUP BY 1, 2
+                    ) changes;
+                ELSE
+                    SELECT array_agg(product_id ORDER BY product_id, sale_day),
+                           array_agg(sale_day ORDER BY product_id, sale_day),
+                           array_agg(-quantity ORDER BY product_id, sale_day)
+                    INTO products, days, units
+                    FROM (
+                        SELECT o.product_id, s.sale_date::date AS sale_day, SUM(o.quantity) AS quantity
+                        FROM old_items o
+                        JOIN sales s ON s.sale_id = o.sale_id AND s.sale_date = o.sale_date
+                        WHERE s.status = 'Completed'
+                        GROUP BY 1, 2
+                    ) changes;
+                END IF;
+                PERFORM product_sales_running_apply(products, days, units);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION product_sales_running_void() RETURNS trigger AS $$
+            DECLARE
+                products INTEGER[];
+                units BIGINT[];
+            BEGIN
+                SELECT array_agg(product_id ORDER BY product_id), array_agg(-quantity ORDER BY product_id)
+                INTO products, units
+                FROM (
+                    SELECT si.product_id, SUM(si.quantity) AS quantity
+                    FROM sale_items si
+                    WHERE si.sale_id = NEW.sale_id AND si.sale_date = NEW.sale_date
+                    GROUP BY 1
+                ) changes;
+                PERFORM product_sales_running_apply(
+                    products, array_fill(NEW.sale_date::date, ARRAY[COALESCE(array_length(products, 1), 0)]), units
+                );
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+
+        cursor.execute("""
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'sale_items_running_insert' AND tgrelid = 'sale_items'::regclass
+        """)
+        if cursor.fetchone():
+            return
+
+        cursor.execute("""
+            CREATE TRIGGER sale_items_running_insert
+            AFTER INSERT ON sale_items
+            REFERENCING NEW TABLE AS new_items
+            FOR EACH STATEMENT EXECUTE PROCEDURE product_sales_running_items()
+        """)
+        cursor.execute("""
+            CREATE TRIGGER sale_items_running_delete
+            AFTER DELETE ON sale_items
+            REFERENCING OLD TABLE AS old_items
+            FOR EACH STATEMENT EXECUTE PROCEDURE product_sales_running_items()
+        """)
+        cursor.execute("""
+            CREATE TRIGGER sales_running_void
+            AFTER UPDATE OF status ON sales
+            FOR EACH ROW
+            WHEN (OLD.status = 'Completed' AND NEW.status <> 'Completed')
+            EXECUTE PROCEDURE product_sales_running_void()
+        """)
+        rows = fill_product_sales_running(cursor)
+        logging.info(f"Product sales running totals created and filled ({rows} rows)")
+
+
+def fill_product_sales_running(cursor):
+    """Fill the empty running totals from every completed sale"""
+    cursor.execute("""
+        INSERT INTO product_sales_running (product_id, sale_day, units, units_to_date, squares_to_date)
+        SELECT product_id, sale_day, units,
+               SUM(units) OVER running, SUM(units * units) OVER running
+        FROM (
+            SELECT si.product_id, s.sale_date::date AS sale_day, SUM(si.quantity) AS units
+            FROM sales s
+            JOIN sale_items si ON si.sale_id = s.sale_id AND si.sale_date = s.sale_date
+            WHERE s.status = 'Completed'
+            GROUP BY 1, 2
+        ) daily
+        WINDOW running AS (PARTITION BY product_id ORDER BY sale_day)
+    """)
+    return cursor.rowcount
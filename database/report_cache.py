@@ -0,0 +1,213 @@
+"""
+In-memory cache of report results.
+
+Entries are keyed by the report name and its normalized filters, and evicted
+least recently used first once their estimated size passes the memory
+budget. A range of closed days can't change unless a sale in it is voided,
+so such entries are kept until evicted; ranges that include today are
+dropped when a sale is made or voided here, and also expire after
+today_ttl_seconds since other terminals sell too. Changes to closed days
+(voids, offline sales replayed, rollup rebuilds) are broadcast with
+notify_sales_changed, and every terminal listening drops its own entries
+for those days in sales_changed_elsewhere.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+from configparser import ConfigParser
+from datetime import date, datetime
+
+_cache = None
+_cache_lock = threading.Lock()
+
+INVALIDATION_CHANNEL = "sales_changed"
+# NOTIFY payloads must stay under 8000 bytes; longer lists of days become 'all'
+MAX_NOTIFY_DAYS = 500
+
+
+def estimate_size(value):
+    """Estimate the memory held by a result made of lists, tuples, dicts and scalars"""
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        size += sum(estimate_size(k) + estimate_size(v) for k, v in value.items())
+    elif isinstance(value, (list, tuple)):
+        size += sum(estimate_size(item) for item in value)
+    return size
+
+
+def as_date(value):
+    """Accept a date, a datetime or an ISO string starting with 'YYYY-MM-DD'"""
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, str):
+        return datetime.strptime(value[:10], "%Y-%m-%d").date()
+    return value
+
+
+class ReportCache:
+    """LRU cache of report results with a memory budget"""
+
+    def __init__(self, budget_bytes=32 * 1024 * 1024, today_ttl_seconds=60):
+        self.budget_bytes = budget_bytes
+        self.today_ttl_seconds = today_ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def make_key(self, report, date_from, date_to, payment_method=None, med_type=None, category=None):
+        """
+        Build the cache key of a report
+
+        Dates are normalized to date objects, so '2025-01-31' and
+        date(2025, 1, 31) give the same key.
+        """
+        return (report, as_date(date_from), as_date(date_to), payment_method or None,
+                med_type, category or None)
+
+    def get(self, key):
+        """Get a cached result, or None on a miss"""
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and not self.is_fresh(entry):
+                self.drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry['value']
+
+    def put(self, key, value):
+        """Store a result; results larger than the whole budget are not kept"""
+        size = estimate_size(value)
+        date_from, date_to = key[1], key[2]
+        today = date.today()
+        with self.lock:
+            if key in self.entries:
+                self.drop(key)
+            if size > self.budget_bytes:
+                return
+            self.entries[key] = {
+                'value': value,
+                'size': size,
+                'first_day': date_from,
+                'last_day': date_to,
+                # Set while the range still includes an open day
+                'open_day': today if date_to >= today else None,
+                'stored_at': time.monotonic()
+            }
+            self.size_bytes += size
+            while self.size_bytes > self.budget_bytes:
+                oldest = next(iter(self.entries))
+                self.drop(oldest)
+                self.evictions += 1
+
+    def get_or_load(self, key, load, refresh=False):
+        """Get a cached result, calling load() to produce and store it on a miss"""
+        value = None if refresh else self.get(key)
+        if value is None:
+            value = load()
+            self.put(key, value)
+        return value
+
+    def is_fresh(self, entry):
+        if entry['open_day'] is None:
+            return True
+        return (entry['open_day'] == date.today()
+                and time.monotonic() - entry['stored_at'] < self.today_ttl_seconds)
+
+    def drop(self, key):
+        entry = self.entries.pop(key)
+        self.size_bytes -= entry['size']
+
+    def invalidate_days(self, days):
+        """Drop every entry whose date range includes one of `days`"""
+        days = {as_date(day) for day in days}
+        with self.lock:
+            stale = [key for key, entry in self.entries.items()
+                     if any(entry['first_day'] <= day <= entry['last_day'] for day in days)]
+            for key in stale:
+                self.drop(key)
+            self.invalidations += len(stale)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.size_bytes = 0
+
+    def stats(self):
+        """Get hit, miss, eviction and size counters"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+                'entries': len(self.entries),
+                'size_bytes': self.size_bytes,
+                'budget_bytes': self.budget_bytes
+            }
+
+
+def get_report_cache():
+    """Get the application-wide report cache, configured from [reports] in config.ini"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            config = ConfigParser()
+            config.read(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.ini'))
+            _cache = ReportCache(
+                config.getint('reports', 'cache_budget_mb', fallback=32) * 1024 * 1024,
+                config.getint('reports', 'today_ttl_seconds', fallback=60)
+            )
+        return _cache
+
+
+def notify_sales_changed(cursor, days=None):
+    """
+    Tell every terminal which closed days of sales the current transaction changes
+
+    The notification goes out when the transaction commits, so nothing is
+    sent for a change that rolls back. Today's entries expire on their own,
+    so only earlier days are sent, and a checkout never pays for a NOTIFY.
+
+    Parameters:
+    - cursor: Cursor of the transaction making the change
+    - days: Days changed; every day if omitted
+    """
+    if days is None:
+        payload = "all"
+    else:
+        today = date.today()
+        closed = sorted({day for day in map(as_date, days) if day < today})
+        if not closed:
+            return
+        payload = "all" if len(closed) > MAX_NOTIFY_DAYS else ",".join(day.isoformat() for day in closed)
+    cursor.execute("SELECT pg_notify(%s, %s)", (INVALIDATION_CHANNEL, payload))
+
+
+def sales_changed_elsewhere(payload):
+    """Drop the cached reports named by a notify_sales_changed payload"""
+    if payload == "all":
+        get_report_cache().clear()
+    else:
+        get_report_cache().invalidate_days(payload.split(","))
+
+
+def sales_changed(days):
+    """Drop the cached reports covering the days of sales just made or voided"""
+    try:
+        get_report_cache().invalidate_days(days)
+    except Exception as e:
+        # A stale report must never fail a checkout
+        logging.error(f"Error invalidating report cache: {e}")
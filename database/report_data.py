@@ -0,0 +1,72 @@
+"""
+Report data shared by the charts of one report.
+
+The sales report draws several charts from the same filters. SalesReportData
+loads all of their totals in one query per filter combination and keeps them
+in the report cache, so switching between charts, or back to filters used
+before, never goes back to the database. ProductRankingData does the same
+for the pages of the product rankings.
+"""
+from database.models import SaleModel
+from database.report_cache import get_report_cache
+
+
+class SalesReportData:
+    """Totals behind the sales charts, loaded once per filter combination"""
+
+    def __init__(self, sale_model=None):
+        self.sale_model = sale_model or SaleModel()
+        self.cache = get_report_cache()
+
+    def get(self, date_from, date_to, payment_method=None, is_generic=None, refresh=False):
+        """
+        Get the sales chart totals for the given filters
+
+        Parameters:
+        - date_from, date_to: Dates or 'YYYY-MM-DD' strings, both included
+        - payment_method: Optional payment method filter
+        - is_generic: True for generic, False for branded, None for both
+        - refresh: Reload even if these filters are already cached
+
+        Returns:
+        - dict: as returned by SaleModel.get_sales_report_totals
+        """
+        key = self.cache.make_key('sales_totals', date_from, date_to, payment_method, is_generic)
+        return self.cache.get_or_load(
+            key,
+            lambda: self.sale_model.get_sales_report_totals(date_from, date_to, payment_method, is_generic),
+            refresh
+        )
+
+
+class ProductRankingData:
+    """Pages of the product rankings, loaded once per filter combination"""
+
+    def __init__(self, sale_model=None):
+        self.sale_model = sale_model or SaleModel()
+        self.cache = get_report_cache()
+
+    def get(self, date_from, date_to, metric='units', slow_movers=False, category_id=None,
+            page=0, page_size=25, refresh=False):
+        """
+        Get one page of the product rankings
+
+        Pages of closed days are kept until evicted; pages including today
+        follow the report cache's rules for open days.
+
+        Parameters:
+        - page: Page number, starting at 0
+        - other parameters: as for SaleModel.get_product_rankings
+
+        Returns:
+        - dict: as returned by SaleModel.get_product_rankings
+        """
+        key = self.cache.make_key(('product_rankings', metric, slow_movers, page, page_size),
+                                  date_from, date_to, category=category_id)
+        return self.cache.get_or_load(
+            key,
+            lambda: self.sale_model.get_product_rankings(
+                date_from, date_to, metric, slow_movers, category_id, page_size, page * page_size
+            ),
+            refresh
+        )
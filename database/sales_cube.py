@@ -0,0 +1,242 @@
+"""
+Columnar in-memory sales cube for interactive analysis.
+
+SalesCube loads the completed sale lines of a date range once into NumPy
+column arrays; filtering, grouping and totals then run vectorized in memory,
+without going back to the database however often the slice changes.
+
+Memory: each sale line takes 26 bytes (day offset, product id and category
+id as int32, quantity as int32, subtotal as float64, medication type as a
+bool and payment method as an int8 code), so a million lines take about
+26 MB. Each filter adds a 1 byte per line mask, and a group-by briefly needs
+up to about 20 bytes per selected line. Lines are streamed from a
+server-side cursor CHUNK_ROWS at a time into preallocated arrays, and a
+range with more lines than [reports] cube_max_rows (2,000,000 by default,
+about 52 MB) is refused rather than loaded.
+"""
+import logging
+import os
+from configparser import ConfigParser
+from datetime import timedelta
+
+import numpy as np
+
+from database.report_cache import as_date
+from database.sales_partitions import sale_date_range
+
+CHUNK_ROWS = 10000
+BYTES_PER_ROW = 26
+DIMENSIONS = {
+    'day': "Day",
+    'payment_method': "Payment Method",
+    'category': "Category",
+    'type': "Medication Type",
+    'product': "Product"
+}
+
+
+def get_max_rows():
+    """Get the largest number of sale lines a cube may hold, from [reports] in config.ini"""
+    config = ConfigParser()
+    config.read(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.ini'))
+    return config.getint('reports', 'cube_max_rows', fallback=2000000)
+
+
+class SalesCube:
+    """Sale lines of a date range held as NumPy columns"""
+
+    def __init__(self, date_from, date_to, size):
+        self.date_from = as_date(date_from)
+        self.date_to = as_date(date_to)
+        self.day = np.zeros(size, dtype=np.int32)
+        self.product = np.zeros(size, dtype=np.int32)
+        self.category = np.zeros(size, dtype=np.int32)
+        self.is_generic = np.zeros(size, dtype=np.bool_)
+        self.quantity = np.zeros(size, dtype=np.int32)
+        self.subtotal = np.zeros(size, dtype=np.float64)
+        self.payment = np.zeros(size, dtype=np.int8)
+        self.payment_methods = []
+        self.categories = {}
+        self.products = {}
+
+    @classmethod
+    def load(cls, db, date_from, date_to, max_rows=None):
+        """
+        Load the completed sale lines from date_from to date_to
+
+        Parameters:
+        - db: DatabaseConnection
+        - date_from, date_to: Dates or 'YYYY-MM-DD' strings, both included
+        - max_rows: Largest number of lines accepted; [reports] cube_max_rows if omitted
+
+        Returns:
+        - SalesCube
+
+        Raises:
+        - ValueError: if the range holds more than max_rows lines
+        """
+        max_rows = max_rows or get_max_rows()
+        sales_range, params = sale_date_range("s", date_from, date_to)
+        items_range, item_params = sale_date_range("si", date_from, date_to)
+        params += item_params
+        facts = f"""
+            FROM sale_items si
+            JOIN sales s ON s.sale_id = si.sale_id AND s.sale_date = si.sale_date
+            LEFT JOIN products p ON p.product_id = si.product_id
+            WHERE s.status = 'Completed' AND {sales_range} AND {items_range}
+        """
+
+        with db.transaction() as cursor:
+            # The count and the lines must come from the same snapshot
+            cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+            cursor.execute(f"SELECT COUNT(*) {facts}", params)
+            size = cursor.fetchone()[0]
+            if size > max_rows:
+                raise ValueError(
+                    f"{size} sale lines in this range, more than the {max_rows} an analysis can hold "
+                    f"(about {max_rows * BYTES_PER_ROW // 1000000} MB); choose a shorter range"
+                )
+
+            cube = cls(date_from, date_to, size)
+            payment_codes = {}
+            lines = cursor.connection.cursor(name="sales_cube")
+            try:
+                lines.execute(f"""
+                    SELECT si.sale_date::date - %s::date, si.product_id, COALESCE(p.category_id, 0),
+                           COALESCE(si.is_generic, FALSE), si.quantity, si.subtotal,
+                           COALESCE(s.payment_method, '')
+                    {facts}
+                """, [date_from] + params)
+                start = 0
+                while True:
+                    rows = lines.fetchmany(CHUNK_ROWS)
+                    if not rows:
+                        break
+                    end = start + len(rows)
+                    day, product, category, is_generic, quantity, subtotal, payment = zip(*rows)
+                    cube.day[start:end] = day
+                    cube.product[start:end] = product
+                    cube.category[start:end] = category
+                    cube.is_generic[start:end] = is_generic
+                    cube.quantity[start:end] = quantity
+                    cube.subtotal[start:end] = [float(value) for value in subtotal]
+                    cube.payment[start:end] = [
+                        payment_codes.setdefault(method, len(payment_codes)) for method in payment
+                    ]
+                    start = end
+            finally:
+                lines.close()
+
+            cube.payment_methods = list(payment_codes)
+            cursor.execute(
+                "SELECT product_id, product_name FROM products WHERE product_id = ANY(%s)",
+                (np.unique(cube.product).tolist(),)
+            )
+            cube.products = dict(cursor.fetchall())
+            cursor.execute(
+                "SELECT category_id, name FROM categories WHERE category_id = ANY(%s)",
+                (np.unique(cube.category).tolist(),)
+            )
+            cube.categories = dict(cursor.fetchall())
+
+        logging.info(f"Sales cube loaded: {size} lines, {cube.nbytes() / 1000000:.1f} MB")
+        return cube
+
+    def __len__(self):
+        return len(self.day)
+
+    def nbytes(self):
+        """Get the memory held by the column arrays"""
+        return sum(column.nbytes for column in (
+            self.day, self.product, self.category, self.is_generic,
+            self.quantity, self.subtotal, self.payment
+        ))
+
+    def select(self, payment_method=None, is_generic=None, category_id=None, product_id=None):
+        """
+        Get the mask of the lines matching every given filter
+
+        Parameters:
+        - payment_method: Optional payment method
+        - is_generic: True for generic, False for branded, None for both
+        - category_id, product_id: Optional category and product
+
+        Returns:
+        - numpy.ndarray: bool per line
+        """
+        mask = np.ones(len(self), dtype=np.bool_)
+        if payment_method is not None:
+            if payment_method not in self.payment_methods:
+                return np.zeros(len(self), dtype=np.bool_)
+            mask &= self.payment == self.payment_methods.index(payment_method)
+        if is_generic is not None:
+            mask &= self.is_generic == is_generic
+        if category_id is not None:
+            mask &= self.category == category_id
+        if product_id is not None:
+            mask &= self.product == product_id
+        return mask
+
+    def totals(self, mask=None):
+        """Get the number of lines, quantity and amount of the selected lines"""
+        if mask is None:
+            mask = np.ones(len(self), dtype=np.bool_)
+        return {
+            'lines': int(np.count_nonzero(mask)),
+            'quantity': int(self.quantity[mask].sum()),
+            'amount': float(self.subtotal[mask].sum())
+        }
+
+    def group_by(self, dimension, mask=None):
+        """
+        Get the quantity and amount of the selected lines per value of a dimension
+
+        Parameters:
+        - dimension: One of DIMENSIONS
+        - mask: Lines to include, as returned by select(); all lines if omitted
+
+        Returns:
+        - list: (label, quantity, amount) tuples, by day for 'day' and by
+          amount, largest first, otherwise
+        """
+        if mask is None:
+            mask = np.ones(len(self), dtype=np.bool_)
+        quantity = self.quantity[mask]
+        amount = self.subtotal[mask]
+
+        if dimension == 'day':
+            days = (self.date_to - self.date_from).days + 1
+            quantities = np.bincount(self.day[mask], weights=quantity, minlength=days)
+            amounts = np.bincount(self.day[mask], weights=amount, minlength=days)
+            return [
+                (self.date_from + timedelta(days=offset), int(quantities[offset]), float(amounts[offset]))
+                for offset in range(days)
+            ]
+
+        if dimension == 'payment_method':
+            keys, labels = self.payment[mask], self.payment_methods
+        elif dimension == 'type':
+            keys, labels = self.is_generic[mask].astype(np.int8), ["Branded", "Generic"]
+        elif dimension == 'category':
+            keys, labels = self.category[mask], None
+        elif dimension == 'product':
+            keys, labels = self.product[mask], None
+        else:
+            raise ValueError(f"Unknown dimension: {dimension}")
+
+        values, groups = np.unique(keys, return_inverse=True)
+        quantities = np.bincount(groups, weights=quantity, minlength=len(values))
+        amounts = np.bincount(groups, weights=amount, minlength=len(values))
+        order = np.argsort(-amounts, kind='stable')
+
+        result = []
+        for index in order:
+            value = int(values[index])
+            if labels is not None:
+                label = labels[value] or "Unspecified"
+            elif dimension == 'category':
+                label = self.categories.get(value, "Uncategorized")
+            else:
+                label = self.products.get(value, f"Product #{value}")
+            result.append((label, int(quantities[index]), float(amounts[index])))
+        return result
@@ -0,0 +1,316 @@
+"""
+Monthly range partitioning of sales and sale_items.
+
+Both tables are partitioned by month on sale_date (sales_y2025m01,
+sale_items_y2025m01, ...), with a default partition as a safety net. Items
+carry the sale_date of their sale, so a date-ranged report prunes both sides
+of the join to the months it covers. Partitions are created a year ahead at
+every start. Converting existing tables is a one-off migration run by
+migrate_sales.py; the application refuses to start until it has been done.
+
+A unique index on a partitioned table has to include the partition key, so
+invoice numbers and idempotency keys are kept unique across all months by the
+sale_keys table, which a trigger fills as sales are inserted.
+"""
+import logging
+from datetime import date
+
+from database.audit_partitions import month_start, add_months
+
+PARTITIONED_TABLES = ("sales", "sale_items")
+
+
+def partition_name(table, month):
+    return f"{table}_y{month.year}m{month.month:02d}"
+
+
+def default_partition(table):
+    return f"{table}_default"
+
+
+def is_partitioned(cursor, table):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table,))
+    return cursor.fetchone()[0] == 'p'
+
+
+def sales_migration_pending(db):
+    """Tell whether sales still has to be converted to partitions by migrate_sales.py"""
+    with db.transaction() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('sales')")
+        row = cursor.fetchone()
+    return row is not None and row[0] != 'p'
+
+
+def sale_date_range(alias, date_from, date_to):
+    """
+    Get the condition selecting rows of `alias` sold from date_from to date_to
+
+    The range is half-open on sale_date itself rather than sale_date::date,
+    so PostgreSQL only scans the monthly partitions it overlaps.
+
+    Parameters:
+    - alias: Alias of sales or sale_items in the query
+    - date_from, date_to: Dates or 'YYYY-MM-DD' strings, both included
+
+    Returns:
+    - tuple: (SQL condition, list of parameters)
+    """
+    return (f"{alias}.sale_date >= %s::date AND {alias}.sale_date < %s::date + 1",
+            [date_from, date_to])
+
+
+def create_month_partitions(cursor, month):
+    """
+    Create the partitions of sales and sale_items for one month if they don't exist
+
+    PostgreSQL refuses a new partition whose range has rows in the default
+    partition, so rows the defaults caught for that month are moved into the
+    new partitions. The default of sales can't be detached while sale_items
+    references its rows, so the rows are set aside in temporary tables,
+    deleted from the defaults (items first) and inserted into the new
+    partitions (sales first) instead. Statements on a partition don't fire
+    the statement triggers of its parent table, so the daily sales rollup
+    is left alone; the row trigger keeping sale_keys removes and re-adds
+    the moved sales.
+
+    Returns:
+    - list: Tables whose partition was created
+    """
+    missing = []
+    for table in PARTITIONED_TABLES:
+        cursor.execute("SELECT to_regclass(%s)", (partition_name(table, month),))
+        if not cursor.fetchone()[0]:
+            missing.append(table)
+    if not missing:
+        return missing
+
+    bounds = (month.isoformat(), add_months(month, 1).isoformat())
+    stray_rows = {}
+    for table in PARTITIONED_TABLES:
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {default_partition(table)} WHERE sale_date >= %s AND sale_date < %s",
+            bounds
+        )
+        stray_rows[table] = cursor.fetchone()[0]
+    moving = any(stray_rows.values())
+
+    if moving:
+        for table in PARTITIONED_TABLES:
+            cursor.execute(
+                f"CREATE TEMP TABLE stray_{table} AS "
+                f"SELECT * FROM {default_partition(table)} WHERE sale_date >= %s AND sale_date < %s",
+                bounds
+            )
+        for table in reversed(PARTITIONED_TABLES):
+            cursor.execute(
+                f"DELETE FROM {default_partition(table)} WHERE sale_date >= %s AND sale_date < %s", bounds
+            )
+
+    for table in missing:
+        cursor.execute(
+            f"CREATE TABLE {partition_name(table, month)} PARTITION OF {table} FOR VALUES FROM (%s) TO (%s)",
+            bounds
+        )
+
+    if moving:
+        for table in PARTITIONED_TABLES:
+            cursor.execute(f"INSERT INTO {partition_name(table, month)} SELECT * FROM stray_{table}")
+            cursor.execute(f"DROP TABLE stray_{table}")
+        logging.info(
+            f"Moved {stray_rows['sales']} sales and {stray_rows['sale_items']} sale items "
+            f"from the default partitions to {month:%Y-%m}"
+        )
+    return missing
+
+
+def ensure_sales_partitions(db, months_ahead=12):
+    """Create the monthly partitions from this month to `months_ahead` months from now"""
+    with db.transaction() as cursor:
+        if not is_partitioned(cursor, "sales"):
+            return
+        this_month = month_start(date.today())
+        for table in PARTITIONED_TABLES:
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {default_partition(table)} PARTITION OF {table} DEFAULT"
+            )
+        for offset in range(months_ahead + 1):
+            create_month_partitions(cursor, add_months(this_month, offset))
+
+
+def create_sale_keys_trigger(cursor):
+    """
+    Create the trigger keeping sale_keys in step with sales, if missing
+
+    A trigger from before updates were tracked is recreated in place.
+
+    Returns:
+    - bool: True if sales had no such trigger yet, so sale_keys needs filling
+    """
+    cursor.execute("""
+        SELECT tgtype & 16 <> 0 FROM pg_trigger
+        WHERE tgname = 'sales_keys' AND tgrelid = 'sales'::regclass
+    """)
+    existing = cursor.fetchone()
+    if existing and existing[0]:
+        return False
+    if existing:
+        cursor.execute("DROP TRIGGER sales_keys ON sales")
+
+    cursor.execute("""
+        CREATE TRIGGER sales_keys
+        AFTER INSERT OR DELETE OR UPDATE OF invoice_number, idempotency_key, sale_date ON sales
+        FOR EACH ROW EXECUTE PROCEDURE sales_track_keys()
+    """)
+    return not existing
+
+
+def create_sale_keys(db):
+    """
+    Keep invoice numbers and idempotency keys unique across every sale
+
+    The existing sales are copied into sale_keys once, when the trigger is
+    first created. The old unique index on sales.idempotency_key is dropped;
+    sale_keys enforces it from then on and is where checkout looks keys up.
+    """
+    with db.transaction() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS sale_keys (
+                invoice_number VARCHAR(50) PRIMARY KEY,
+                idempotency_key UUID CONSTRAINT sale_keys_idempotency_key UNIQUE,
+                sale_id INTEGER NOT NULL,
+                sale_date TIMESTAMP NOT NULL
+            )
+        """)
+        # A day's invoice counter starts after its invoices, found with a LIKE 'INV-YYYYMMDD-%' prefix lookup
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_sale_keys_invoice_prefix
+            ON sale_keys (invoice_number text_pattern_ops)
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION sales_track_keys() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'DELETE' THEN
+                    DELETE FROM sale_keys WHERE invoice_number = OLD.invoice_number;
+                    RETURN OLD;
+                END IF;
+                IF TG_OP = 'UPDATE' THEN
+                    UPDATE sale_keys
+                    SET invoice_number = NEW.invoice_number, idempotency_key = NEW.idempotency_key,
+                        sale_date = NEW.sale_date
+                    WHERE invoice_number = OLD.invoice_number;
+                    RETURN NEW;
+                END IF;
+                INSERT INTO sale_keys (invoice_number, idempotency_key, sale_id, sale_date)
+                VALUES (NEW.invoice_number, NEW.idempotency_key, NEW.sale_id, NEW.sale_date);
+                RETURN NEW;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        if not create_sale_keys_trigger(cursor):
+            return
+
+        cursor.execute("""
+            INSERT INTO sale_keys (invoice_number, idempotency_key, sale_id, sale_date)
+            SELECT invoice_number, idempotency_key, sale_id, COALESCE(sale_date, CURRENT_TIMESTAMP)
+            FROM sales
+            ON CONFLICT DO NOTHING
+        """)
+        cursor.execute("DROP INDEX IF EXISTS idx_sales_idempotency_key")
+        logging.info("Sale keys table created and filled")
+
+
+def move_sequence(cursor, sequence, table, column):
+    """Point a serial column of the new table at the old table's sequence"""
+    if sequence:
+        cursor.execute(f"ALTER TABLE {table} ALTER COLUMN {column} SET DEFAULT nextval('{sequence}')")
+        # Move ownership first, or dropping the old table would drop the sequence too
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.{column}")
+
+
+def migrate_sales(db):
+    """
+    Convert plain sales and sale_items tables into monthly partitioned ones
+
+    Rewrites both tables under an ACCESS EXCLUSIVE lock, so it is one of the
+    schema MIGRATIONS run by migrate_sales.py, never at startup.
+    Runs in one transaction: sale_items gets the sale_date of its sale, new
+    partitioned tables with the same columns are created next to the old
+    ones, every month from the oldest sale onwards gets a partition, the rows
+    are copied, sale_id and item_id keep using their sequences and the old
+    tables are dropped. The foreign keys are recreated, the one from
+    sale_items now on (sale_id, sale_date). Does nothing once sales is
+    partitioned.
+    """
+    with db.transaction() as cursor:
+        if is_partitioned(cursor, "sales"):
+            return
+
+        cursor.execute("LOCK TABLE sales, sale_items IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("SELECT pg_get_serial_sequence('sales', 'sale_id')")
+        sale_sequence = cursor.fetchone()[0]
+        cursor.execute("SELECT pg_get_serial_sequence('sale_items', 'item_id')")
+        item_sequence = cursor.fetchone()[0]
+        cursor.execute("SELECT MIN(sale_date)::date, COUNT(*) FROM sales")
+        oldest, sale_count = cursor.fetchone()
+
+        cursor.execute("ALTER TABLE sales RENAME TO sales_unpartitioned")
+        cursor.execute("ALTER TABLE sale_items RENAME TO sale_items_unpartitioned")
+
+        # The partition key can't be NULL; items take the date of their sale
+        cursor.execute("UPDATE sales_unpartitioned SET sale_date = CURRENT_TIMESTAMP WHERE sale_date IS NULL")
+        cursor.execute("ALTER TABLE sale_items_unpartitioned ADD COLUMN IF NOT EXISTS sale_date TIMESTAMP")
+        cursor.execute("""
+            UPDATE sale_items_unpartitioned si
+            SET sale_date = s.sale_date
+            FROM sales_unpartitioned s
+            WHERE s.sale_id = si.sale_id
+        """)
+        cursor.execute("UPDATE sale_items_unpartitioned SET sale_date = CURRENT_TIMESTAMP WHERE sale_date IS NULL")
+
+        # LIKE keeps every column, including ones added outside the schema updates
+        cursor.execute("""
+            CREATE TABLE sales (LIKE sales_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (sale_date)
+        """)
+        cursor.execute("""
+            ALTER TABLE sales
+                ALTER COLUMN sale_date SET NOT NULL,
+                ALTER COLUMN sale_date SET DEFAULT CURRENT_TIMESTAMP,
+                ADD PRIMARY KEY (sale_id, sale_date),
+                ADD FOREIGN KEY (user_id) REFERENCES users(user_id),
+                ADD FOREIGN KEY (voided_by) REFERENCES users(user_id)
+        """)
+        cursor.execute("""
+            CREATE TABLE sale_items (LIKE sale_items_unpartitioned INCLUDING DEFAULTS)
+            PARTITION BY RANGE (sale_date)
+        """)
+        # Items inserted in the same transaction as their sale get the same default date
+        cursor.execute("""
+            ALTER TABLE sale_items
+                ALTER COLUMN sale_date SET NOT NULL,
+                ALTER COLUMN sale_date SET DEFAULT CURRENT_TIMESTAMP,
+                ADD PRIMARY KEY (item_id, sale_date),
+                ADD FOREIGN KEY (sale_id, sale_date) REFERENCES sales(sale_id, sale_date),
+                ADD FOREIGN KEY (product_id) REFERENCES products(product_id)
+        """)
+
+        last_month = add_months(month_start(date.today()), 12)
+        for table in PARTITIONED_TABLES:
+            cursor.execute(f"CREATE TABLE {default_partition(table)} PARTITION OF {table} DEFAULT")
+        month = month_start(oldest or date.today())
+        while month <= last_month:
+            create_month_partitions(cursor, month)
+            month = add_months(month, 1)
+
+        cursor.execute("INSERT INTO sales SELECT * FROM sales_unpartitioned")
+        cursor.execute("INSERT INTO sale_items SELECT * FROM sale_items_unpartitioned")
+
+        move_sequence(cursor, sale_sequence, "sales", "sale_id")
+        move_sequence(cursor, item_sequence, "sale_items", "item_id")
+
+        # sale_keys already holds every copied sale; new ones are added by the trigger
+        cursor.execute("DROP TABLE sale_items_unpartitioned")
+        cursor.execute("DROP TABLE sales_unpartitioned")
+        create_sale_keys_trigger(cursor)
+
+    logging.info(f"sales and sale_items converted to monthly partitions ({sale_count} sales moved)")
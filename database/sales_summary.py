@@ -0,0 +1,257 @@
+"""
+Daily sales rollup.
+
+daily_sales_summary holds one row per day, payment method and medication
+type with the quantity sold and the amount taken, so the sales charts read
+a few rows per day instead of aggregating sales and sale_items. Triggers keep
+it current: items inserted for a completed sale are added, a sale leaving
+'Completed' (a void) and deleted items are subtracted. Voided sales are
+therefore not counted.
+
+The triggers never update a summary row themselves: every checkout would
+then queue on the same (today, payment method, type) row while holding its
+product locks. They append delta rows to daily_sales_deltas instead, which
+fold_daily_sales_deltas moves into the summary in the background. Reports
+read the daily_sales_totals view, the summary plus the deltas not folded
+yet, so they are exact whenever the fold last ran. rebuild_daily_sales_summary
+corrects the rollup from the sales themselves.
+
+Every open main window folds once a minute. While no window is open the
+deltas pile up (reports stay exact, only slower), so a server left running
+unattended should also fold from a scheduled task with
+python rebuild_sales_summary.py --fold.
+"""
+import logging
+
+from database.report_cache import as_date, notify_sales_changed
+from database.sales_partitions import sale_date_range
+
+# Chart buckets by the longest range (in days) they are used for, so a chart
+# never has more than about 60 bars; anything longer is shown by quarter
+CHART_BUCKETS = (
+    ('day', 62),
+    ('week', 183),
+    ('month', 1096)
+)
+
+# Taken by the fold, so terminals folding at the same time don't both do the work
+FOLD_LOCK_KEY = 7302901
+
+SUMMARY_UPSERT = """
+    ON CONFLICT (sale_day, payment_method, is_generic) DO UPDATE
+    SET quantity = daily_sales_summary.quantity + EXCLUDED.quantity,
+        total_amount = daily_sales_summary.total_amount + EXCLUDED.total_amount
+"""
+
+
+def chart_bucket(date_from, date_to):
+    """Get the date_trunc unit to chart a date range with: day, week, month or quarter"""
+    days = (as_date(date_to) - as_date(date_from)).days + 1
+    for bucket, max_days in CHART_BUCKETS:
+        if days <= max_days:
+            return bucket
+    return 'quarter'
+
+
+def create_daily_sales_summary(db):
+    """
+    Create the daily sales rollup, its delta log and the triggers appending to it
+
+    The rollup is filled from the existing sales when the triggers are first
+    created. Databases made before the delta log get it here; their triggers
+    keep their names and switch to appending deltas.
+    """
+    with db.transaction() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_sales_summary (
+                sale_day DATE NOT NULL,
+                payment_method VARCHAR(50) NOT NULL,
+                is_generic BOOLEAN NOT NULL,
+                quantity INTEGER NOT NULL DEFAULT 0,
+                total_amount NUMERIC(14,2) NOT NULL DEFAULT 0,
+                PRIMARY KEY (sale_day, payment_method, is_generic)
+            )
+        """)
+        # Insert-only, and without a primary key, so concurrent checkouts never wait on each other here
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS daily_sales_deltas (
+                sale_day DATE NOT NULL,
+                payment_method VARCHAR(50) NOT NULL,
+                is_generic BOOLEAN NOT NULL,
+                quantity INTEGER NOT NULL,
+                total_amount NUMERIC(14,2) NOT NULL
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_daily_sales_deltas_day ON daily_sales_deltas (sale_day)")
+        cursor.execute("""
+            CREATE OR REPLACE VIEW daily_sales_totals AS
+            SELECT sale_day, payment_method, is_generic, quantity, total_amount FROM daily_sales_summary
+            UNION ALL
+            SELECT sale_day, payment_method, is_generic, quantity, total_amount FROM daily_sales_deltas
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION daily_sales_summary_items() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP = 'INSERT' THEN
+                    INSERT INTO daily_sales_deltas (sale_day, payment_method, is_generic, quantity, total_amount)
+                    SELECT s.sale_date::date, COALESCE(s.payment_method, ''), COALESCE(n.is_generic, FALSE),
+                           SUM(n.quantity), SUM(n.subtotal)
+                    FROM new_items n
+                    JOIN sales s ON s.sale_id = n.sale_id AND s.sale_date = n.sale_date
+                    WHERE s.status = 'Completed'
+                    GROUP BY 1, 2, 3;
+                ELSE
+                    INSERT INTO daily_sales_deltas (sale_day, payment_method, is_generic, quantity, total_amount)
+                    SELECT s.sale_date::date, COALESCE(s.payment_method, ''), COALESCE(o.is_generic, FALSE),
+                           -SUM(o.quantity), -SUM(o.subtotal)
+                    FROM old_items o
+                    JOIN sales s ON s.sale_id = o.sale_id AND s.sale_date = o.sale_date
+                    WHERE s.status = 'Completed'
+                    GROUP BY 1, 2, 3;
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION daily_sales_summary_void() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO daily_sales_deltas (sale_day, payment_method, is_generic, quantity, total_amount)
+                SELECT NEW.sale_date::date, COALESCE(NEW.payment_method, ''), COALESCE(si.is_generic, FALSE),
+                       -SUM(si.quantity), -SUM(si.subtotal)
+                FROM sale_items si
+                WHERE si.sale_id = NEW.sale_id
+                GROUP BY 1, 2, 3;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+
+        cursor.execute("""
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'sale_items_summary_insert' AND tgrelid = 'sale_items'::regclass
+        """)
+        if cursor.fetchone():
+            return
+
+        cursor.execute("""
+            CREATE TRIGGER sale_items_summary_insert
+            AFTER INSERT ON sale_items
+            REFERENCING NEW TABLE AS new_items
+            FOR EACH STATEMENT EXECUTE PROCEDURE daily_sales_summary_items()
+        """)
+        cursor.execute("""
+            CREATE TRIGGER sale_items_summary_delete
+            AFTER DELETE ON sale_items
+            REFERENCING OLD TABLE AS old_items
+            FOR EACH STATEMENT EXECUTE PROCEDURE daily_sales_summary_items()
+        """)
+        cursor.execute("""
+            CREATE TRIGGER sales_summary_void
+            AFTER UPDATE OF status ON sales
+            FOR EACH ROW
+            WHEN (OLD.status = 'Completed' AND NEW.status <> 'Completed')
+            EXECUTE PROCEDURE daily_sales_summary_void()
+        """)
+        rows = fill_daily_sales_summary(cursor)
+        logging.info(f"Daily sales summary created and filled ({rows} rows)")
+
+
+def fill_daily_sales_summary(cursor):
+    """Fill the empty rollup from every completed sale"""
+    cursor.execute("""
+        INSERT INTO daily_sales_summary (sale_day, payment_method, is_generic, quantity, total_amount)
+        SELECT s.sale_date::date, COALESCE(s.payment_method, ''), COALESCE(si.is_generic, FALSE),
+               SUM(si.quantity), SUM(si.subtotal)
+        FROM sales s
+        JOIN sale_items si ON si.sale_id = s.sale_id AND si.sale_date = s.sale_date
+        WHERE s.status = 'Completed'
+        GROUP BY 1, 2, 3
+    """)
+    return cursor.rowcount
+
+
+def fold_daily_sales_deltas(db):
+    """
+    Move the pending deltas into the rollup
+
+    Only one terminal folds at a time; the others return at once. Checkouts
+    keep appending deltas meanwhile, and reports see either the deltas or
+    their folded totals, never both.
+
+    Returns:
+    - int: Number of rollup rows updated, or None if another terminal is folding
+    """
+    with db.transaction() as cursor:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(%s)", (FOLD_LOCK_KEY,))
+        if not cursor.fetchone()[0]:
+            return None
+        # One upsert in key order, so it never deadlocks with a rebuild or another fold
+        cursor.execute(f"""
+            WITH folded AS (
+                DELETE FROM daily_sales_deltas
+                RETURNING sale_day, payment_method, is_generic, quantity, total_amount
+            )
+            INSERT INTO daily_sales_summary (sale_day, payment_method, is_generic, quantity, total_amount)
+            SELECT sale_day, payment_method, is_generic, SUM(quantity), SUM(total_amount)
+            FROM folded
+            GROUP BY 1, 2, 3
+            ORDER BY 1, 2, 3
+            {SUMMARY_UPSERT}
+        """)
+        return cursor.rowcount
+
+
+def rebuild_daily_sales_summary(db, date_from=None, date_to=None):
+    """
+    Correct the daily sales rollup from sales and sale_items
+
+    The difference between the sales and the rollup (summary plus pending
+    deltas) is appended as deltas by a single statement, so it compares one
+    snapshot: a checkout committing meanwhile is either in both or in
+    neither, and is counted exactly once. Nothing is locked, so checkouts
+    and reports carry on; the corrections are folded in right after.
+
+    Parameters:
+    - date_from, date_to: Optional range of days to rebuild; every day if omitted
+
+    Returns:
+    - int: Number of rollup rows corrected
+    """
+    if date_from and date_to:
+        sales_range, params = sale_date_range("s", date_from, date_to)
+        items_range, item_params = sale_date_range("si", date_from, date_to)
+        params += item_params + [date_from, date_to]
+        totals_range = "sale_day >= %s::date AND sale_day <= %s::date"
+    else:
+        sales_range = items_range = totals_range = "TRUE"
+        params = []
+
+    with db.transaction() as cursor:
+        cursor.execute(f"""
+            INSERT INTO daily_sales_deltas (sale_day, payment_method, is_generic, quantity, total_amount)
+            SELECT sale_day, payment_method, is_generic, SUM(quantity), SUM(total_amount)
+            FROM (
+                SELECT s.sale_date::date AS sale_day, COALESCE(s.payment_method, '') AS payment_method,
+                       COALESCE(si.is_generic, FALSE) AS is_generic, si.quantity, si.subtotal AS total_amount
+                FROM sales s
+                JOIN sale_items si ON si.sale_id = s.sale_id AND si.sale_date = s.sale_date
+                WHERE s.status = 'Completed' AND {sales_range} AND {items_range}
+                UNION ALL
+                SELECT sale_day, payment_method, is_generic, -quantity, -total_amount
+                FROM daily_sales_totals
+                WHERE {totals_range}
+            ) difference
+            GROUP BY 1, 2, 3
+            HAVING SUM(quantity) <> 0 OR SUM(total_amount) <> 0
+            RETURNING sale_day
+        """, params)
+        corrected_days = {row[0] for row in cursor.fetchall()}
+        rows = cursor.rowcount
+        if corrected_days:
+            # The charts of these days are cached on every terminal
+            notify_sales_changed(cursor, corrected_days)
+
+    fold_daily_sales_deltas(db)
+    logging.info(f"Daily sales summary rebuilt ({rows} rows corrected)")
+    return rows
@@ -0,0 +1,253 @@
+"""
+Idempotent schema updates applied at startup.
+
+Every update can be run any number of times (IF NOT EXISTS and friends), so
+the whole list is replayed against the database on each start, whether it was
+restored from final.sql or created by create_tables() in main.py. An update is
+either a SQL statement or a callable taking the DatabaseConnection.
+
+The one-off MIGRATIONS rewrite whole tables under ACCESS EXCLUSIVE locks, so
+they are skipped at startup and only run from the maintenance command that
+asks for them by name, at their place in the list.
+"""
+import logging
+
+from database.audit_partitions import migrate_audit_logs, ensure_audit_partitions
+from database.product_sales import create_product_sales_running
+from database.sales_partitions import create_sale_keys, migrate_sales, ensure_sales_partitions
+from database.sales_summary import create_daily_sales_summary
+from database.stock_alerts import create_stock_alert_notifications
+
+SALES_MIGRATION = "sales monthly partitions"
+AUDIT_LOGS_MIGRATION = "audit logs monthly partitions"
+
+# Updates that rewrite a whole table; only run when asked for (see apply_schema_updates)
+MIGRATIONS = {SALES_MIGRATION, AUDIT_LOGS_MIGRATION}
+
+# Searches must use this exact expression for the GIN index to apply. The 'simple'
+# configuration keeps invoice numbers, codes and product names as written.
+AUDIT_SEARCH_VECTOR = "to_tsvector('simple', COALESCE(action_details, ''))"
+
+# The item counters each sale should have, worked out from sale_items; an item
+# without a medication type is branded, as in the daily sales rollup
+SALE_ITEM_COUNTS = """
+    SELECT sale_id,
+           COUNT(*) AS item_count,
+           COUNT(*) FILTER (WHERE is_generic IS NOT TRUE) AS branded_count,
+           COUNT(*) FILTER (WHERE is_generic = TRUE) AS generic_count
+    FROM sale_items
+    GROUP BY sale_id
+"""
+
+
+def create_audit_dimensions(db):
+    """
+    Keep the distinct users, action types and tables of audit_logs in a lookup table
+    
+    A statement-level trigger adds the values of each inserted batch, so the
+    audit log filters never have to scan audit_logs. The existing log is
+    scanned once, when the trigger is first created.
+    """
+    with db.transaction() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS audit_log_dimensions (
+                dimension VARCHAR(20) NOT NULL,
+                value VARCHAR(100) NOT NULL,
+                PRIMARY KEY (dimension, value)
+            )
+        """)
+        cursor.execute("""
+            CREATE OR REPLACE FUNCTION audit_logs_track_dimensions() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO audit_log_dimensions (dimension, value)
+                SELECT DISTINCT d.dimension, d.value
+                FROM new_rows n
+                CROSS JOIN LATERAL (VALUES
+                    ('user', n.user_id::text),
+                    ('action_type', n.action_type),
+                    ('table_affected', n.table_affected)
+                ) AS d(dimension, value)
+                WHERE d.value IS NOT NULL
+                ON CONFLICT DO NOTHING;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+        cursor.execute("SELECT 1 FROM pg_trigger WHERE tgname = 'audit_logs_dimensions'")
+        if cursor.fetchone():
+            return
+        
+        cursor.execute("""
+            CREATE TRIGGER audit_logs_dimensions
+            AFTER INSERT ON audit_logs
+            REFERENCING NEW TABLE AS new_rows
+            FOR EACH STATEMENT EXECUTE PROCEDURE audit_logs_track_dimensions()
+        """)
+        cursor.execute("""
+            INSERT INTO audit_log_dimensions (dimension, value)
+            SELECT 'user', user_id::text FROM audit_logs WHERE user_id IS NOT NULL
+            UNION
+            SELECT 'action_type', action_type FROM audit_logs
+            UNION
+            SELECT 'table_affected', table_affected FROM audit_logs WHERE table_affected IS NOT NULL
+            ON CONFLICT DO NOTHING
+        """)
+        logging.info("Audit log dimensions table created and filled")
+
+
+def add_sale_item_counters(db):
+    """
+    Store item_count, branded_count and generic_count on each sale
+    
+    The sales listings show them without joining and grouping sale_items.
+    Existing sales are counted once, when the columns are added; checkout
+    writes them from then on.
+    """
+    with db.transaction() as cursor:
+        cursor.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_name = 'sales' AND column_name = 'item_count'
+        """)
+        if cursor.fetchone():
+            return
+        
+        cursor.execute("""
+            ALTER TABLE sales
+                ADD COLUMN item_count INTEGER NOT NULL DEFAULT 0,
+                ADD COLUMN branded_count INTEGER NOT NULL DEFAULT 0,
+                ADD COLUMN generic_count INTEGER NOT NULL DEFAULT 0
+        """)
+        cursor.execute(f"""
+            UPDATE sales s
+            SET item_count = c.item_count, branded_count = c.branded_count, generic_count = c.generic_count
+            FROM ({SALE_ITEM_COUNTS}) c
+            WHERE s.sale_id = c.sale_id
+        """)
+        logging.info(f"Sale item counters added and filled for {cursor.rowcount} sales")
+
+
+SCHEMA_UPDATES = [
+    # Voiding marks the sale instead of deleting it
+    ("sales void columns", """
+        ALTER TABLE sales
+            ADD COLUMN IF NOT EXISTS status VARCHAR(20) NOT NULL DEFAULT 'Completed',
+            ADD COLUMN IF NOT EXISTS void_date TIMESTAMP,
+            ADD COLUMN IF NOT EXISTS voided_by INTEGER REFERENCES users(user_id)
+    """),
+    # Medication details and soft delete used by the POS, inventory and reports
+    ("product medication columns", """
+        ALTER TABLE products
+            ADD COLUMN IF NOT EXISTS is_generic BOOLEAN DEFAULT FALSE,
+            ADD COLUMN IF NOT EXISTS unit_measurement VARCHAR(50) DEFAULT '',
+            ADD COLUMN IF NOT EXISTS is_active BOOLEAN NOT NULL DEFAULT TRUE
+    """),
+    ("sale item medication columns", """
+        ALTER TABLE sale_items
+            ADD COLUMN IF NOT EXISTS is_generic BOOLEAN DEFAULT FALSE,
+            ADD COLUMN IF NOT EXISTS unit_measurement VARCHAR(50)
+    """),
+    # A retried checkout finds its original sale through the client's key
+    ("sales idempotency key", """
+        ALTER TABLE sales ADD COLUMN IF NOT EXISTS idempotency_key UUID
+    """),
+    # Invoice numbers and idempotency keys stay unique across partitions through sale_keys
+    ("sale keys", create_sale_keys),
+    # Invoice numbers are handed out from a per-day counter, not max(invoice) + 1
+    ("invoice counters", """
+        CREATE TABLE IF NOT EXISTS invoice_counters (
+            invoice_day DATE PRIMARY KEY,
+            last_number INTEGER NOT NULL
+        )
+    """),
+    # sales and sale_items are partitioned by month once all their columns exist,
+    # and before their indexes are created, so those are defined on the partitioned
+    # tables (a migration, see migrate_sales.py)
+    (SALES_MIGRATION, migrate_sales),
+    ("sales partitions ahead", ensure_sales_partitions),
+    # Transaction history pages through sales newest first on (sale_date, sale_id)
+    ("sales keyset index", """
+        CREATE INDEX IF NOT EXISTS idx_sales_date_id
+        ON sales (sale_date DESC, sale_id DESC)
+    """),
+    # Invoice search is a prefix match; text_pattern_ops lets LIKE 'INV-2025%' use it
+    ("sales invoice prefix index", """
+        CREATE INDEX IF NOT EXISTS idx_sales_invoice_prefix
+        ON sales (invoice_number text_pattern_ops)
+    """),
+    ("sale items by sale index", """
+        CREATE INDEX IF NOT EXISTS idx_sale_items_sale_id
+        ON sale_items (sale_id)
+    """),
+    ("sale item counters", add_sale_item_counters),
+    # The stock alerts only look at active products: expiring ones by date and
+    # low stock ones by how far they are below their reorder level
+    ("products expiry alerts index", """
+        CREATE INDEX IF NOT EXISTS idx_products_active_expiry
+        ON products (expiry_date) WHERE is_active
+    """),
+    ("products stock shortfall index", """
+        CREATE INDEX IF NOT EXISTS idx_products_stock_shortfall
+        ON products ((reorder_level - stock_quantity)) WHERE is_active
+    """),
+    # Low stock and expiry alerts are pushed to the app with NOTIFY
+    ("stock alert notifications", create_stock_alert_notifications),
+    # The sales charts read a per-day rollup kept current by triggers
+    ("daily sales summary", create_daily_sales_summary),
+    # The reorder planner reads per-product running totals of the units sold
+    ("product sales running totals", create_product_sales_running),
+    # audit_logs is partitioned by month before its indexes and trigger are created,
+    # so they are defined on the partitioned table (a migration, see audit_maintenance.py)
+    (AUDIT_LOGS_MIGRATION, migrate_audit_logs),
+    ("audit logs partitions ahead", ensure_audit_partitions),
+    # Audit log browsing pages newest first on (timestamp, log_id), optionally per user or action
+    ("audit logs keyset index", """
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_timestamp_id
+        ON audit_logs (timestamp DESC, log_id DESC)
+    """),
+    ("audit logs user index", """
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_user_timestamp
+        ON audit_logs (user_id, timestamp DESC, log_id DESC)
+    """),
+    ("audit logs action index", """
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_action_timestamp
+        ON audit_logs (action_type, timestamp DESC, log_id DESC)
+    """),
+    # The audit log filter lists come from this lookup table, not SELECT DISTINCT
+    ("audit log dimensions", create_audit_dimensions),
+    ("audit logs details search index", f"""
+        CREATE INDEX IF NOT EXISTS idx_audit_logs_details_search
+        ON audit_logs USING GIN ({AUDIT_SEARCH_VECTOR})
+    """),
+]
+
+
+def apply_schema_updates(db, migrations=()):
+    """
+    Apply all schema updates in order
+
+    Parameters:
+    - db: DatabaseConnection instance
+    - migrations: Names of the MIGRATIONS to run as well; the others are
+      skipped. Unlike the other updates, a failing migration raises.
+
+    Returns:
+    - int: Number of updates that ran without error
+    """
+    applied = 0
+    updates = [(name, update) for name, update in SCHEMA_UPDATES
+               if name not in MIGRATIONS or name in migrations]
+    for name, update in updates:
+        try:
+            if callable(update):
+                update(db)
+            else:
+                db.execute_query(update)
+            applied += 1
+        except Exception as e:
+            if name in migrations:
+                raise
+            # One failing update must not keep the application from starting
+            logging.error(f"Schema update '{name}' failed: {e}")
+
+    logging.info(f"Schema updates applied: {applied}/{len(updates)}")
+    return applied
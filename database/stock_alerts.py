@@ -0,0 +1,119 @@
+"""
+Stock alert notifications.
+
+A trigger on products sends a NOTIFY on the stock_alerts channel when an
+active product's stock falls to its reorder level or below, or when its
+expiry date is moved into the expiry window. Products also enter the window,
+or expire, just by the date changing, which no trigger sees, so
+run_daily_expiry_check notifies those once a day. The payload is a JSON
+object with the alert ('low_stock', 'expiring' or 'expired'), product_id and
+product_name, plus stock_quantity and reorder_level or expiry_date.
+"""
+import logging
+
+STOCK_ALERT_CHANNEL = "stock_alerts"
+EXPIRY_WINDOW_DAYS = 30
+
+
+def create_stock_alert_notifications(db):
+    """Create the trigger notifying stock alerts and the table recording daily checks"""
+    with db.transaction() as cursor:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS stock_alert_checks (
+                check_day DATE PRIMARY KEY,
+                checked_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # OLD is NULL on INSERT, so a new product already low or expiring is notified too
+        cursor.execute(f"""
+            CREATE OR REPLACE FUNCTION products_stock_alert() RETURNS trigger AS $$
+            BEGIN
+                IF NOT NEW.is_active THEN
+                    RETURN NULL;
+                END IF;
+                IF NEW.stock_quantity <= NEW.reorder_level
+                   AND (TG_OP = 'INSERT' OR NOT OLD.is_active OR OLD.stock_quantity > OLD.reorder_level) THEN
+                    PERFORM pg_notify('{STOCK_ALERT_CHANNEL}', json_build_object(
+                        'alert', 'low_stock',
+                        'product_id', NEW.product_id,
+                        'product_name', NEW.product_name,
+                        'stock_quantity', NEW.stock_quantity,
+                        'reorder_level', NEW.reorder_level
+                    )::text);
+                END IF;
+                IF NEW.expiry_date <= CURRENT_DATE + {EXPIRY_WINDOW_DAYS}
+                   AND (TG_OP = 'INSERT' OR NOT OLD.is_active OR OLD.expiry_date IS NULL
+                        OR OLD.expiry_date > CURRENT_DATE + {EXPIRY_WINDOW_DAYS}) THEN
+                    PERFORM pg_notify('{STOCK_ALERT_CHANNEL}', json_build_object(
+                        'alert', CASE WHEN NEW.expiry_date < CURRENT_DATE THEN 'expired' ELSE 'expiring' END,
+                        'product_id', NEW.product_id,
+                        'product_name', NEW.product_name,
+                        'expiry_date', NEW.expiry_date
+                    )::text);
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """)
+
+        cursor.execute("""
+            SELECT 1 FROM pg_trigger
+            WHERE tgname = 'products_stock_alert' AND tgrelid = 'products'::regclass
+        """)
+        if cursor.fetchone():
+            return
+
+        cursor.execute("""
+            CREATE TRIGGER products_stock_alert
+            AFTER INSERT OR UPDATE OF stock_quantity, reorder_level, expiry_date, is_active ON products
+            FOR EACH ROW EXECUTE PROCEDURE products_stock_alert()
+        """)
+        logging.info("Stock alert notifications created")
+
+
+def run_daily_expiry_check(db):
+    """
+    Notify the products that entered the expiry window or expired since the last check
+
+    Only the first call of a day, across every terminal, sends anything, so it
+    can safely run at every start, hourly and from a scheduled task. Days with
+    no check are caught up: every product that crossed a boundary since the
+    last checked day is notified.
+
+    Returns:
+    - int: Number of notifications sent, or None if today was already checked
+    """
+    with db.transaction() as cursor:
+        cursor.execute("""
+            INSERT INTO stock_alert_checks (check_day) VALUES (CURRENT_DATE)
+            ON CONFLICT DO NOTHING
+            RETURNING check_day
+        """)
+        if cursor.fetchone() is None:
+            return None
+
+        cursor.execute("""
+            SELECT COALESCE(MAX(check_day), CURRENT_DATE - 1)
+            FROM stock_alert_checks
+            WHERE check_day < CURRENT_DATE
+        """)
+        last_check = cursor.fetchone()[0]
+
+        # Entered the window: last_check + window < expiry <= today + window;
+        # expired: last_check <= expiry < today
+        cursor.execute(f"""
+            SELECT pg_notify('{STOCK_ALERT_CHANNEL}', json_build_object(
+                'alert', CASE WHEN expiry_date < CURRENT_DATE THEN 'expired' ELSE 'expiring' END,
+                'product_id', product_id,
+                'product_name', product_name,
+                'expiry_date', expiry_date
+            )::text)
+            FROM products
+            WHERE is_active
+              AND ((expiry_date > %(last_check)s::date + %(days)s AND expiry_date <= CURRENT_DATE + %(days)s)
+                   OR (expiry_date >= %(last_check)s AND expiry_date < CURRENT_DATE))
+        """, {'last_check': last_check, 'days': EXPIRY_WINDOW_DAYS})
+        sent = cursor.rowcount
+
+    logging.info(f"Daily expiry check sent {sent} stock alert(s)")
+    return sent
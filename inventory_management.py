@@ -7,7 +7,20 @@ from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QIcon, QFont, QColor
 
 from database.db_connector import DatabaseConnection
+from database.models import ProductModel
+from database.reorder_planner import plan_reorders, DEFAULT_LEAD_TIME_DAYS, DEFAULT_COVER_DAYS
 from utils.auth import Authentication
+from utils.loader import DataLoader, BusyIndicator
+
+# Background of the status column
+STATUS_COLORS = {
+    "Inactive": "#DDDDDD",  # Grey
+    "Out of Stock": "#FFCCCC",  # Light red
+    "Low Stock": "#FFFFCC",  # Light yellow
+    "Expired": "#FF9999",  # Red
+    "Expiring Soon": "#FFCC99",  # Orange
+    "OK": "#CCFFCC"  # Light green
+}
 
 class ProductDialog(QDialog):
     """Dialog for adding or editing products"""
@@ -564,6 +577,15 @@ class InventoryManagementWidget(QWidget):
         self.user = user
         self.db = DatabaseConnection()
         self.auth = Authentication()
+        self.product_model = ProductModel()
+        self.status_counts = {}
+        self.products_loader = DataLoader(self)
+        self.products_loader.rows_loaded.connect(self.append_products)
+        self.products_loader.load_finished.connect(self.products_loaded)
+        self.products_loader.load_failed.connect(self.products_load_failed)
+        self.reorder_loader = DataLoader(self)
+        self.reorder_loader.rows_loaded.connect(self.append_reorder_groups)
+        self.reorder_loader.load_failed.connect(self.reorder_plan_failed)
         self.init_ui()
         self.load_products()
     
@@ -573,6 +595,7 @@ class InventoryManagementWidget(QWidget):
         
         # Create tab widget for inventory sections
         tab_widget = QTabWidget()
+        self.tab_widget = tab_widget
         
         # Products tab
         products_tab = QWidget()
@@ -591,7 +614,7 @@ class InventoryManagementWidget(QWidget):
         self.category_filter = QComboBox()
         self.category_filter.addItem("All Categories", None)
         self.load_category_filter()
-        self.category_filter.currentIndexChanged.connect(self.filter_products)
+        self.category_filter.currentIndexChanged.connect(self.load_products)
         search_layout.addWidget(self.category_filter)
         
         # Medication Type filter
@@ -599,7 +622,7 @@ class InventoryManagementWidget(QWidget):
         self.type_filter.addItem("All Types", None)
         self.type_filter.addItem("Branded", "branded")
         self.type_filter.addItem("Generic", "generic")
-        self.type_filter.currentIndexChanged.connect(self.filter_products)
+        self.type_filter.currentIndexChanged.connect(self.load_products)
         search_layout.addWidget(self.type_filter)
         
         self.stock_filter = QComboBox()
@@ -607,7 +630,7 @@ class InventoryManagementWidget(QWidget):
         self.stock_filter.addItem("Low Stock", "low")
         self.stock_filter.addItem("In Stock", "in")
         self.stock_filter.addItem("Out of Stock", "out")
-        self.stock_filter.currentIndexChanged.connect(self.filter_products)
+        self.stock_filter.currentIndexChanged.connect(self.load_products)
         search_layout.addWidget(self.stock_filter)
         
         self.expiry_filter = QComboBox()
@@ -615,7 +638,7 @@ class InventoryManagementWidget(QWidget):
         self.expiry_filter.addItem("Expired", "expired")
         self.expiry_filter.addItem("Expiring Soon (30 days)", "soon")
         self.expiry_filter.addItem("Valid", "valid")
-        self.expiry_filter.currentIndexChanged.connect(self.filter_products)
+        self.expiry_filter.currentIndexChanged.connect(self.load_products)
         search_layout.addWidget(self.expiry_filter)
         
         # Status filter
@@ -623,7 +646,7 @@ class InventoryManagementWidget(QWidget):
         self.status_filter.addItem("All Products", None)
         self.status_filter.addItem("Active Only", "active")
         self.status_filter.addItem("Inactive Only", "inactive")
-        self.status_filter.currentIndexChanged.connect(self.filter_products)
+        self.status_filter.currentIndexChanged.connect(self.load_products)
         search_layout.addWidget(self.status_filter)
         
         products_layout.addWidget(search_frame)
@@ -640,6 +663,14 @@ class InventoryManagementWidget(QWidget):
         self.products_table.setEditTriggers(QTableWidget.NoEditTriggers)
         products_layout.addWidget(self.products_table)
         
+        # Products per status, for the category, type and active filters
+        self.status_summary_label = QLabel()
+        products_layout.addWidget(self.status_summary_label)
+        
+        self.busy_indicator = BusyIndicator(text="Loading products...")
+        self.busy_indicator.attach(self.products_loader)
+        products_layout.addWidget(self.busy_indicator)
+        
         # Buttons for product management
         buttons_layout = QHBoxLayout()
         
@@ -722,7 +753,43 @@ class InventoryManagementWidget(QWidget):
         alerts_layout.addWidget(QLabel("Expiring Soon or Expired Items"))
         alerts_layout.addWidget(self.expiring_table)
         
+        # Reorder suggestions from sales velocity, as draft purchase lists per supplier
+        reorder_header = QHBoxLayout()
+        reorder_header.addWidget(QLabel("Reorder Suggestions"))
+        reorder_header.addStretch()
+        
+        reorder_header.addWidget(QLabel("Lead time (days):"))
+        self.lead_time_input = QSpinBox()
+        self.lead_time_input.setRange(1, 90)
+        self.lead_time_input.setValue(DEFAULT_LEAD_TIME_DAYS)
+        reorder_header.addWidget(self.lead_time_input)
+        
+        reorder_header.addWidget(QLabel("Cover (days):"))
+        self.cover_days_input = QSpinBox()
+        self.cover_days_input.setRange(1, 180)
+        self.cover_days_input.setValue(DEFAULT_COVER_DAYS)
+        reorder_header.addWidget(self.cover_days_input)
+        
+        plan_btn = QPushButton("Plan Reorders")
+        plan_btn.setIcon(QIcon("resources/icons/refresh.png"))
+        plan_btn.clicked.connect(self.load_reorder_plan)
+        reorder_header.addWidget(plan_btn)
+        alerts_layout.addLayout(reorder_header)
+        
+        self.reorder_tree = QTreeWidget()
+        self.reorder_tree.setHeaderLabels([
+            "Supplier / Product", "Stock", "Reorder Level", "Units/Day", "Days of Cover", "Suggested Qty", "Cost"
+        ])
+        self.reorder_tree.header().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.reorder_tree.header().setSectionResizeMode(0, QHeaderView.Stretch)
+        alerts_layout.addWidget(self.reorder_tree)
+        
+        self.reorder_busy_indicator = BusyIndicator(text="Planning reorders...")
+        self.reorder_busy_indicator.attach(self.reorder_loader)
+        alerts_layout.addWidget(self.reorder_busy_indicator)
+        
         # Add alerts tab
+        self.alerts_tab = alerts_tab
         tab_widget.addTab(alerts_tab, "Stock Alerts")
         
         # Add tab widget to main layout
@@ -731,6 +798,13 @@ class InventoryManagementWidget(QWidget):
         # Connect tab changed signal
         tab_widget.currentChanged.connect(self.tab_changed)
     
+    def show_stock_alerts(self):
+        """Switch to the Stock Alerts tab, reloading it if it is already shown"""
+        if self.tab_widget.currentWidget() is self.alerts_tab:
+            self.load_alerts()
+        else:
+            self.tab_widget.setCurrentWidget(self.alerts_tab)
+    
     def tab_changed(self, index):
         """Handle tab changes"""
         if index == 0:
@@ -741,173 +815,139 @@ class InventoryManagementWidget(QWidget):
             self.load_alerts()
     
     def load_products(self):
-        """Load products from database into table"""
-        try:
-            # Check if the database has the new medication fields
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
-            
-            try:
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'products' AND column_name = 'is_generic'
-                """)
-                has_med_fields = cursor.fetchone() is not None
-            except:
-                has_med_fields = False
-            finally:
-                cursor.close()
-                self.db.release_connection(connection)
-            
-            # Update query based on whether the fields exist
-            if has_med_fields:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, p.is_generic, c.name, p.unit_measurement,
-                           p.unit_price, p.stock_quantity, p.expiry_date, p.reorder_level, p.is_active
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    ORDER BY p.is_active DESC, p.product_name
-                """
-            else:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, NULL as is_generic, c.name, NULL as unit_measurement,
-                           p.unit_price, p.stock_quantity, p.expiry_date, p.reorder_level, p.is_active
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    ORDER BY p.is_active DESC, p.product_name
-                """
-            
-            products = self.db.execute_query(query, fetchall=True)
-            
-            self.products_table.setRowCount(0)
-            
-            for row_idx, product in enumerate(products):
-                self.products_table.insertRow(row_idx)
-                
-                product_id = product[0]
-                name = product[1]
-                description = product[2] or ""
-                is_generic = product[3]
-                category = product[4] or "Uncategorized"
-                unit_measurement = product[5] or ""
-                unit_price = product[6]
-                stock_qty = product[7]
-                expiry_date = product[8]
-                reorder_level = product[9]
-                is_active = product[10]
-                
-                # Product ID
-                self.products_table.setItem(row_idx, 0, QTableWidgetItem(str(product_id)))
-                
-                # Product Name
-                product_name_item = QTableWidgetItem(name)
-                if not is_active:  # If not active
-                    product_name_item.setForeground(QColor("#888888"))  # Grey text for inactive
-                    font = product_name_item.font()
-                    font.setStrikeOut(True)
-                    product_name_item.setFont(font)
-                self.products_table.setItem(row_idx, 1, product_name_item)
-                
-                # Description
-                description_item = QTableWidgetItem(description)
-                if not is_active:  # If not active
-                    description_item.setForeground(QColor("#888888"))  # Grey text for inactive
-                self.products_table.setItem(row_idx, 2, description_item)
-                
-                # Medication Type (Branded/Generic)
-                type_text = "Generic" if is_generic else "Branded"
-                self.products_table.setItem(row_idx, 3, QTableWidgetItem(type_text))
-                
-                # Category
-                self.products_table.setItem(row_idx, 4, QTableWidgetItem(category))
-                
-                # Unit Measurement
-                self.products_table.setItem(row_idx, 5, QTableWidgetItem(unit_measurement))
-                
-                # Unit Price
-                price_item = QTableWidgetItem(f"₱{float(unit_price):.2f}")
-                price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.products_table.setItem(row_idx, 6, price_item)
-                
-                # Stock Quantity
-                stock_item = QTableWidgetItem(str(stock_qty))
-                stock_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                
-                if stock_qty <= 0:
-                    stock_item.setBackground(QColor("#FFCCCC"))  # Light red for out of stock
-                elif stock_qty < reorder_level:
-                    stock_item.setBackground(QColor("#FFFFCC"))  # Light yellow for low stock
-                
-                self.products_table.setItem(row_idx, 7, stock_item)
-                
-                # Expiry Date
-                if expiry_date:
-                    days_to_expiry = (expiry_date - QDate.currentDate().toPyDate()).days
-                    expiry_item = QTableWidgetItem(expiry_date.strftime("%Y-%m-%d"))
-                    
-                    if days_to_expiry < 0:
-                        expiry_item.setBackground(QColor("#FF9999"))  # Red for expired
-                    elif days_to_expiry < 30:
-                        expiry_item.setBackground(QColor("#FFCC99"))  # Orange for expiring soon
-                    
-                    self.products_table.setItem(row_idx, 8, expiry_item)
-                else:
-                    self.products_table.setItem(row_idx, 8, QTableWidgetItem("N/A"))
-                
-                # Status
-                if not is_active:
-                    status = "Inactive"
-                    status_color = "#DDDDDD"  # Grey for inactive
-                elif stock_qty <= 0:
-                    status = "Out of Stock"
-                    status_color = "#FFCCCC"  # Light red
-                elif stock_qty < reorder_level:
-                    status = "Low Stock"
-                    status_color = "#FFFFCC"  # Light yellow
-                elif expiry_date and (expiry_date - QDate.currentDate().toPyDate()).days < 0:
-                    status = "Expired"
-                    status_color = "#FF9999"  # Red
-                elif expiry_date and (expiry_date - QDate.currentDate().toPyDate()).days < 30:
-                    status = "Expiring Soon"
-                    status_color = "#FFCC99"  # Orange
-                else:
-                    status = "OK"
-                    status_color = "#CCFFCC"  # Light green
-                
-                status_item = QTableWidgetItem(status)
-                status_item.setBackground(QColor(status_color))
-                self.products_table.setItem(row_idx, 9, status_item)
-                
-                # Actions
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                actions_layout.setSpacing(2)
-                
-                edit_btn = QPushButton()
-                edit_btn.setIcon(QIcon("resources/icons/edit.png"))
-                edit_btn.setToolTip("Edit Product")
-                edit_btn.setMaximumWidth(30)
-                edit_btn.clicked.connect(lambda _, pid=product_id: self.edit_product(pid))
-                actions_layout.addWidget(edit_btn)
+        """Start loading products from database into table"""
+        self.products_table.setRowCount(0)
+        filters = self.product_filters()
+        self.products_loader.load_cursor(lambda cursor: self.execute_products_query(cursor, filters))
+    
+    def product_filters(self):
+        """Get the filters the server applies to the product list"""
+        status_filter = self.status_filter.currentData()
+        return {
+            'category_id': self.category_filter.currentData(),
+            'is_generic': {"branded": False, "generic": True}.get(self.type_filter.currentData()),
+            'active': {"active": True, "inactive": False}.get(status_filter),
+            'stock': self.stock_filter.currentData(),
+            'expiry': self.expiry_filter.currentData()
+        }
+    
+    def execute_products_query(self, cursor, filters):
+        """Run the product list query on a loader cursor (called off the UI thread)"""
+        # Counted first on the same cursor; kept by filters so a superseded load can't show its counts
+        self.status_counts[repr(filters)] = self.product_model.get_inventory_status_counts(filters, cursor)
+        cursor.execute(*self.product_model.inventory_query(filters))
+    
+    def append_products(self, products):
+        """Append a chunk of loaded products to the table"""
+        for product in products:
+            row_idx = self.products_table.rowCount()
+            self.products_table.insertRow(row_idx)
+            
+            (product_id, name, description, is_generic, unit_measurement, category, unit_price,
+             cost_price, stock_qty, reorder_level, expiry_date, is_active, days_to_expiry, status) = product
+            description = description or ""
+            category = category or "Uncategorized"
+            unit_measurement = unit_measurement or ""
+            
+            # Product ID
+            self.products_table.setItem(row_idx, 0, QTableWidgetItem(str(product_id)))
+            
+            # Product Name
+            product_name_item = QTableWidgetItem(name)
+            if not is_active:  # If not active
+                product_name_item.setForeground(QColor("#888888"))  # Grey text for inactive
+                font = product_name_item.font()
+                font.setStrikeOut(True)
+                product_name_item.setFont(font)
+            self.products_table.setItem(row_idx, 1, product_name_item)
+            
+            # Description
+            description_item = QTableWidgetItem(description)
+            if not is_active:  # If not active
+                description_item.setForeground(QColor("#888888"))  # Grey text for inactive
+            self.products_table.setItem(row_idx, 2, description_item)
+            
+            # Medication Type (Branded/Generic)
+            type_text = "Generic" if is_generic else "Branded"
+            self.products_table.setItem(row_idx, 3, QTableWidgetItem(type_text))
+            
+            # Category
+            self.products_table.setItem(row_idx, 4, QTableWidgetItem(category))
+            
+            # Unit Measurement
+            self.products_table.setItem(row_idx, 5, QTableWidgetItem(unit_measurement))
+            
+            # Unit Price
+            price_item = QTableWidgetItem(f"₱{float(unit_price):.2f}")
+            price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.products_table.setItem(row_idx, 6, price_item)
+            
+            # Stock Quantity
+            stock_item = QTableWidgetItem(str(stock_qty))
+            stock_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            
+            if stock_qty <= 0:
+                stock_item.setBackground(QColor("#FFCCCC"))  # Light red for out of stock
+            elif stock_qty <= reorder_level:
+                stock_item.setBackground(QColor("#FFFFCC"))  # Light yellow for low stock
+            
+            self.products_table.setItem(row_idx, 7, stock_item)
+            
+            # Expiry Date
+            if expiry_date:
+                expiry_item = QTableWidgetItem(expiry_date.strftime("%Y-%m-%d"))
                 
-                delete_btn = QPushButton()
-                delete_btn.setIcon(QIcon("resources/icons/delete.png"))
-                delete_btn.setToolTip("Delete Product")
-                delete_btn.setMaximumWidth(30)
-                delete_btn.clicked.connect(lambda _, pid=product_id, name=name: self.delete_product(pid, name))
-                actions_layout.addWidget(delete_btn)
+                if days_to_expiry < 0:
+                    expiry_item.setBackground(QColor("#FF9999"))  # Red for expired
+                elif days_to_expiry <= ProductModel.EXPIRING_SOON_DAYS:
+                    expiry_item.setBackground(QColor("#FFCC99"))  # Orange for expiring soon
                 
-                self.products_table.setCellWidget(row_idx, 10, actions_widget)
-            
-            self.products_table.resizeColumnsToContents()
-            self.products_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load products: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+                self.products_table.setItem(row_idx, 8, expiry_item)
+            else:
+                self.products_table.setItem(row_idx, 8, QTableWidgetItem("N/A"))
+            
+            # Status, classified by the server
+            status_item = QTableWidgetItem(status)
+            status_item.setBackground(QColor(STATUS_COLORS[status]))
+            self.products_table.setItem(row_idx, 9, status_item)
+            
+            # Actions
+            actions_widget = QWidget()
+            actions_layout = QHBoxLayout(actions_widget)
+            actions_layout.setContentsMargins(2, 2, 2, 2)
+            actions_layout.setSpacing(2)
+            
+            edit_btn = QPushButton()
+            edit_btn.setIcon(QIcon("resources/icons/edit.png"))
+            edit_btn.setToolTip("Edit Product")
+            edit_btn.setMaximumWidth(30)
+            edit_btn.clicked.connect(lambda _, pid=product_id: self.edit_product(pid))
+            actions_layout.addWidget(edit_btn)
+            
+            delete_btn = QPushButton()
+            delete_btn.setIcon(QIcon("resources/icons/delete.png"))
+            delete_btn.setToolTip("Delete Product")
+            delete_btn.setMaximumWidth(30)
+            delete_btn.clicked.connect(lambda _, pid=product_id, name=name: self.delete_product(pid, name))
+            actions_layout.addWidget(delete_btn)
+            
+            self.products_table.setCellWidget(row_idx, 10, actions_widget)
+    
+    def products_loaded(self, total):
+        """Resize the table, show the status counts and re-apply the search once all products have arrived"""
+        counts = self.status_counts.pop(repr(self.product_filters()), None)
+        self.status_counts.clear()
+        if counts is not None:
+            self.status_summary_label.setText("    ".join(
+                f"{status}: {count}" for status, count in counts.items()
+            ))
+        self.products_table.resizeColumnsToContents()
+        self.products_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.filter_products()
+    
+    def products_load_failed(self, message):
+        """Report a failed background load"""
+        QMessageBox.critical(self, "Error", f"Failed to load products: {message}")
     
     def load_category_filter(self):
         """Load categories into filter dropdown"""
@@ -921,79 +961,12 @@ class InventoryManagementWidget(QWidget):
             QMessageBox.critical(self, "Error", f"Failed to load categories: {str(e)}")
     
     def filter_products(self):
-        """Filter products based on search criteria"""
+        """Filter the loaded products by the search text; the other filters are applied by the server"""
         search_text = self.search_input.text().lower()
-        category_id = self.category_filter.currentData()
-        type_filter = self.type_filter.currentData()
-        stock_filter = self.stock_filter.currentData()
-        expiry_filter = self.expiry_filter.currentData()
-        status_filter = self.status_filter.currentData()
         
         for row in range(self.products_table.rowCount()):
-            show_row = True
-            
-            # Filter by product name
             product_name = self.products_table.item(row, 1).text().lower()
-            if search_text and search_text not in product_name:
-                show_row = False
-            
-            # Filter by medication type (branded/generic)
-            if type_filter:
-                type_text = self.products_table.item(row, 3).text().lower()
-                if type_filter == "branded" and type_text != "branded":
-                    show_row = False
-                elif type_filter == "generic" and type_text != "generic":
-                    show_row = False
-            
-            # Filter by category
-            if category_id is not None:
-                category_name = self.products_table.item(row, 4).text()
-                category_match = False
-                
-                for i in range(self.category_filter.count()):
-                    if (self.category_filter.itemData(i) == category_id and 
-                        self.category_filter.itemText(i) == category_name):
-                        category_match = True
-                        break
-                
-                if not category_match:
-                    show_row = False
-            
-            # Filter by stock level
-            if stock_filter:
-                stock_qty = int(self.products_table.item(row, 7).text())
-                reorder_level = 10  # Default reorder level
-                
-                if stock_filter == "low" and stock_qty > reorder_level:
-                    show_row = False
-                elif stock_filter == "out" and stock_qty > 0:
-                    show_row = False
-                elif stock_filter == "in" and stock_qty <= 0:
-                    show_row = False
-            
-            # Filter by expiry date
-            if expiry_filter and self.products_table.item(row, 8).text() != "N/A":
-                expiry_date = QDate.fromString(self.products_table.item(row, 8).text(), "yyyy-MM-dd")
-                days_to_expiry = QDate.currentDate().daysTo(expiry_date)
-                
-                if expiry_filter == "expired" and days_to_expiry >= 0:
-                    show_row = False
-                elif expiry_filter == "soon" and (days_to_expiry < 0 or days_to_expiry > 30):
-                    show_row = False
-                elif expiry_filter == "valid" and days_to_expiry < 0:
-                    show_row = False
-            
-            # Filter by status - use column 9 which has the status text
-            if status_filter is not None:
-                status_text = self.products_table.item(row, 9).text()
-                is_active = status_text != "Inactive"  # Any status except "Inactive" is considered active
-                
-                if status_filter == "active" and not is_active:
-                    show_row = False
-                elif status_filter == "inactive" and is_active:
-                    show_row = False
-        
-            self.products_table.setRowHidden(row, not show_row)
+            self.products_table.setRowHidden(row, bool(search_text) and search_text not in product_name)
     
     def add_product(self):
         """Add a new product"""
@@ -1212,204 +1185,163 @@ class InventoryManagementWidget(QWidget):
             "Please click on the 'Categories' tab to manage categories.")
     
     def load_alerts(self):
-        """Load stock alerts (low stock and expiring products)"""
-        self.load_low_stock()
-        self.load_expiring_products()
-    
-    def load_low_stock(self):
-        """Load low stock items"""
+        """Load stock alerts (low stock and expiring products) with one query"""
         try:
-            # Check if the database has the new medication fields
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
+            alerts = self.product_model.get_stock_alerts()
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load stock alerts: {str(e)}")
+            import traceback
+            print(traceback.format_exc())
+            return
+        
+        self.show_low_stock(alerts['low_stock'])
+        self.show_expiring_products(alerts['expiring'])
+        self.load_reorder_plan()
+    
+    def load_reorder_plan(self):
+        """Start planning reorders in the background"""
+        self.reorder_tree.clear()
+        lead_time_days = self.lead_time_input.value()
+        cover_days = self.cover_days_input.value()
+        self.reorder_loader.load_function(
+            lambda: plan_reorders(self.db, lead_time_days=lead_time_days, cover_days=cover_days)
+        )
+    
+    def append_reorder_groups(self, groups):
+        """Add a chunk of supplier purchase lists to the reorder tree"""
+        for group in groups:
+            supplier_item = QTreeWidgetItem(self.reorder_tree, [
+                group['supplier_name'], "", "", "", "", 
+                str(sum(line['suggested_quantity'] for line in group['lines'])),
+                f"₱{group['total_cost']:.2f}"
+            ])
+            font = supplier_item.font(0)
+            font.setBold(True)
+            supplier_item.setFont(0, font)
+            
+            for line in group['lines']:
+                cover = line['days_of_cover']
+                line_item = QTreeWidgetItem(supplier_item, [
+                    line['product_name'],
+                    str(line['stock_quantity']),
+                    str(line['reorder_level']),
+                    f"{line['velocity']:.2f}",
+                    "No recent sales" if cover == float('inf') else f"{cover:.1f}",
+                    str(line['suggested_quantity']),
+                    f"₱{line['line_cost']:.2f}"
+                ])
+                if cover < self.lead_time_input.value():
+                    line_item.setBackground(4, QColor("#FFCCCC"))  # Runs out before an order arrives
+            supplier_item.setExpanded(True)
+    
+    def reorder_plan_failed(self, message):
+        """Report a failed reorder plan"""
+        QMessageBox.critical(self, "Error", f"Failed to plan reorders: {message}")
+    
+    def show_low_stock(self, low_stock):
+        """Fill the low stock table"""
+        self.low_stock_table.setRowCount(0)
+        
+        for row_idx, product in enumerate(low_stock):
+            self.low_stock_table.insertRow(row_idx)
             
-            try:
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'products' AND column_name = 'is_generic'
-                """)
-                has_med_fields = cursor.fetchone() is not None
-            except:
-                has_med_fields = False
-            finally:
-                cursor.close()
-                self.db.release_connection(connection)
+            product_id, product_name, is_generic, category_name, stock_qty, reorder_level, _, _ = product
             
-            # Update query based on whether the fields exist
-            if has_med_fields:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, p.is_generic, c.name, 
-                           p.stock_quantity, p.reorder_level
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE p.stock_quantity <= p.reorder_level AND p.is_active = TRUE
-                    ORDER BY (p.reorder_level - p.stock_quantity) DESC, p.product_name
-                """
+            # Product Name
+            self.low_stock_table.setItem(row_idx, 0, QTableWidgetItem(product_name))
+            
+            # Medication Type
+            type_text = "Generic" if is_generic else "Branded"
+            self.low_stock_table.setItem(row_idx, 1, QTableWidgetItem(type_text))
+            
+            # Category
+            self.low_stock_table.setItem(row_idx, 2, QTableWidgetItem(category_name or "Uncategorized"))
+            
+            # Current Stock
+            stock_item = QTableWidgetItem(str(stock_qty))
+            stock_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            
+            if stock_qty <= 0:
+                stock_item.setBackground(QColor("#FFCCCC"))  # Light red for out of stock
             else:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, NULL as is_generic, c.name, 
-                           p.stock_quantity, p.reorder_level
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE p.stock_quantity <= p.reorder_level AND p.is_active = TRUE
-                    ORDER BY (p.reorder_level - p.stock_quantity) DESC, p.product_name
-                """
+                stock_item.setBackground(QColor("#FFFFCC"))  # Light yellow for low stock
             
-            low_stock = self.db.execute_query(query, fetchall=True)
+            self.low_stock_table.setItem(row_idx, 3, stock_item)
             
-            self.low_stock_table.setRowCount(0)
+            # Reorder Level
+            reorder_item = QTableWidgetItem(str(reorder_level))
+            reorder_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.low_stock_table.setItem(row_idx, 4, reorder_item)
             
-            for row_idx, product in enumerate(low_stock):
-                self.low_stock_table.insertRow(row_idx)
-                
-                product_id, product_name, description, is_generic, category_name, stock_qty, reorder_level = product
-                
-                # Product Name
-                self.low_stock_table.setItem(row_idx, 0, QTableWidgetItem(product_name))
-                
-                # Medication Type
-                type_text = "Generic" if is_generic else "Branded"
-                self.low_stock_table.setItem(row_idx, 1, QTableWidgetItem(type_text))
-                
-                # Category
-                self.low_stock_table.setItem(row_idx, 2, QTableWidgetItem(category_name or "Uncategorized"))
-                
-                # Current Stock
-                stock_item = QTableWidgetItem(str(stock_qty))
-                stock_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                
-                if stock_qty <= 0:
-                    stock_item.setBackground(QColor("#FFCCCC"))  # Light red for out of stock
-                else:
-                    stock_item.setBackground(QColor("#FFFFCC"))  # Light yellow for low stock
-                
-                self.low_stock_table.setItem(row_idx, 3, stock_item)
-                
-                # Reorder Level
-                reorder_item = QTableWidgetItem(str(reorder_level))
-                reorder_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.low_stock_table.setItem(row_idx, 4, reorder_item)
-                
-                # Actions
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                actions_layout.setSpacing(2)
-                
-                edit_btn = QPushButton()
-                edit_btn.setIcon(QIcon("resources/icons/edit.png"))
-                edit_btn.setToolTip("Edit Product")
-                edit_btn.setMaximumWidth(30)
-                edit_btn.clicked.connect(lambda _, pid=product_id: self.edit_product(pid))
-                actions_layout.addWidget(edit_btn)
-                
-                self.low_stock_table.setCellWidget(row_idx, 5, actions_widget)
+            # Actions
+            actions_widget = QWidget()
+            actions_layout = QHBoxLayout(actions_widget)
+            actions_layout.setContentsMargins(2, 2, 2, 2)
+            actions_layout.setSpacing(2)
             
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load low stock items: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            edit_btn = QPushButton()
+            edit_btn.setIcon(QIcon("resources/icons/edit.png"))
+            edit_btn.setToolTip("Edit Product")
+            edit_btn.setMaximumWidth(30)
+            edit_btn.clicked.connect(lambda _, pid=product_id: self.edit_product(pid))
+            actions_layout.addWidget(edit_btn)
+            
+            self.low_stock_table.setCellWidget(row_idx, 5, actions_widget)
     
-    def load_expiring_products(self):
-        """Load expiring products"""
-        try:
-            # Check if the database has the new medication fields
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
+    def show_expiring_products(self, expiring):
+        """Fill the expiring products table"""
+        self.expiring_table.setRowCount(0)
+        
+        for row_idx, product in enumerate(expiring):
+            self.expiring_table.insertRow(row_idx)
             
-            try:
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'products' AND column_name = 'is_generic'
-                """)
-                has_med_fields = cursor.fetchone() is not None
-            except:
-                has_med_fields = False
-            finally:
-                cursor.close()
-                self.db.release_connection(connection)
+            product_id, product_name, is_generic, category_name, _, _, expiry_date, days_to_expiry = product
             
-            # Update query based on whether the fields exist
-            if has_med_fields:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, p.is_generic, c.name, p.expiry_date
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE p.expiry_date IS NOT NULL AND p.expiry_date <= %s AND p.is_active = TRUE
-                    ORDER BY p.expiry_date, p.product_name
-                """
+            # Product Name
+            self.expiring_table.setItem(row_idx, 0, QTableWidgetItem(product_name))
+            
+            # Medication Type
+            type_text = "Generic" if is_generic else "Branded"
+            self.expiring_table.setItem(row_idx, 1, QTableWidgetItem(type_text))
+            
+            # Category
+            self.expiring_table.setItem(row_idx, 2, QTableWidgetItem(category_name or "Uncategorized"))
+            
+            # Expiry Date
+            expiry_item = QTableWidgetItem(expiry_date.strftime("%Y-%m-%d"))
+            
+            if days_to_expiry < 0:
+                expiry_item.setBackground(QColor("#FF9999"))  # Red for expired
             else:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, NULL as is_generic, c.name, p.expiry_date
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE p.expiry_date IS NOT NULL AND p.expiry_date <= %s AND p.is_active = TRUE
-                    ORDER BY p.expiry_date, p.product_name
-                """
+                expiry_item.setBackground(QColor("#FFCC99"))  # Orange for expiring soon
             
-            thirty_days_later = QDate.currentDate().addDays(30).toPyDate()
-            expiring = self.db.execute_query(query, (thirty_days_later,), fetchall=True)
+            self.expiring_table.setItem(row_idx, 3, expiry_item)
             
-            self.expiring_table.setRowCount(0)
+            # Days Remaining
+            days_item = QTableWidgetItem(str(days_to_expiry) if days_to_expiry >= 0 else "Expired")
+            days_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
             
-            for row_idx, product in enumerate(expiring):
-                self.expiring_table.insertRow(row_idx)
-                
-                product_id, product_name, description, is_generic, category_name, expiry_date = product
-                
-                # Product Name
-                self.expiring_table.setItem(row_idx, 0, QTableWidgetItem(product_name))
-                
-                # Medication Type
-                type_text = "Generic" if is_generic else "Branded"
-                self.expiring_table.setItem(row_idx, 1, QTableWidgetItem(type_text))
-                
-                # Category
-                self.expiring_table.setItem(row_idx, 2, QTableWidgetItem(category_name or "Uncategorized"))
-                
-                # Expiry Date
-                expiry_item = QTableWidgetItem(expiry_date.strftime("%Y-%m-%d"))
-                days_to_expiry = (expiry_date - QDate.currentDate().toPyDate()).days
-                
-                if days_to_expiry < 0:
-                    expiry_item.setBackground(QColor("#FF9999"))  # Red for expired
-                else:
-                    expiry_item.setBackground(QColor("#FFCC99"))  # Orange for expiring soon
-                
-                self.expiring_table.setItem(row_idx, 3, expiry_item)
-                
-                # Days Remaining
-                days_item = QTableWidgetItem(str(days_to_expiry) if days_to_expiry >= 0 else "Expired")
-                days_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                
-                if days_to_expiry < 0:
-                    days_item.setBackground(QColor("#FF9999"))  # Red for expired
-                else:
-                    days_item.setBackground(QColor("#FFCC99"))  # Orange for expiring soon
-                
-                self.expiring_table.setItem(row_idx, 4, days_item)
-                
-                # Actions
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                actions_layout.setSpacing(2)
-                
-                edit_btn = QPushButton()
-                edit_btn.setIcon(QIcon("resources/icons/edit.png"))
-                edit_btn.setToolTip("Edit Product")
-                edit_btn.setMaximumWidth(30)
-                edit_btn.clicked.connect(lambda _, pid=product_id: self.edit_product(pid))
-                actions_layout.addWidget(edit_btn)
-                
-                self.expiring_table.setCellWidget(row_idx, 5, actions_widget)
+            if days_to_expiry < 0:
+                days_item.setBackground(QColor("#FF9999"))  # Red for expired
+            else:
+                days_item.setBackground(QColor("#FFCC99"))  # Orange for expiring soon
             
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load expiring products: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
+            self.expiring_table.setItem(row_idx, 4, days_item)
+            
+            # Actions
+            actions_widget = QWidget()
+            actions_layout = QHBoxLayout(actions_widget)
+            actions_layout.setContentsMargins(2, 2, 2, 2)
+            actions_layout.setSpacing(2)
+            
+            edit_btn = QPushButton()
+            edit_btn.setIcon(QIcon("resources/icons/edit.png"))
+            edit_btn.setToolTip("Edit Product")
+            edit_btn.setMaximumWidth(30)
+            edit_btn.clicked.connect(lambda _, pid=product_id: self.edit_product(pid))
+            actions_layout.addWidget(edit_btn)
+            
+            self.expiring_table.setCellWidget(row_idx, 5, actions_widget)
     
     def export_inventory(self):
         """Export inventory to Excel"""
@@ -19,6 +19,11 @@ logging.basicConfig(
 # Import UI components
 from ui.login import LoginWindow
 from database.db_connector import DatabaseConnection
+from database.sales_partitions import sales_migration_pending
+from database.schema import apply_schema_updates
+from database.offline_store import get_offline_store
+from utils.connectivity import install_connectivity_monitor
+from utils.watchdog import install_watchdog
 
 def create_config_if_not_exists():
     """Create default config.ini if it doesn't exist"""
@@ -34,7 +39,9 @@ def create_config_if_not_exists():
             'password': 'your_new_password',  # Change this to a secure password
             'port': '5432',
             'min_connections': '1',
-            'max_connections': '10'
+            'max_connections': '10',
+            'checkout_timeout_ms': '5000',
+            'checkout_attempts': '3'
         }
         
         # Application section
@@ -45,12 +52,62 @@ def create_config_if_not_exists():
             'currency_symbol': '₱'  # Set default currency symbol to Philippine Peso
         }
         
+        # UI stall watchdog section
+        config['watchdog'] = {
+            'enabled': 'True',
+            'threshold_ms': '200',
+            'interval_ms': '50'
+        }
+        
+        # Offline mode section
+        config['offline'] = {
+            'probe_interval_ms': '15000'
+        }
+        
+        # Audit sink section
+        config['audit'] = {
+            'flush_interval_ms': '500',
+            'batch_size': '100',
+            'retention_months': '12',
+            'archive_dir': 'archives/audit_logs'
+        }
+        
+        # Report cache section
+        config['reports'] = {
+            'cache_budget_mb': '32',
+            'today_ttl_seconds': '60',
+            'cube_max_rows': '2000000'
+        }
+        
         # Write to file
         with open(config_file, 'w') as f:
             config.write(f)
         
         logging.info(f"Created default configuration file: {config_file}")
 
+def start_stall_watchdog(app):
+    """Start the UI stall watchdog using the [watchdog] settings in config.ini"""
+    try:
+        config = ConfigParser()
+        config.read('config.ini')
+        if not config.getboolean('watchdog', 'enabled', fallback=True):
+            logging.info("UI stall watchdog disabled in config")
+            return None
+        
+        threshold_ms = config.getint('watchdog', 'threshold_ms', fallback=200)
+        interval_ms = config.getint('watchdog', 'interval_ms', fallback=50)
+        return install_watchdog(app, threshold_ms, interval_ms)
+    except Exception as e:
+        logging.error(f"Failed to start UI stall watchdog: {e}")
+        return None
+
+def start_connectivity_monitor(app, online):
+    """Start the connectivity monitor using the [offline] settings in config.ini"""
+    config = ConfigParser()
+    config.read('config.ini')
+    interval_ms = config.getint('offline', 'probe_interval_ms', fallback=15000)
+    return install_connectivity_monitor(online, interval_ms, parent=app)
+
 def test_database_connection():
     """Test database connection and initialize schema if needed"""
     try:
@@ -78,6 +135,9 @@ def test_database_connection():
             logging.warning("Categories table not found, creating it...")
             create_tables(db)
         
+        # Bring indexes and columns up to date
+        apply_schema_updates(db)
+        
         return True
     except Exception as e:
         logging.error(f"Database connection failed: {str(e)}")
@@ -140,15 +200,44 @@ def main():
         app.setApplicationName("Pharmacy Management System")
         app.setStyle("Fusion")  # Modern style
         
+        # Watch the event loop for stalls
+        start_stall_watchdog(app)
+        
         # Test database connection
-        if not test_database_connection():
-            # Show error message box
+        db_online = test_database_connection()
+        if db_online and sales_migration_pending(DatabaseConnection()):
+            # Never migrate on start-up: it locks every terminal out of sales while it runs
             QMessageBox.critical(
-                None, 
-                "Database Connection Error",
-                "Failed to connect to the database. Please check your configuration and ensure PostgreSQL is running."
+                None,
+                "Database Migration Required",
+                "The sales tables must be converted to monthly partitions before the application "
+                "can start.\n\nClose the application on every terminal, then run:\n"
+                "python migrate_sales.py"
             )
             sys.exit(1)
+        if not db_online:
+            if not get_offline_store().has_cached_users():
+                # Nobody has logged in on this terminal yet, so offline login is impossible
+                QMessageBox.critical(
+                    None, 
+                    "Database Connection Error",
+                    "Failed to connect to the database. Please check your configuration and ensure PostgreSQL is running."
+                )
+                sys.exit(1)
+            
+            reply = QMessageBox.question(
+                None,
+                "Database Connection Error",
+                "Failed to connect to the database.\n\n"
+                "Start in offline mode? Only the Point of Sale is available; sales are saved "
+                "on this computer and sent to the server when the connection is back.",
+                QMessageBox.Yes | QMessageBox.No
+            )
+            if reply != QMessageBox.Yes:
+                sys.exit(1)
+        
+        # Probes the server while offline and replays the offline sales
+        start_connectivity_monitor(app, db_online)
             
         # Show login window
         login_window = LoginWindow()
@@ -0,0 +1,48 @@
+# migrate_sales.py
+"""
+Convert sales and sale_items to monthly partitions.
+
+A one-off migration: both tables are rewritten in one transaction under an
+exclusive lock, so no terminal can sell while it runs. Close the application
+on every terminal first; it refuses to start until this has been done. The
+schema updates that follow the migration (indexes, triggers, the daily sales
+rollup) are applied again so they exist on the partitioned tables. If
+anything fails the transaction is rolled back and the tables are left as
+they were.
+
+Usage: python migrate_sales.py
+"""
+import sys
+
+from database.db_connector import DatabaseConnection
+from database.sales_partitions import sales_migration_pending
+from database.schema import SALES_MIGRATION, apply_schema_updates
+
+
+def migrate():
+    """Run the migration and return True on success"""
+    db = DatabaseConnection()
+    try:
+        if not sales_migration_pending(db):
+            print("sales is already partitioned; nothing to do")
+            return True
+
+        apply_schema_updates(db, (SALES_MIGRATION,))
+        if sales_migration_pending(db):
+            print("Migration error: sales is still not partitioned, see app.log")
+            return False
+        print("sales and sale_items converted to monthly partitions")
+        return True
+    except Exception as e:
+        print(f"Migration error: {str(e)}")
+        return False
+    finally:
+        db.close_all_connections()
+
+
+if __name__ == "__main__":
+    print("Sales Partitioning Migration")
+    print("============================")
+    success = migrate()
+    print(f"\nMigration {'successful' if success else 'failed'}!")
+    sys.exit(0 if success else 1)
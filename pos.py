@@ -7,9 +7,16 @@ from PyQt5.QtCore import Qt, QDate, QStringListModel, pyqtSignal
 from PyQt5.QtGui import QIcon, QFont, QColor, QPixmap, QPainter, QPen, QTextDocument
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog, QPrintPreviewDialog
 import datetime
+import logging
 import math
+import uuid
+import psycopg2
 from database.db_connector import DatabaseConnection
+from database.models import SaleModel, InsufficientStockError
+from database.offline_store import get_offline_store
 from utils.auth import Authentication
+from utils.connectivity import get_connectivity_monitor
+from utils.loader import DataLoader, BusyIndicator
 
 class POSWidget(QWidget):
     """Widget for Point of Sale functionality"""
@@ -19,9 +26,25 @@ class POSWidget(QWidget):
         self.user = user
         self.db = DatabaseConnection()
         self.auth = Authentication()
+        self.sale_model = SaleModel()
         self.cart_items = []
         self.selected_product = None
+        self.product_names = []
+        # Idempotency key of the cart being checked out, kept until it is recorded
+        self.checkout_key = None
+        self.checkout_signature = None
+        self.announce_refresh = False
+        # Sells from the local catalog snapshot while the server is unreachable
+        self.offline_store = get_offline_store()
+        self.connectivity = get_connectivity_monitor()
+        self.connectivity.online_changed.connect(self.connectivity_changed)
+        self.catalog_rows = []
+        self.products_loader = DataLoader(self)
+        self.products_loader.rows_loaded.connect(self.append_products)
+        self.products_loader.load_finished.connect(self.products_loaded)
+        self.products_loader.load_failed.connect(self.products_load_failed)
         self.init_ui()
+        self.update_offline_label()
         self.load_products()
     
     def init_ui(self):
@@ -32,6 +55,15 @@ class POSWidget(QWidget):
         left_widget = QWidget()
         left_layout = QVBoxLayout(left_widget)
         
+        # Offline banner
+        self.offline_label = QLabel()
+        self.offline_label.setWordWrap(True)
+        self.offline_label.setStyleSheet(
+            "background-color: #f39c12; color: white; font-weight: bold; padding: 6px; border-radius: 4px;"
+        )
+        self.offline_label.setVisible(False)
+        left_layout.addWidget(self.offline_label)
+        
         # Search and product selection section
         search_group = QGroupBox("Product Search")
         search_layout = QVBoxLayout(search_group)
@@ -74,6 +106,10 @@ class POSWidget(QWidget):
         self.products_table.itemSelectionChanged.connect(self.product_selected)
         search_layout.addWidget(self.products_table)
         
+        self.busy_indicator = BusyIndicator(text="Loading products...")
+        self.busy_indicator.attach(self.products_loader)
+        search_layout.addWidget(self.busy_indicator)
+        
         left_layout.addWidget(search_group)
         
         # Product details and add to cart
@@ -363,140 +399,153 @@ class POSWidget(QWidget):
             self.category_filter.addItem("All Categories", None)
             self.load_categories()
         
-            # Reload products
+            # Reload products; the success message is shown once loading finishes
+            self.announce_refresh = True
             self.load_products()
         
-            # Show success message
-            QMessageBox.information(self, "Refresh Complete", "Product list has been refreshed successfully.")
-        
         except Exception as e:
             QMessageBox.critical(self, "Refresh Error", f"Failed to refresh products: {str(e)}")
     
     def load_products(self):
-        """Load products from database into table"""
-        connection = None
-        cursor = None
-        try:
-            # Clear the table first
-            self.products_table.setRowCount(0)
-    
-            # Get a direct connection
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
+        """Start loading products from database into table"""
+        # Clear the table first
+        self.products_table.setRowCount(0)
+        self.product_names = []
+        self.catalog_rows = []
+        if self.connectivity.online:
+            self.products_loader.load_cursor(self.execute_products_query)
+        else:
+            self.products_loader.load_function(self.offline_store.get_catalog)
     
-            # Check if the additional columns exist
+    def execute_products_query(self, cursor):
+        """Run the product list query on a loader cursor (called off the UI thread)"""
+        # Check if the additional columns exist
+        has_medication_details = False
+        try:
+            cursor.execute("""
+                SELECT column_name 
+                FROM information_schema.columns 
+                WHERE table_name = 'products' AND column_name = 'is_generic'
+            """)
+            has_medication_details = cursor.fetchone() is not None
+        except:
+            # If the check fails, assume columns don't exist
             has_medication_details = False
-            try:
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'products' AND column_name = 'is_generic'
-                """)
-                has_medication_details = cursor.fetchone() is not None
-            except:
-                # If the check fails, assume columns don't exist
-                has_medication_details = False
+
+        # Get products with stock > 0 AND is_active = TRUE
+        if has_medication_details:
+            # If medication detail columns exist, include them
+            query = """
+                SELECT p.product_id, p.product_name, p.description, p.is_generic, c.name, 
+                       p.unit_measurement, p.unit_price, p.stock_quantity
+                FROM products p
+                LEFT JOIN categories c ON p.category_id = c.category_id
+                WHERE p.stock_quantity > 0 AND p.is_active = TRUE
+                ORDER BY p.product_name
+            """
+        else:
+            # Original query without medication details - add placeholders for the missing columns
+            query = """
+                SELECT p.product_id, p.product_name, p.description, NULL as is_generic, c.name, 
+                       '' as unit_measurement, p.unit_price, p.stock_quantity
+                FROM products p
+                LEFT JOIN categories c ON p.category_id = c.category_id
+                WHERE p.stock_quantity > 0 AND p.is_active = TRUE
+                ORDER BY p.product_name
+            """
+        
+        cursor.execute(query)
     
-            # Get products with stock > 0 AND is_active = TRUE
-            if has_medication_details:
-                # If medication detail columns exist, include them
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, p.is_generic, c.name, 
-                           p.unit_measurement, p.unit_price, p.stock_quantity
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE p.stock_quantity > 0 AND p.is_active = TRUE
-                    ORDER BY p.product_name
-                """
-            else:
-                # Original query without medication details - add placeholders for the missing columns
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, NULL as is_generic, c.name, 
-                           '' as unit_measurement, p.unit_price, p.stock_quantity
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE p.stock_quantity > 0 AND p.is_active = TRUE
-                    ORDER BY p.product_name
-                """
+    def append_products(self, products):
+        """Append a chunk of loaded products to the table"""
+        for product in products:
+            row_idx = self.products_table.rowCount()
+            self.products_table.insertRow(row_idx)
             
-            cursor.execute(query)
-            products = cursor.fetchall()
-    
-            # Build product name completer
-            product_names = []
+            product_id = product[0]
+            name = product[1]
+            description = product[2] or ""
+            is_generic = product[3]
+            category = product[4] or "Uncategorized"
+            unit_measurement = product[5] or ""
+            price = product[6]
+            stock = product[7]
+            
+            # Add to autocomplete list
+            self.product_names.append(name)
+            self.catalog_rows.append(product)
+            
+            # Product ID (column 0)
+            self.products_table.setItem(row_idx, 0, QTableWidgetItem(str(product_id)))
+            
+            # Product Name (column 1)
+            self.products_table.setItem(row_idx, 1, QTableWidgetItem(name))
+            
+            # Description (column 2)
+            self.products_table.setItem(row_idx, 2, QTableWidgetItem(description))
+            
+            # Type - Generic/Branded (column 3)
+            type_text = "Generic" if is_generic else "Branded"
+            self.products_table.setItem(row_idx, 3, QTableWidgetItem(type_text))
+            
+            # Category (column 4)
+            self.products_table.setItem(row_idx, 4, QTableWidgetItem(category))
+            
+            # Unit Measurement (column 5)
+            self.products_table.setItem(row_idx, 5, QTableWidgetItem(unit_measurement))
+            
+            # Unit Price (column 6)
+            price_item = QTableWidgetItem(f"₱{float(price):.2f}")
+            price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.products_table.setItem(row_idx, 6, price_item)
+            
+            # Stock (column 7)
+            stock_item = QTableWidgetItem(str(stock))
+            stock_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.products_table.setItem(row_idx, 7, stock_item)
+            
+            # Store additional data in hidden roles for reference
+            self.products_table.item(row_idx, 0).setData(Qt.UserRole, is_generic)
+            self.products_table.item(row_idx, 0).setData(Qt.UserRole + 1, unit_measurement)
+            self.products_table.item(row_idx, 0).setData(Qt.UserRole + 2, category)
     
-            for row_idx, product in enumerate(products):
-                self.products_table.insertRow(row_idx)
-                
-                product_id = product[0]
-                name = product[1]
-                description = product[2] or ""
-                is_generic = product[3]
-                category = product[4] or "Uncategorized"
-                unit_measurement = product[5] or ""
-                price = product[6]
-                stock = product[7]
-                
-                # Add to autocomplete list
-                product_names.append(name)
-                
-                # Product ID (column 0)
-                self.products_table.setItem(row_idx, 0, QTableWidgetItem(str(product_id)))
-                
-                # Product Name (column 1)
-                self.products_table.setItem(row_idx, 1, QTableWidgetItem(name))
-                
-                # Description (column 2)
-                self.products_table.setItem(row_idx, 2, QTableWidgetItem(description))
-                
-                # Type - Generic/Branded (column 3)
-                type_text = "Generic" if is_generic else "Branded"
-                self.products_table.setItem(row_idx, 3, QTableWidgetItem(type_text))
-                
-                # Category (column 4)
-                self.products_table.setItem(row_idx, 4, QTableWidgetItem(category))
-                
-                # Unit Measurement (column 5)
-                self.products_table.setItem(row_idx, 5, QTableWidgetItem(unit_measurement))
-                
-                # Unit Price (column 6)
-                price_item = QTableWidgetItem(f"₱{float(price):.2f}")
-                price_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.products_table.setItem(row_idx, 6, price_item)
-                
-                # Stock (column 7)
-                stock_item = QTableWidgetItem(str(stock))
-                stock_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.products_table.setItem(row_idx, 7, stock_item)
-                
-                # Store additional data in hidden roles for reference
-                self.products_table.item(row_idx, 0).setData(Qt.UserRole, is_generic)
-                self.products_table.item(row_idx, 0).setData(Qt.UserRole + 1, unit_measurement)
-                self.products_table.item(row_idx, 0).setData(Qt.UserRole + 2, category)
+    def products_loaded(self, total):
+        """Set up autocomplete once all products have arrived"""
+        completer = QCompleter(self.product_names)
+        completer.setCaseSensitivity(Qt.CaseInsensitive)
+        self.search_input.setCompleter(completer)
         
-            # Setup autocomplete
-            completer = QCompleter(product_names)
-            completer.setCaseSensitivity(Qt.CaseInsensitive)
-            self.search_input.setCompleter(completer)
+        # Reset the selection
+        self.products_table.clearSelection()
+        self.filter_products()
         
-            # Reset the selection
-            self.products_table.clearSelection()
+        print(f"Loaded {self.products_table.rowCount()} products")
         
-            print(f"Loaded {self.products_table.rowCount()} products")
+        # Keep the snapshot offline mode sells from up to date
+        if self.connectivity.online:
+            try:
+                self.offline_store.save_catalog(self.catalog_rows)
+            except Exception as e:
+                logging.error(f"Error saving offline catalog snapshot: {e}")
         
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load products: {str(e)}")
-            print(f"Error loading products: {str(e)}")
-            import traceback
-            print(traceback.format_exc())
-        finally:
-            if cursor:
-                cursor.close()
-            if connection:
-                self.db.release_connection(connection)
+        if self.announce_refresh:
+            self.announce_refresh = False
+            QMessageBox.information(self, "Refresh Complete", "Product list has been refreshed successfully.")
+    
+    def products_load_failed(self, message):
+        """Report a failed background load"""
+        self.announce_refresh = False
+        QMessageBox.critical(self, "Error", f"Failed to load products: {message}")
+        print(f"Error loading products: {message}")
     
     def load_categories(self):
         """Load categories into filter dropdown"""
+        if not self.connectivity.online:
+            # The filter compares category names, which the snapshot has
+            for name in self.offline_store.get_catalog_categories():
+                self.category_filter.addItem(name, name)
+            return
+        
         try:
             query = "SELECT category_id, name FROM categories ORDER BY name"
             categories = self.db.execute_query(query, fetchall=True)
@@ -602,6 +651,7 @@ class POSWidget(QWidget):
             QMessageBox.warning(self, "Invalid Quantity", "Please enter a quantity greater than zero.")
             return
         
+        # Early warning only; checkout re-checks stock atomically
         if quantity > self.selected_product['stock']:
             QMessageBox.warning(self, "Insufficient Stock", 
                                f"Only {self.selected_product['stock']} units available.")
@@ -770,151 +820,183 @@ class POSWidget(QWidget):
             return
     
         try:
-            # Begin transaction
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
-        
-            try:
-                # Insert sale record
-                payment_method = self.payment_method.currentText()
-                notes = self.notes_input.toPlainText()
-                subtotal = sum(item['subtotal'] for item in self.cart_items)
-            
-                # Get cash tendered and change for cash payments
-                cash_tendered = 0
-                change_amount = 0
-                if payment_method == "Cash":
-                    cash_tendered = self.cash_tendered_input.value()
-                    change_amount = cash_tendered - subtotal
-            
-                # Generate invoice number (format: INV-YYYYMMDD-XXXX)
-                today = datetime.datetime.now()
-                date_part = today.strftime("%Y%m%d")
+            payment_method = self.payment_method.currentText()
+            notes = self.notes_input.toPlainText()
+            subtotal = sum(item['subtotal'] for item in self.cart_items)
+        
+            # Get cash tendered and change for cash payments
+            cash_tendered = 0
+            change_amount = 0
+            if payment_method == "Cash":
+                cash_tendered = self.cash_tendered_input.value()
+                change_amount = cash_tendered - subtotal
+        
+            # Sale, items and stock are written in one transaction; stock is
+            # only taken if it is still available when the sale commits
+            sale_items = [
+                {
+                    'product_id': item['id'],
+                    'quantity': item['quantity'],
+                    'unit_price': item['price'],
+                    'subtotal': item['subtotal'],
+                    'is_generic': item.get('is_generic', False),
+                    'unit_measurement': item.get('unit_measurement', '')
+                }
+                for item in self.cart_items
+            ]
             
-                # Get latest invoice number
-                cursor.execute(
-                    "SELECT invoice_number FROM sales WHERE invoice_number LIKE %s ORDER BY invoice_number DESC LIMIT 1",
-                    (f"INV-{date_part}-%",)
-                )
-                result = cursor.fetchone()
+            # The same cart keeps its key until it is recorded, so pressing
+            # Checkout again after a lost connection returns the original sale
+            cart_signature = (payment_method, tuple(
+                (item['product_id'], item['quantity'], item['unit_price']) for item in sale_items
+            ))
+            if self.checkout_key is None or self.checkout_signature != cart_signature:
+                self.checkout_key = uuid.uuid4()
+                self.checkout_signature = cart_signature
             
-                if result:
-                    last_number = int(result[0].split('-')[-1])
-                    invoice_number = f"INV-{date_part}-{last_number + 1:04d}"
-                else:
-                    invoice_number = f"INV-{date_part}-0001"
+            if not self.connectivity.online:
+                self.record_offline_sale(sale_items, payment_method, notes, cash_tendered, change_amount)
+                return
             
-                # Insert sale
-                cursor.execute(
-                    """
-                    INSERT INTO sales 
-                    (invoice_number, user_id, total_amount, payment_method, notes, cash_tendered, change_amount)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    RETURNING sale_id
-                    """,
-                    (invoice_number, self.user['user_id'], subtotal, payment_method, notes, 
-                     cash_tendered if payment_method == "Cash" else None,
-                     change_amount if payment_method == "Cash" else None)
+            try:
+                sale_id, invoice_number = self.sale_model.checkout(
+                    self.user['user_id'], sale_items, payment_method, notes,
+                    cash_tendered if payment_method == "Cash" else None,
+                    change_amount if payment_method == "Cash" else None,
+                    idempotency_key=self.checkout_key
                 )
-            
-                sale_id = cursor.fetchone()[0]
-                
-                # Check if sale_items table has the additional fields
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'sale_items' AND column_name = 'is_generic'
-                """)
-                has_med_fields = cursor.fetchone() is not None
-            
-                # Insert sale items and update stock
-                for item in self.cart_items:
-                    if has_med_fields:
-                        # Insert sale item with medication details
-                        cursor.execute(
-                            """
-                            INSERT INTO sale_items
-                            (sale_id, product_id, quantity, unit_price, subtotal, is_generic, unit_measurement)
-                            VALUES (%s, %s, %s, %s, %s, %s, %s)
-                            """,
-                            (sale_id, item['id'], item['quantity'], item['price'], item['subtotal'],
-                             item.get('is_generic', False), item.get('unit_measurement', ''))
-                        )
-                    else:
-                        # Insert sale item without medication details
-                        cursor.execute(
-                            """
-                            INSERT INTO sale_items
-                            (sale_id, product_id, quantity, unit_price, subtotal)
-                            VALUES (%s, %s, %s, %s, %s)
-                            """,
-                            (sale_id, item['id'], item['quantity'], item['price'], item['subtotal'])
-                        )
-                
-                    # Update stock
-                    cursor.execute(
-                        """
-                        UPDATE products
-                        SET stock_quantity = stock_quantity - %s
-                        WHERE product_id = %s
-                        """,
-                        (item['quantity'], item['id'])
-                    )
-            
-                # Commit transaction
-                connection.commit()
-            
-                # Log activity
-                self.auth.log_activity(
-                    self.user['user_id'],
-                    "sale",
-                    "sales",
-                    sale_id,
-                    f"Created new sale: {invoice_number}, amount: ₱{subtotal:.2f}"
+            except InsufficientStockError as e:
+                self.checkout_key = None
+                self.show_stock_conflicts(e.failed_lines)
+                return
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # Checkout has already retried; offer to keep selling without the server
+                reply = QMessageBox.question(
+                    self,
+                    "Server Unreachable",
+                    "The database server could not be reached.\n\n"
+                    "Record this sale on this terminal and send it to the server "
+                    "when the connection is back?",
+                    QMessageBox.Yes | QMessageBox.No
                 )
-            
-                # Create a success message
-                message = f"Sale completed successfully!\nInvoice Number: {invoice_number}\nTotal Amount: ₱{subtotal:.2f}"
-            
-                if payment_method == "Cash":
-                    message += f"\nCash Tendered: ₱{cash_tendered:.2f}\nChange: ₱{change_amount:.2f}"
-            
-                # Show dialog with Print Receipt or Cancel options
-                receipt_dialog = QMessageBox(self)
-                receipt_dialog.setWindowTitle("Sale Complete")
-                receipt_dialog.setText(message)
-                receipt_dialog.setIcon(QMessageBox.Information)
-            
-                print_btn = receipt_dialog.addButton("Print Receipt", QMessageBox.AcceptRole)
-                cancel_btn = receipt_dialog.addButton("Close", QMessageBox.RejectRole)
-            
-                receipt_dialog.exec_()
-            
-                clicked_button = receipt_dialog.clickedButton()
-            
-                if clicked_button == print_btn:
-                    # Print the receipt
-                    self.print_receipt(sale_id, invoice_number)
-            
-                # Clear cart and refresh products regardless of which button was clicked
-                self.cart_items = []
-                self.cart_table.setRowCount(0)
-                self.update_totals()
-                self.notes_input.clear()
-                if payment_method == "Cash":
-                    self.cash_tendered_input.setValue(0)
-                self.load_products()
-            
-            except Exception as e:
-                connection.rollback()
-                raise e
+                if reply != QMessageBox.Yes:
+                    raise
+                self.connectivity.go_offline(str(e))
+                self.record_offline_sale(sale_items, payment_method, notes, cash_tendered, change_amount)
+                return
+            self.checkout_key = None
+        
+            # Log activity
+            self.auth.log_activity(
+                self.user['user_id'],
+                "sale",
+                "sales",
+                sale_id,
+                f"Created new sale: {invoice_number}, amount: ₱{subtotal:.2f}"
+            )
+        
+            # Create a success message
+            message = f"Sale completed successfully!\nInvoice Number: {invoice_number}\nTotal Amount: ₱{subtotal:.2f}"
         
-            finally:
-                cursor.close()
-                self.db.release_connection(connection)
+            if payment_method == "Cash":
+                message += f"\nCash Tendered: ₱{cash_tendered:.2f}\nChange: ₱{change_amount:.2f}"
+        
+            # Show dialog with Print Receipt or Cancel options
+            receipt_dialog = QMessageBox(self)
+            receipt_dialog.setWindowTitle("Sale Complete")
+            receipt_dialog.setText(message)
+            receipt_dialog.setIcon(QMessageBox.Information)
+        
+            print_btn = receipt_dialog.addButton("Print Receipt", QMessageBox.AcceptRole)
+            cancel_btn = receipt_dialog.addButton("Close", QMessageBox.RejectRole)
+        
+            receipt_dialog.exec_()
+        
+            clicked_button = receipt_dialog.clickedButton()
+        
+            if clicked_button == print_btn:
+                # Print the receipt
+                self.print_receipt(sale_id, invoice_number)
+        
+            # Clear cart and refresh products regardless of which button was clicked
+            self.reset_after_sale(payment_method)
             
         except Exception as e:
-            QMessageBox.critical(self, "Checkout Error", f"Failed to process checkout: {str(e)}")
+            message = f"Failed to process checkout: {str(e)}"
+            if self.checkout_key is not None:
+                message += "\n\nIt is safe to press Checkout again; the sale will not be recorded twice."
+            QMessageBox.critical(self, "Checkout Error", message)
+    
+    def record_offline_sale(self, sale_items, payment_method, notes, cash_tendered, change_amount):
+        """Journal the sale on this terminal; it is replayed once the server is back"""
+        local_id, invoice_number = self.offline_store.record_sale(
+            self.user['user_id'], sale_items, payment_method, notes,
+            cash_tendered if payment_method == "Cash" else None,
+            change_amount if payment_method == "Cash" else None,
+            idempotency_key=self.checkout_key
+        )
+        self.checkout_key = None
+        
+        subtotal = sum(item['subtotal'] for item in sale_items)
+        message = f"Sale recorded offline.\nInvoice Number: {invoice_number}\nTotal Amount: ₱{subtotal:.2f}"
+        if payment_method == "Cash":
+            message += f"\nCash Tendered: ₱{cash_tendered:.2f}\nChange: ₱{change_amount:.2f}"
+        message += "\n\nThe sale will be sent to the server when the connection is back."
+        QMessageBox.information(self, "Sale Complete (Offline)", message)
+        
+        self.reset_after_sale(payment_method)
+        self.update_offline_label()
+    
+    def reset_after_sale(self, payment_method):
+        """Clear the cart and reload products after a completed sale"""
+        self.cart_items = []
+        self.cart_table.setRowCount(0)
+        self.update_totals()
+        self.notes_input.clear()
+        if payment_method == "Cash":
+            self.cash_tendered_input.setValue(0)
+        self.load_products()
+    
+    def connectivity_changed(self, online):
+        """Switch between the server and the local catalog snapshot"""
+        self.update_offline_label()
+        self.category_filter.clear()
+        self.category_filter.addItem("All Categories", None)
+        self.load_categories()
+        self.load_products()
+    
+    def update_offline_label(self):
+        """Show the offline banner with the number of sales waiting to be sent"""
+        if self.connectivity.online:
+            self.offline_label.setVisible(False)
+            return
+        
+        saved_at = self.offline_store.get_catalog_saved_at() or "never"
+        pending = self.offline_store.get_pending_count()
+        self.offline_label.setText(
+            f"OFFLINE - selling from the product list saved {saved_at}. "
+            f"{pending} sale(s) waiting to be sent to the server."
+        )
+        self.offline_label.setVisible(True)
+    
+    def show_stock_conflicts(self, failed_lines):
+        """Tell the cashier which cart lines another terminal has sold out from under them"""
+        names = {item['id']: item['name'] for item in self.cart_items}
+        lines = [
+            f"• {names.get(line['product_id'], line['product_id'])}: "
+            f"requested {line['requested']}, only {line['available']} available"
+            for line in failed_lines
+        ]
+        QMessageBox.warning(
+            self,
+            "Insufficient Stock",
+            "The sale was not recorded because stock changed since these items were added:\n\n"
+            + "\n".join(lines)
+            + "\n\nPlease adjust the quantities and check out again."
+        )
+        
+        # Show current stock levels
+        self.load_products()
     
     def print_receipt(self, sale_id, invoice_number):
         """Print the sales receipt as PDF"""
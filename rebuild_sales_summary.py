@@ -0,0 +1,78 @@
+# rebuild_sales_summary.py
+"""
+Rebuild the daily sales rollup.
+
+The sales charts read daily_sales_summary, which triggers keep current as
+sales are made and voided. This corrects it from sales and sale_items,
+for every day or for a range of days, e.g. after sales were corrected by
+hand. Nothing is locked, so checkouts can keep running while it works.
+
+With --fold it only folds the pending rollup deltas into the summary, which
+open main windows otherwise do once a minute. Schedule it (e.g. every few
+minutes) where sales can be recorded while no window is open, so the deltas
+don't pile up.
+
+Usage: python rebuild_sales_summary.py [--from YYYY-MM-DD --to YYYY-MM-DD] [--fold]
+"""
+import argparse
+import sys
+
+from database.db_connector import DatabaseConnection
+from database.schema import apply_schema_updates
+from database.sales_summary import fold_daily_sales_deltas, rebuild_daily_sales_summary
+
+
+def rebuild(date_from=None, date_to=None):
+    """Rebuild the rollup and return True on success"""
+    db = DatabaseConnection()
+    try:
+        # Creates the rollup and its triggers if this database doesn't have them yet
+        apply_schema_updates(db)
+        rows = rebuild_daily_sales_summary(db, date_from, date_to)
+        span = f"{date_from} to {date_to}" if date_from else "all days"
+        print(f"Corrected {rows} summary rows ({span})")
+        return True
+    except Exception as e:
+        print(f"Rebuild error: {str(e)}")
+        return False
+    finally:
+        db.close_all_connections()
+
+
+def fold():
+    """Fold the pending rollup deltas and return True on success"""
+    db = DatabaseConnection()
+    try:
+        rows = fold_daily_sales_deltas(db)
+        if rows is None:
+            print("Another terminal is folding the deltas; nothing to do")
+        else:
+            print(f"Folded pending deltas into {rows} summary rows")
+        return True
+    except Exception as e:
+        print(f"Fold error: {str(e)}")
+        return False
+    finally:
+        db.close_all_connections()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild the daily sales summary from the sales tables")
+    parser.add_argument("--from", dest="date_from", help="first day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--to", dest="date_to", help="last day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--fold", action="store_true", help="only fold the pending deltas into the summary")
+    args = parser.parse_args()
+    if bool(args.date_from) != bool(args.date_to):
+        parser.error("--from and --to must be given together")
+    if args.fold and args.date_from:
+        parser.error("--fold takes no date range")
+
+    if args.fold:
+        success = fold()
+        sys.exit(0 if success else 1)
+
+    print("Daily Sales Summary Rebuild")
+    print("===========================")
+    success = rebuild(args.date_from, args.date_to)
+    print(f"\nRebuild {'successful' if success else 'failed'}!")
+    sys.exit(0 if success else 1)
@@ -9,8 +9,39 @@ from PyQt5.QtChart import QChart, QChartView, QBarSeries, QBarSet, QBarCategoryA
 
 import datetime
 from database.db_connector import DatabaseConnection
+from database.sales_partitions import sale_date_range
+from database.models import SaleModel, ProductModel
+from database.report_data import SalesReportData, ProductRankingData
+from database.report_cache import get_report_cache
+from database.sales_cube import SalesCube, DIMENSIONS
+from database.product_classification import get_product_classification
 from utils.auth import Authentication
 
+# Above this many bars or slices, charts are drawn without animation
+CHART_ANIMATION_MAX_POINTS = 50
+CHART_BUCKET_TITLES = {'day': "Daily", 'week': "Weekly", 'month': "Monthly", 'quarter': "Quarterly"}
+INVENTORY_STATUS_COLORS = {
+    "Inactive": "#DDDDDD",
+    "Out of Stock": "#FFCCCC",
+    "Low Stock": "#FFFFCC",
+    "Expired": "#FF9999",
+    "Expiring Soon": "#FFCC99",
+    "OK": "#CCFFCC"
+}
+CLASSIFICATION_COLORS = {"A": "#CCFFCC", "B": "#FFFFCC", "C": "#DDDDDD"}
+RANKING_PAGE_SIZE = 25
+
+
+def period_label(period, bucket):
+    """Get the axis label of a chart period starting on `period`"""
+    if bucket == 'quarter':
+        return f"Q{(period.month - 1) // 3 + 1} {period.year}"
+    if bucket == 'month':
+        return period.strftime("%b %Y")
+    if bucket == 'week':
+        return period.strftime("Wk %b %d")
+    return period.strftime("%b %d")
+
 class SaleDetailsDialog(QDialog):
     """Dialog to show detailed sale items with medication information"""
     def __init__(self, parent=None, sale_id=None, invoice=None):
@@ -180,8 +211,33 @@ class ReportsWidget(QWidget):
         self.user = user
         self.db = DatabaseConnection()
         self.auth = Authentication()
+        self.sale_model = SaleModel()
+        self.product_model = ProductModel()
+        self.sales_report_data = SalesReportData(self.sale_model)
+        self.product_ranking_data = ProductRankingData(self.sale_model)
+        self.ranking_page = 0
+        self.ranking_total = 0
+        self.sales_cube = None
+        self.classification = None
+        self.sales_charts = {}
         self.init_ui()
     
+    def summary_filters(self):
+        """Get the chart filters as SaleModel rollup arguments"""
+        payment_method = self.payment_filter.currentText()
+        med_type_filter = self.sales_med_type_filter.currentData()
+        return (
+            None if payment_method == "All Payment Methods" else payment_method,
+            {"branded": False, "generic": True}.get(med_type_filter)
+        )
+    
+    def sales_totals(self, refresh=False):
+        """Get the sales chart totals for the current filters, loaded once per filter change"""
+        date_from = self.date_from.date().toString("yyyy-MM-dd")
+        date_to = self.date_to.date().toString("yyyy-MM-dd")
+        payment_method, is_generic = self.summary_filters()
+        return self.sales_report_data.get(date_from, date_to, payment_method, is_generic, refresh)
+    
     def init_ui(self):
         """Initialize the UI components"""
         main_layout = QVBoxLayout(self)
@@ -244,8 +300,8 @@ class ReportsWidget(QWidget):
         
         refresh_btn = QPushButton("Refresh")
         refresh_btn.setIcon(QIcon("resources/icons/refresh.png"))
-        refresh_btn.clicked.connect(self.generate_sales_report)
-        refresh_btn.setToolTip("Refresh sales report with current filters")
+        refresh_btn.clicked.connect(lambda: self.generate_sales_report(refresh=True))
+        refresh_btn.setToolTip("Reload sales report with current filters, bypassing the cache")
         buttons_layout.addWidget(refresh_btn)
         
         filters_layout.addLayout(buttons_layout)
@@ -283,12 +339,17 @@ class ReportsWidget(QWidget):
         
         self.sales_chart_type = QComboBox()
         self.sales_chart_type.addItems([
-            "Daily Sales", 
+            "Sales Over Time", 
             "Payment Method Distribution",
             "Branded vs Generic Sales"  # New chart type
         ])
         self.sales_chart_type.currentIndexChanged.connect(self.update_sales_chart)
         chart_selection_layout.addWidget(self.sales_chart_type)
+        chart_selection_layout.addStretch()
+        
+        # Totals for the current filters, from the same data as the charts
+        self.sales_summary_label = QLabel()
+        chart_selection_layout.addWidget(self.sales_summary_label)
         
         chart_layout.addLayout(chart_selection_layout)
         
@@ -385,15 +446,19 @@ class ReportsWidget(QWidget):
         
         inventory_layout.addWidget(inv_filters_group)
         
+        # Products per status, for the category, type and active filters
+        self.inventory_summary_label = QLabel()
+        inventory_layout.addWidget(self.inventory_summary_label)
+        
         # Inventory report view (split into table and chart)
         inventory_splitter = QSplitter(Qt.Vertical)
         
         # Inventory table - Updated with medication type and unit measurement
         self.inventory_table = QTableWidget()
-        self.inventory_table.setColumnCount(10)
+        self.inventory_table.setColumnCount(11)
         self.inventory_table.setHorizontalHeaderLabels([
             "ID", "Product Name", "Description", "Type", "Unit Measurement", "Category", 
-            "Unit Price", "Cost Price", "Stock Quantity", "Expiry Date"
+            "Unit Price", "Cost Price", "Stock Quantity", "Expiry Date", "Status"
         ])
         self.inventory_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
         self.inventory_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
@@ -433,6 +498,214 @@ class ReportsWidget(QWidget):
         # Add inventory tab
         tab_widget.addTab(inventory_tab, "Inventory Report")
         
+        # Analysis Tab: sale lines loaded once, then sliced in memory
+        analysis_tab = QWidget()
+        analysis_layout = QVBoxLayout(analysis_tab)
+        
+        analysis_filters_group = QGroupBox("Analysis")
+        analysis_filters_layout = QHBoxLayout(analysis_filters_group)
+        
+        # Range loaded into memory
+        analysis_date_layout = QFormLayout()
+        
+        self.analysis_date_from = QDateEdit()
+        self.analysis_date_from.setCalendarPopup(True)
+        self.analysis_date_from.setDate(QDate.currentDate().addMonths(-3))
+        analysis_date_layout.addRow("From:", self.analysis_date_from)
+        
+        self.analysis_date_to = QDateEdit()
+        self.analysis_date_to.setCalendarPopup(True)
+        self.analysis_date_to.setDate(QDate.currentDate())
+        analysis_date_layout.addRow("To:", self.analysis_date_to)
+        
+        analysis_filters_layout.addLayout(analysis_date_layout)
+        
+        analysis_load_btn = QPushButton("Load Sales")
+        analysis_load_btn.setIcon(QIcon("resources/icons/report.png"))
+        analysis_load_btn.clicked.connect(self.load_analysis)
+        analysis_load_btn.setToolTip("Load the sale lines of this range; the slices below don't query the database")
+        analysis_filters_layout.addWidget(analysis_load_btn)
+        
+        # Slices of the loaded lines
+        analysis_slice_layout = QFormLayout()
+        
+        self.analysis_payment_filter = QComboBox()
+        analysis_slice_layout.addRow("Payment Method:", self.analysis_payment_filter)
+        
+        self.analysis_type_filter = QComboBox()
+        self.analysis_type_filter.addItem("All Types", None)
+        self.analysis_type_filter.addItem("Branded", False)
+        self.analysis_type_filter.addItem("Generic", True)
+        analysis_slice_layout.addRow("Medication Type:", self.analysis_type_filter)
+        
+        analysis_filters_layout.addLayout(analysis_slice_layout)
+        
+        analysis_group_layout = QFormLayout()
+        
+        self.analysis_category_filter = QComboBox()
+        analysis_group_layout.addRow("Category:", self.analysis_category_filter)
+        
+        self.analysis_group_by = QComboBox()
+        for dimension, label in DIMENSIONS.items():
+            self.analysis_group_by.addItem(label, dimension)
+        analysis_group_layout.addRow("Group By:", self.analysis_group_by)
+        
+        analysis_filters_layout.addLayout(analysis_group_layout)
+        
+        for combo in (self.analysis_payment_filter, self.analysis_type_filter,
+                      self.analysis_category_filter, self.analysis_group_by):
+            combo.currentIndexChanged.connect(self.update_analysis)
+        
+        analysis_layout.addWidget(analysis_filters_group)
+        
+        self.analysis_summary_label = QLabel("Load a date range to start")
+        analysis_layout.addWidget(self.analysis_summary_label)
+        
+        self.analysis_table = QTableWidget()
+        self.analysis_table.setColumnCount(4)
+        self.analysis_table.setHorizontalHeaderLabels(["Group", "Quantity", "Amount", "Share"])
+        self.analysis_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.analysis_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.analysis_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        analysis_layout.addWidget(self.analysis_table)
+        
+        tab_widget.addTab(analysis_tab, "Analysis")
+        
+        # Classification Tab: ABC by revenue share, XYZ by demand variability
+        classification_tab = QWidget()
+        classification_layout = QVBoxLayout(classification_tab)
+        
+        classification_filters_group = QGroupBox("Classification")
+        classification_filters_layout = QHBoxLayout(classification_filters_group)
+        
+        classification_date_layout = QFormLayout()
+        
+        self.classification_date_from = QDateEdit()
+        self.classification_date_from.setCalendarPopup(True)
+        self.classification_date_from.setDate(QDate.currentDate().addYears(-1))
+        classification_date_layout.addRow("From:", self.classification_date_from)
+        
+        self.classification_date_to = QDateEdit()
+        self.classification_date_to.setCalendarPopup(True)
+        self.classification_date_to.setDate(QDate.currentDate())
+        classification_date_layout.addRow("To:", self.classification_date_to)
+        
+        classification_filters_layout.addLayout(classification_date_layout)
+        
+        classification_options_layout = QFormLayout()
+        
+        self.classification_period = QComboBox()
+        self.classification_period.addItem("Weekly", 7)
+        self.classification_period.addItem("Monthly", 30)
+        self.classification_period.setToolTip("Periods the demand variability (XYZ) is measured over")
+        classification_options_layout.addRow("Demand Periods:", self.classification_period)
+        
+        self.classification_class_filter = QComboBox()
+        self.classification_class_filter.addItem("All Classes", None)
+        for abc in "ABC":
+            self.classification_class_filter.addItem(f"Class {abc}", abc)
+        self.classification_class_filter.currentIndexChanged.connect(self.update_classification_table)
+        classification_options_layout.addRow("Show:", self.classification_class_filter)
+        
+        classification_filters_layout.addLayout(classification_options_layout)
+        
+        classify_btn = QPushButton("Classify Products")
+        classify_btn.setIcon(QIcon("resources/icons/report.png"))
+        classify_btn.clicked.connect(lambda: self.generate_classification_report(refresh=True))
+        classification_filters_layout.addWidget(classify_btn)
+        
+        classification_layout.addWidget(classification_filters_group)
+        
+        self.classification_summary_label = QLabel("Choose a date range to classify the products sold in it")
+        classification_layout.addWidget(self.classification_summary_label)
+        
+        self.classification_table = QTableWidget()
+        self.classification_table.setColumnCount(8)
+        self.classification_table.setHorizontalHeaderLabels([
+            "Product", "Revenue", "Share", "Cumulative", "Quantity", "Units/Period", "Variation (CV)", "Class"
+        ])
+        self.classification_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.classification_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.classification_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        classification_layout.addWidget(self.classification_table)
+        
+        tab_widget.addTab(classification_tab, "Classification")
+        
+        # Rankings Tab: top sellers and slow movers
+        ranking_tab = QWidget()
+        ranking_layout = QVBoxLayout(ranking_tab)
+        
+        ranking_filters_group = QGroupBox("Product Rankings")
+        ranking_filters_layout = QHBoxLayout(ranking_filters_group)
+        
+        ranking_date_layout = QFormLayout()
+        
+        self.ranking_date_from = QDateEdit()
+        self.ranking_date_from.setCalendarPopup(True)
+        self.ranking_date_from.setDate(QDate.currentDate().addMonths(-1))
+        ranking_date_layout.addRow("From:", self.ranking_date_from)
+        
+        self.ranking_date_to = QDateEdit()
+        self.ranking_date_to.setCalendarPopup(True)
+        self.ranking_date_to.setDate(QDate.currentDate())
+        ranking_date_layout.addRow("To:", self.ranking_date_to)
+        
+        ranking_filters_layout.addLayout(ranking_date_layout)
+        
+        ranking_options_layout = QFormLayout()
+        
+        self.ranking_order = QComboBox()
+        self.ranking_order.addItem("Top Sellers", False)
+        self.ranking_order.addItem("Slow Movers", True)
+        ranking_options_layout.addRow("Show:", self.ranking_order)
+        
+        self.ranking_metric = QComboBox()
+        for metric, label in SaleModel.RANKING_METRICS.items():
+            self.ranking_metric.addItem(label, metric)
+        ranking_options_layout.addRow("Rank By:", self.ranking_metric)
+        
+        self.ranking_category_filter = QComboBox()
+        self.ranking_category_filter.addItem("All Categories", None)
+        self.load_categories(self.ranking_category_filter)
+        ranking_options_layout.addRow("Category:", self.ranking_category_filter)
+        
+        ranking_filters_layout.addLayout(ranking_options_layout)
+        
+        for widget in (self.ranking_order, self.ranking_metric, self.ranking_category_filter):
+            widget.currentIndexChanged.connect(lambda: self.generate_ranking_report(page=0))
+        for date_edit in (self.ranking_date_from, self.ranking_date_to):
+            date_edit.dateChanged.connect(lambda: self.generate_ranking_report(page=0))
+        
+        ranking_layout.addWidget(ranking_filters_group)
+        
+        self.ranking_table = QTableWidget()
+        self.ranking_table.setColumnCount(7)
+        self.ranking_table.setHorizontalHeaderLabels([
+            "Rank", "Product", "Category", "Rank in Category", "Units Sold", "Revenue", "Margin"
+        ])
+        self.ranking_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.ranking_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
+        self.ranking_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        ranking_layout.addWidget(self.ranking_table)
+        
+        ranking_pager_layout = QHBoxLayout()
+        
+        self.ranking_prev_btn = QPushButton("Previous")
+        self.ranking_prev_btn.clicked.connect(lambda: self.generate_ranking_report(page=self.ranking_page - 1))
+        ranking_pager_layout.addWidget(self.ranking_prev_btn)
+        
+        self.ranking_page_label = QLabel("")
+        self.ranking_page_label.setAlignment(Qt.AlignCenter)
+        ranking_pager_layout.addWidget(self.ranking_page_label, 1)
+        
+        self.ranking_next_btn = QPushButton("Next")
+        self.ranking_next_btn.clicked.connect(lambda: self.generate_ranking_report(page=self.ranking_page + 1))
+        ranking_pager_layout.addWidget(self.ranking_next_btn)
+        
+        ranking_layout.addLayout(ranking_pager_layout)
+        
+        tab_widget.addTab(ranking_tab, "Product Rankings")
+        
         # Add tab widget to main layout
         main_layout.addWidget(tab_widget)
         
@@ -445,15 +718,185 @@ class ReportsWidget(QWidget):
             self.generate_sales_report()
         elif index == 1:  # Inventory report
             self.generate_inventory_report()
+        elif index == 3:  # Classification
+            self.generate_classification_report()
+        elif index == 4:  # Product rankings
+            self.generate_ranking_report(page=self.ranking_page)
+    
+    def load_analysis(self):
+        """Load the sale lines of the analysis range into memory"""
+        try:
+            date_from = self.analysis_date_from.date().toString("yyyy-MM-dd")
+            date_to = self.analysis_date_to.date().toString("yyyy-MM-dd")
+            self.sales_cube = SalesCube.load(self.db, date_from, date_to)
+        except ValueError as e:
+            QMessageBox.warning(self, "Analysis", str(e))
+            return
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to load sales for analysis: {str(e)}")
+            return
+        
+        # Offer only the values present in the loaded lines
+        for combo in (self.analysis_payment_filter, self.analysis_category_filter):
+            combo.blockSignals(True)
+            combo.clear()
+        self.analysis_payment_filter.addItem("All Payment Methods", None)
+        for method in sorted(self.sales_cube.payment_methods):
+            self.analysis_payment_filter.addItem(method or "Unspecified", method)
+        self.analysis_category_filter.addItem("All Categories", None)
+        for category_id, name in sorted(self.sales_cube.categories.items(), key=lambda c: c[1]):
+            self.analysis_category_filter.addItem(name, category_id)
+        for combo in (self.analysis_payment_filter, self.analysis_category_filter):
+            combo.blockSignals(False)
+        
+        self.update_analysis()
+    
+    def update_analysis(self):
+        """Slice and group the loaded sale lines; runs in memory only"""
+        cube = self.sales_cube
+        if cube is None:
+            return
+        
+        mask = cube.select(
+            payment_method=self.analysis_payment_filter.currentData(),
+            is_generic=self.analysis_type_filter.currentData(),
+            category_id=self.analysis_category_filter.currentData()
+        )
+        totals = cube.totals(mask)
+        groups = cube.group_by(self.analysis_group_by.currentData(), mask)
+        
+        self.analysis_table.setRowCount(0)
+        for row_idx, (label, quantity, amount) in enumerate(groups):
+            self.analysis_table.insertRow(row_idx)
+            
+            if isinstance(label, datetime.date):
+                label = label.strftime("%Y-%m-%d")
+            self.analysis_table.setItem(row_idx, 0, QTableWidgetItem(str(label)))
+            
+            quantity_item = QTableWidgetItem(str(quantity))
+            quantity_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.analysis_table.setItem(row_idx, 1, quantity_item)
+            
+            amount_item = QTableWidgetItem(f"₱{amount:.2f}")
+            amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.analysis_table.setItem(row_idx, 2, amount_item)
+            
+            share = amount / totals['amount'] * 100 if totals['amount'] else 0
+            share_item = QTableWidgetItem(f"{share:.1f}%")
+            share_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+            self.analysis_table.setItem(row_idx, 3, share_item)
+        
+        self.analysis_summary_label.setText(
+            f"{cube.date_from:%Y-%m-%d} to {cube.date_to:%Y-%m-%d}: "
+            f"{totals['lines']} of {len(cube)} lines, Total: ₱{totals['amount']:.2f}, "
+            f"Quantity: {totals['quantity']}    (in memory: {cube.nbytes() / 1000000:.1f} MB)"
+        )
+    
+    def generate_classification_report(self, refresh=False):
+        """Classify the products sold in the chosen range; cached per range and period length"""
+        try:
+            date_from = self.classification_date_from.date().toString("yyyy-MM-dd")
+            date_to = self.classification_date_to.date().toString("yyyy-MM-dd")
+            self.classification = get_product_classification(
+                self.db, date_from, date_to, self.classification_period.currentData(), refresh
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to classify products: {str(e)}")
+            return
+        
+        matrix = self.classification['matrix']
+        self.classification_summary_label.setText(
+            f"{len(self.classification['products'])} products, Revenue: ₱{self.classification['total_revenue']:.2f} "
+            f"over {self.classification['periods']} periods    "
+            + "    ".join(f"{abc}: " + " / ".join(f"{xyz} {matrix[abc + xyz]}" for xyz in "XYZ") for abc in "ABC")
+        )
+        self.update_classification_table()
     
-    def load_categories(self):
+    def update_classification_table(self):
+        """Show the classified products of the chosen class"""
+        if self.classification is None:
+            return
+        
+        abc_filter = self.classification_class_filter.currentData()
+        products = [row for row in self.classification['products'] if abc_filter is None or row[8][0] == abc_filter]
+        
+        self.classification_table.setRowCount(0)
+        self.classification_table.setRowCount(len(products))
+        for row_idx, (_, name, revenue, share, cumulative, quantity, mean, cv, label) in enumerate(products):
+            self.classification_table.setItem(row_idx, 0, QTableWidgetItem(name))
+            values = [
+                f"₱{revenue:.2f}",
+                f"{share * 100:.2f}%",
+                f"{cumulative * 100:.1f}%",
+                str(quantity),
+                f"{mean:.2f}",
+                "-" if cv == float('inf') else f"{cv:.2f}"
+            ]
+            for col, value in enumerate(values, 1):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.classification_table.setItem(row_idx, col, item)
+            
+            class_item = QTableWidgetItem(label)
+            class_item.setTextAlignment(Qt.AlignCenter)
+            class_item.setBackground(QColor(CLASSIFICATION_COLORS[label[0]]))
+            self.classification_table.setItem(row_idx, 7, class_item)
+    
+    def generate_ranking_report(self, page=0):
+        """Show one page of the top sellers or slow movers; pages are cached"""
+        try:
+            date_from = self.ranking_date_from.date().toString("yyyy-MM-dd")
+            date_to = self.ranking_date_to.date().toString("yyyy-MM-dd")
+            rankings = self.product_ranking_data.get(
+                date_from, date_to,
+                metric=self.ranking_metric.currentData(),
+                slow_movers=self.ranking_order.currentData(),
+                category_id=self.ranking_category_filter.currentData(),
+                page=max(page, 0),
+                page_size=RANKING_PAGE_SIZE
+            )
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Failed to rank products: {str(e)}")
+            return
+        
+        if not rankings['rows'] and page > 0:
+            # Fewer products than when this page was reached
+            self.generate_ranking_report(page=0)
+            return
+        
+        self.ranking_page = max(page, 0)
+        self.ranking_total = rankings['total']
+        
+        self.ranking_table.setRowCount(0)
+        self.ranking_table.setRowCount(len(rankings['rows']))
+        for row_idx, (rank, category_rank, _, name, category, units, revenue, margin) in enumerate(rankings['rows']):
+            values = [str(rank), name, category, str(category_rank), str(units),
+                      f"₱{float(revenue):.2f}", f"₱{float(margin):.2f}"]
+            for col, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if col not in (1, 2):
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if col == 6 and margin < 0:
+                    item.setForeground(QColor("red"))
+                self.ranking_table.setItem(row_idx, col, item)
+        
+        pages = max((self.ranking_total + RANKING_PAGE_SIZE - 1) // RANKING_PAGE_SIZE, 1)
+        self.ranking_page_label.setText(
+            f"Page {self.ranking_page + 1} of {pages} ({self.ranking_total} products)"
+        )
+        self.ranking_prev_btn.setEnabled(self.ranking_page > 0)
+        self.ranking_next_btn.setEnabled(self.ranking_page + 1 < pages)
+    
+    def load_categories(self, combo=None):
         """Load categories into filter dropdown"""
+        if combo is None:
+            combo = self.category_filter
         try:
             query = "SELECT category_id, name FROM categories ORDER BY name"
             categories = self.db.execute_query(query, fetchall=True)
             
             for category_id, name in categories:
-                self.category_filter.addItem(name, category_id)
+                combo.addItem(name, category_id)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load categories: {str(e)}")
     
@@ -462,9 +905,9 @@ class ReportsWidget(QWidget):
         row = index.row()
         invoice = self.sales_table.item(row, 0).text()
         
-        # Get sale_id from database using invoice number
+        # Get sale_id from database using invoice number; sale_keys has one index over all months
         try:
-            query = "SELECT sale_id FROM sales WHERE invoice_number = %s"
+            query = "SELECT sale_id FROM sale_keys WHERE invoice_number = %s"
             result = self.db.execute_query(query, [invoice], fetchone=True)
             
             if result and result[0]:
@@ -477,8 +920,8 @@ class ReportsWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load sale details: {str(e)}")
     
-    def generate_sales_report(self):
-        """Generate the sales report"""
+    def generate_sales_report(self, refresh=False):
+        """Generate the sales report; refresh reloads it from the database instead of the cache"""
         try:
             # Get filter values
             date_from = self.date_from.date().toString("yyyy-MM-dd")
@@ -486,62 +929,35 @@ class ReportsWidget(QWidget):
             payment_method = self.payment_filter.currentText()
             med_type_filter = self.sales_med_type_filter.currentData()
             
-            # Check if sale_items table has the medication columns
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
-            
-            try:
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'sale_items' AND column_name = 'is_generic'
-                """)
-                has_med_fields = cursor.fetchone() is not None
-            except:
-                has_med_fields = False
-            finally:
-                cursor.close()
-                self.db.release_connection(connection)
-            
-            # Build query with medication type information
-            if has_med_fields:
-                query = """
-                    SELECT s.sale_id, s.invoice_number, s.sale_date, u.full_name as cashier,
-                           s.payment_method, s.total_amount, COUNT(si.item_id) as item_count,
-                           SUM(CASE WHEN si.is_generic = FALSE THEN 1 ELSE 0 END) as branded_count,
-                           SUM(CASE WHEN si.is_generic = TRUE THEN 1 ELSE 0 END) as generic_count
-                    FROM sales s
-                    JOIN users u ON s.user_id = u.user_id
-                    JOIN sale_items si ON s.sale_id = si.sale_id
-                    WHERE s.sale_date::date BETWEEN %s AND %s
-                """
-            else:
-                query = """
-                    SELECT s.sale_id, s.invoice_number, s.sale_date, u.full_name as cashier,
-                           s.payment_method, s.total_amount, COUNT(si.item_id) as item_count,
-                           0 as branded_count, 0 as generic_count
-                    FROM sales s
-                    JOIN users u ON s.user_id = u.user_id
-                    JOIN sale_items si ON s.sale_id = si.sale_id
-                    WHERE s.sale_date::date BETWEEN %s AND %s
-                """
-            
-            params = [date_from, date_to]
+            # The item counters are stored on each sale, so the listing reads sales alone
+            sales_range, params = sale_date_range("s", date_from, date_to)
+            query = f"""
+                SELECT s.sale_id, s.invoice_number, s.sale_date, u.full_name as cashier,
+                       s.payment_method, s.total_amount, s.item_count,
+                       s.branded_count, s.generic_count
+                FROM sales s
+                JOIN users u ON s.user_id = u.user_id
+                WHERE {sales_range}
+            """
             
             if payment_method != "All Payment Methods":
                 query += " AND s.payment_method = %s"
                 params.append(payment_method)
             
-            if has_med_fields and med_type_filter:
-                if med_type_filter == "branded":
-                    query += " AND si.is_generic = FALSE"
-                elif med_type_filter == "generic":
-                    query += " AND si.is_generic = TRUE"
+            if med_type_filter == "branded":
+                query += " AND s.branded_count > 0"
+            elif med_type_filter == "generic":
+                query += " AND s.generic_count > 0"
             
-            query += " GROUP BY s.sale_id, s.invoice_number, s.sale_date, u.full_name, s.payment_method, s.total_amount"
             query += " ORDER BY s.sale_date DESC"
             
-            sales = self.db.execute_query(query, params, fetchall=True)
+            cache = get_report_cache()
+            key = cache.make_key('sales_listing', date_from, date_to,
+                                 None if payment_method == "All Payment Methods" else payment_method,
+                                 med_type_filter)
+            sales = cache.get_or_load(
+                key, lambda: self.db.execute_query(query, params, fetchall=True) or [], refresh
+            )
             
             # Update table
             self.sales_table.setRowCount(0)
@@ -577,7 +993,17 @@ class ReportsWidget(QWidget):
                 # Generic Items Count
                 self.sales_table.setItem(row_idx, 7, QTableWidgetItem(str(int(generic_count))))
             
-            # Update chart
+            # Load the chart totals for these filters, then draw from them
+            totals = self.sales_totals(refresh)
+            self.sales_summary_label.setText(
+                f"Total: ₱{float(totals['total']):.2f}    Items sold: {int(totals['quantity'])}"
+            )
+            stats = cache.stats()
+            self.sales_summary_label.setToolTip(
+                f"Report cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%}), {stats['entries']} entries, "
+                f"{stats['size_bytes'] // 1024} KB of {stats['budget_bytes'] // 1024} KB"
+            )
             self.update_sales_chart()
             
             # Log activity
@@ -595,11 +1021,11 @@ class ReportsWidget(QWidget):
             print(traceback.format_exc())
     
     def update_sales_chart(self):
-        """Update the sales chart based on selected type"""
+        """Update the sales chart based on selected type; the data comes from sales_totals"""
         chart_type = self.sales_chart_type.currentText()
         
         try:
-            if chart_type == "Daily Sales":
+            if chart_type == "Sales Over Time":
                 self.create_daily_sales_chart()
             elif chart_type == "Payment Method Distribution":
                 self.create_payment_distribution_chart()
@@ -608,148 +1034,85 @@ class ReportsWidget(QWidget):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to update sales chart: {str(e)}")
     
+    def get_sales_chart(self, key, title):
+        """Get a sales chart, created on first use and updated in place afterwards"""
+        chart = self.sales_charts.get(key)
+        if chart is None:
+            chart = QChart()
+            chart.setTitle(title)
+            self.sales_charts[key] = chart
+        if self.sales_chart_view.chart() is not chart:
+            self.sales_chart_view.setChart(chart)
+        return chart
+    
+    def set_chart_animation(self, chart, points):
+        """Animate a chart only while it has few enough points to animate smoothly"""
+        chart.setAnimationOptions(
+            QChart.SeriesAnimations if points <= CHART_ANIMATION_MAX_POINTS else QChart.NoAnimation
+        )
+    
     def create_daily_sales_chart(self):
-        """Create chart showing daily sales"""
+        """Create chart showing sales per day, week, month or quarter depending on the range"""
         try:
-            # Get filter values
-            date_from = self.date_from.date().toString("yyyy-MM-dd")
-            date_to = self.date_to.date().toString("yyyy-MM-dd")
-            payment_method = self.payment_filter.currentText()
-            med_type_filter = self.sales_med_type_filter.currentData()
-            
-            # Build query
-            query = """
-                SELECT DATE(s.sale_date) as sale_day, SUM(s.total_amount) as daily_total
-                FROM sales s
-                WHERE s.sale_date::date BETWEEN %s AND %s
-            """
-            
-            params = [date_from, date_to]
-            
-            if payment_method != "All Payment Methods":
-                query += " AND s.payment_method = %s"
-                params.append(payment_method)
-            
-            # Handle medication type filter
-            if med_type_filter:
-                query = """
-                    SELECT DATE(s.sale_date) as sale_day, SUM(si.subtotal) as daily_total
-                    FROM sales s
-                    JOIN sale_items si ON s.sale_id = si.sale_id
-                    WHERE s.sale_date::date BETWEEN %s AND %s
-                """
+            totals = self.sales_totals()
+            periods = totals['periods']
+            bucket = totals['bucket']
+            
+            chart = self.get_sales_chart('periods', "Sales")
+            if not chart.series():
+                # Bar set, series and axes are built once and refilled on every update
+                self.sales_bar_set = QBarSet("Sales")
+                series = QBarSeries()
+                series.append(self.sales_bar_set)
+                chart.addSeries(series)
                 
-                if payment_method != "All Payment Methods":
-                    query += " AND s.payment_method = %s"
+                self.sales_axis_x = QBarCategoryAxis()
+                chart.addAxis(self.sales_axis_x, Qt.AlignBottom)
+                series.attachAxis(self.sales_axis_x)
                 
-                if med_type_filter == "branded":
-                    query += " AND si.is_generic = FALSE"
-                elif med_type_filter == "generic":
-                    query += " AND si.is_generic = TRUE"
-                
-            query += " GROUP BY sale_day ORDER BY sale_day"
-            
-            daily_sales = self.db.execute_query(query, params, fetchall=True)
-            
-            # Create chart
-            chart = QChart()
-            chart.setTitle("Daily Sales")
-            chart.setAnimationOptions(QChart.SeriesAnimations)
-            
-            # Create bar series
-            bar_set = QBarSet("Sales")
-            
-            # Categories (dates)
-            categories = []
+                self.sales_axis_y = QValueAxis()
+                self.sales_axis_y.setTitleText("Amount (₱)")
+                self.sales_axis_y.setLabelFormat("₱%.2f")
+                chart.addAxis(self.sales_axis_y, Qt.AlignLeft)
+                series.attachAxis(self.sales_axis_y)
             
-            # Add data to bar set
-            for day, total in daily_sales:
-                bar_set.append(float(total))
-                categories.append(day.strftime("%b %d"))
+            chart.setTitle(f"{CHART_BUCKET_TITLES[bucket]} Sales")
+            self.set_chart_animation(chart, len(periods))
             
-            # Create series and add to chart
-            series = QBarSeries()
-            series.append(bar_set)
-            chart.addSeries(series)
+            values = [float(total) for _, total in periods]
+            self.sales_bar_set.remove(0, self.sales_bar_set.count())
+            self.sales_bar_set.append(values)
             
-            # Create axes
-            axis_x = QBarCategoryAxis()
-            axis_x.append(categories)
-            chart.addAxis(axis_x, Qt.AlignBottom)
-            series.attachAxis(axis_x)
-            
-            axis_y = QValueAxis()
-            axis_y.setTitleText("Amount (₱)")
-            axis_y.setLabelFormat("₱%.2f")
-            chart.addAxis(axis_y, Qt.AlignLeft)
-            series.attachAxis(axis_y)
-            
-            # Set the chart in the view
-            self.sales_chart_view.setChart(chart)
+            self.sales_axis_x.clear()
+            self.sales_axis_x.append([period_label(period, bucket) for period, _ in periods])
+            self.sales_axis_y.setRange(0, max(values, default=0) * 1.1 or 1)
             
         except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to create daily sales chart: {str(e)}")
+            QMessageBox.critical(self, "Error", f"Failed to create sales chart: {str(e)}")
             import traceback
             print(traceback.format_exc())
     
+    def fill_pie_chart(self, key, title, totals):
+        """Refill the pie series of a sales chart with (label, total) rows"""
+        chart = self.get_sales_chart(key, title)
+        if not chart.series():
+            chart.addSeries(QPieSeries())
+        series = chart.series()[0]
+        
+        self.set_chart_animation(chart, len(totals))
+        series.clear()
+        for label, total in totals:
+            series.append(f"{label}: ₱{float(total):.2f}", float(total))
+        
+        for slice in series.slices():
+            slice.setLabelVisible(True)
+        return series
+    
     def create_payment_distribution_chart(self):
         """Create chart showing distribution by payment method"""
         try:
-            # Get filter values
-            date_from = self.date_from.date().toString("yyyy-MM-dd")
-            date_to = self.date_to.date().toString("yyyy-MM-dd")
-            med_type_filter = self.sales_med_type_filter.currentData()
-            
-            # Build query
-            query = """
-                SELECT s.payment_method, SUM(s.total_amount) as total
-                FROM sales s
-            """
-            
-            params = [date_from, date_to]
-            
-            # Handle medication type filter
-            if med_type_filter:
-                query = """
-                    SELECT s.payment_method, SUM(si.subtotal) as total
-                    FROM sales s
-                    JOIN sale_items si ON s.sale_id = si.sale_id
-                """
-                
-                query += " WHERE s.sale_date::date BETWEEN %s AND %s"
-                
-                if med_type_filter == "branded":
-                    query += " AND si.is_generic = FALSE"
-                elif med_type_filter == "generic":
-                    query += " AND si.is_generic = TRUE"
-            else:
-                query += " WHERE s.sale_date::date BETWEEN %s AND %s"
-                
-            query += " GROUP BY s.payment_method ORDER BY total DESC"
-            
-            payment_totals = self.db.execute_query(query, params, fetchall=True)
-            
-            # Create chart
-            chart = QChart()
-            chart.setTitle("Sales by Payment Method")
-            chart.setAnimationOptions(QChart.SeriesAnimations)
-            
-            # Create pie series
-            series = QPieSeries()
-            
-            # Add data to pie series
-            for payment_method, total in payment_totals:
-                series.append(f"{payment_method}: ₱{float(total):.2f}", float(total))
-            
-            # Customize slices
-            for slice in series.slices():
-                slice.setLabelVisible(True)
-            
-            # Add series to chart
-            chart.addSeries(series)
-            
-            # Set the chart in the view
-            self.sales_chart_view.setChart(chart)
+            payment_totals = self.sales_totals()['payment_methods']
+            self.fill_pie_chart('payment_methods', "Sales by Payment Method", payment_totals)
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to create payment distribution chart: {str(e)}")
@@ -759,86 +1122,16 @@ class ReportsWidget(QWidget):
     def create_branded_vs_generic_sales_chart(self):
         """Create chart showing branded vs generic sales"""
         try:
-            # Get filter values
-            date_from = self.date_from.date().toString("yyyy-MM-dd")
-            date_to = self.date_to.date().toString("yyyy-MM-dd")
-            payment_method = self.payment_filter.currentText()
-            
-            # Check if sale_items table has the medication columns
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
-            
-            try:
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'sale_items' AND column_name = 'is_generic'
-                """)
-                has_med_fields = cursor.fetchone() is not None
-            except:
-                has_med_fields = False
-            finally:
-                cursor.close()
-                self.db.release_connection(connection)
+            med_type_totals = self.sales_totals()['medication_types']
+            series = self.fill_pie_chart('medication_types', "Branded vs Generic Sales", med_type_totals)
             
-            if not has_med_fields:
-                chart = QChart()
-                chart.setTitle("Branded vs Generic Sales")
-                chart.setAnimationOptions(QChart.SeriesAnimations)
-                
-                # Add a message to the chart
-                no_data_text = QLabel("Medication type data is not available")
-                no_data_text.setAlignment(Qt.AlignCenter)
-                no_data_text.setStyleSheet("font-size: 14px; color: #888888;")
-                self.sales_chart_view.setChart(chart)
-                return
-            
-            # Build query
-            query = """
-                SELECT 
-                    CASE WHEN si.is_generic THEN 'Generic' ELSE 'Branded' END as med_type,
-                    SUM(si.subtotal) as total
-                FROM sales s
-                JOIN sale_items si ON s.sale_id = si.sale_id
-                WHERE s.sale_date::date BETWEEN %s AND %s
-            """
-            
-            params = [date_from, date_to]
-            
-            if payment_method != "All Payment Methods":
-                query += " AND s.payment_method = %s"
-                params.append(payment_method)
-                
-            query += " GROUP BY med_type"
-            
-            med_type_totals = self.db.execute_query(query, params, fetchall=True)
-            
-            # Create chart
-            chart = QChart()
-            chart.setTitle("Branded vs Generic Sales")
-            chart.setAnimationOptions(QChart.SeriesAnimations)
-            
-            # Create pie series
-            series = QPieSeries()
-            
-            # Add data to pie series
-            for med_type, total in med_type_totals:
-                series.append(f"{med_type}: ₱{float(total):.2f}", float(total))
-            
-            # Customize slices and add colors
+            # Add colors
             for i, slice in enumerate(series.slices()):
-                slice.setLabelVisible(True)
                 if i == 0:  # Branded (typically red)
                     slice.setBrush(QColor("#e74c3c"))
                 else:  # Generic (typically blue/green)
                     slice.setBrush(QColor("#3498db"))
             
-            # Add series to chart
-            chart.addSeries(series)
-            
-            # Set the chart in the view
-            self.sales_chart_view.setChart(chart)
-            
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to create branded vs generic sales chart: {str(e)}")
             import traceback
@@ -853,88 +1146,20 @@ class ReportsWidget(QWidget):
             expiry_filter = self.expiry_filter.currentData()
             med_type_filter = self.med_type_filter.currentData()
             
-            # Check if products table has the medication columns
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
-            
-            try:
-                cursor.execute("""
-                    SELECT column_name 
-                    FROM information_schema.columns 
-                    WHERE table_name = 'products' AND column_name = 'is_generic'
-                """)
-                has_med_fields = cursor.fetchone() is not None
-            except:
-                has_med_fields = False
-            finally:
-                cursor.close()
-                self.db.release_connection(connection)
-            
-            # Build query
-            if has_med_fields:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, p.is_generic, p.unit_measurement,
-                           c.name as category_name, p.unit_price, p.cost_price, 
-                           p.stock_quantity, p.expiry_date, p.is_active
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE 1=1
-                """
-            else:
-                query = """
-                    SELECT p.product_id, p.product_name, p.description, FALSE as is_generic, '' as unit_measurement,
-                           c.name as category_name, p.unit_price, p.cost_price, 
-                           p.stock_quantity, p.expiry_date, p.is_active
-                    FROM products p
-                    LEFT JOIN categories c ON p.category_id = c.category_id
-                    WHERE 1=1
-                """
-            
-            params = []
-            
-            # Add active/inactive filter
-            if not self.include_inactive_checkbox.isChecked():
-                query += " AND p.is_active = TRUE"
-            
-            # Add category filter
-            if category_id is not None:
-                query += " AND p.category_id = %s"
-                params.append(category_id)
-            
-            # Add stock filter
-            if stock_filter:
-                if stock_filter == "low":
-                    query += " AND p.stock_quantity <= p.reorder_level AND p.stock_quantity > 0"
-                elif stock_filter == "out":
-                    query += " AND p.stock_quantity <= 0"
-                elif stock_filter == "in":
-                    query += " AND p.stock_quantity > p.reorder_level"
-            
-            # Add medication type filter
-            if has_med_fields and med_type_filter:
-                if med_type_filter == "branded":
-                    query += " AND p.is_generic = FALSE"
-                elif med_type_filter == "generic":
-                    query += " AND p.is_generic = TRUE"
-            
-            # Add expiry filter
-            current_date = datetime.datetime.now().date()
-            if expiry_filter:
-                if expiry_filter == "expired":
-                    query += " AND p.expiry_date < %s"
-                    params.append(current_date)
-                elif expiry_filter == "soon":
-                    thirty_days_later = current_date + datetime.timedelta(days=30)
-                    query += " AND p.expiry_date >= %s AND p.expiry_date <= %s"
-                    params.append(current_date)
-                    params.append(thirty_days_later)
-                elif expiry_filter == "valid":
-                    query += " AND p.expiry_date > %s"
-                    params.append(current_date)
-            
-            query += " ORDER BY p.product_name"
-            
-            products = self.db.execute_query(query, params, fetchall=True)
+            filters = {
+                'category_id': category_id,
+                'is_generic': {"branded": False, "generic": True}.get(med_type_filter),
+                'active': None if self.include_inactive_checkbox.isChecked() else True,
+                'stock': stock_filter,
+                'expiry': expiry_filter
+            }
+            inventory = self.product_model.get_inventory(filters)
+            products = inventory['products']
+            
+            self.inventory_summary_label.setText("    ".join(
+                f"{status}: {count}" for status, count in inventory['status_counts'].items()
+                if count or status != "Inactive"
+            ))
             
             # Update table
             self.inventory_table.setRowCount(0)
@@ -943,7 +1168,8 @@ class ReportsWidget(QWidget):
                 self.inventory_table.insertRow(row_idx)
                 
                 # Unpack all values from the query result
-                product_id, name, description, is_generic, unit_measurement, category, unit_price, cost_price, stock, expiry, is_active = product
+                (product_id, name, description, is_generic, unit_measurement, category, unit_price,
+                 cost_price, stock, reorder_level, expiry, is_active, days_to_expiry, status) = product
                 
                 # ID
                 self.inventory_table.setItem(row_idx, 0, QTableWidgetItem(str(product_id)))
@@ -996,6 +1222,11 @@ class ReportsWidget(QWidget):
                 # Expiry Date
                 expiry_text = expiry.strftime("%Y-%m-%d") if expiry else "N/A"
                 self.inventory_table.setItem(row_idx, 9, QTableWidgetItem(expiry_text))
+                
+                # Status, classified by the server
+                status_item = QTableWidgetItem(status)
+                status_item.setBackground(QColor(INVENTORY_STATUS_COLORS[status]))
+                self.inventory_table.setItem(row_idx, 10, status_item)
             
             # Update chart
             self.update_inventory_chart()
@@ -1265,26 +1496,28 @@ class ReportsWidget(QWidget):
                     
                     # Get detailed sales data with medication information
                     try:
-                        detailed_query = """
+                        date_from = self.date_from.date().toString("yyyy-MM-dd")
+                        date_to = self.date_to.date().toString("yyyy-MM-dd")
+                        payment_method = self.payment_filter.currentText()
+                        
+                        sales_range, params = sale_date_range("s", date_from, date_to)
+                        items_range, item_params = sale_date_range("si", date_from, date_to)
+                        params += item_params
+                        detailed_query = f"""
                             SELECT s.invoice_number, s.sale_date, p.product_name,
                                    CASE WHEN si.is_generic THEN 'Generic' ELSE 'Branded' END as med_type,
                                    si.unit_measurement, si.unit_price, si.quantity, si.subtotal
                             FROM sales s
-                            JOIN sale_items si ON s.sale_id = si.sale_id
+                            JOIN sale_items si ON si.sale_id = s.sale_id AND si.sale_date = s.sale_date
                             JOIN products p ON si.product_id = p.product_id
-                            WHERE s.sale_date::date BETWEEN %s AND %s
-                            ORDER BY s.sale_date DESC, s.invoice_number, p.product_name
+                            WHERE {sales_range} AND {items_range}
                         """
                         
-                        date_from = self.date_from.date().toString("yyyy-MM-dd")
-                        date_to = self.date_to.date().toString("yyyy-MM-dd")
-                        payment_method = self.payment_filter.currentText()
-                        
-                        params = [date_from, date_to]
-                        
                         if payment_method != "All Payment Methods":
                             detailed_query += " AND s.payment_method = %s"
                             params.append(payment_method)
+                        
+                        detailed_query += " ORDER BY s.sale_date DESC, s.invoice_number, p.product_name"
                             
                         details = self.db.execute_query(detailed_query, params, fetchall=True)
                         
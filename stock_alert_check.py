@@ -0,0 +1,44 @@
+# stock_alert_check.py
+"""
+Daily stock expiry check.
+
+Products enter the expiry window, or expire, as the date changes, which no
+trigger sees. This sends their stock alert notifications to every running
+terminal. The application also runs the check at start and hourly; only
+the first run of a day sends anything. Schedule it shortly after midnight
+(cron or a scheduled task) so the alerts arrive even before anyone opens
+the application.
+
+Usage: python stock_alert_check.py
+"""
+import sys
+
+from database.db_connector import DatabaseConnection
+from database.schema import apply_schema_updates
+from database.stock_alerts import run_daily_expiry_check
+
+
+def run_check():
+    """Run the daily expiry check; returns True on success"""
+    db = DatabaseConnection()
+    try:
+        apply_schema_updates(db)
+        sent = run_daily_expiry_check(db)
+        if sent is None:
+            print("Today was already checked")
+        else:
+            print(f"Sent {sent} stock alert(s)")
+        return True
+    except Exception as e:
+        print(f"Stock alert check error: {str(e)}")
+        return False
+    finally:
+        db.close_all_connections()
+
+
+if __name__ == "__main__":
+    print("Stock Alert Check")
+    print("=================")
+    success = run_check()
+    print(f"\nCheck {'successful' if success else 'failed'}!")
+    sys.exit(0 if success else 1)
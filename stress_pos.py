@@ -0,0 +1,188 @@
+# stress_pos.py
+"""
+Multi-terminal stress harness for checkout.
+
+Starts N worker processes, each acting as a POS terminal with its own
+connection pool. The terminals check out random carts through
+SaleModel.checkout against a few scratch products whose stock is deliberately
+scarce, so they race for the last units. When all terminals are done, the
+harness verifies three things:
+
+- no product went negative
+- for every product, starting stock minus the units in recorded sale items
+  equals its final stock, so no sale oversold or lost a decrement
+- every accepted checkout has exactly one sale row
+
+It then reports throughput and checkout latency. All scratch rows are removed
+at the end.
+
+Usage: python stress_pos.py [--terminals 8] [--checkouts 200] [--products 5] [--stock 300]
+"""
+import argparse
+import multiprocessing
+import random
+import time
+import uuid
+
+import psycopg2
+
+from db_helper import get_db_config
+
+
+def terminal(worker_index, run_id, user_id, product_ids, checkouts):
+    """One simulated POS terminal; runs in its own process"""
+    # Imported here so every process builds its own connection pool
+    from database.models import SaleModel, InsufficientStockError
+
+    sale_model = SaleModel()
+    rng = random.Random(f"{run_id}-{worker_index}")
+    stats = {'accepted': 0, 'rejected': 0, 'errors': [], 'latencies': []}
+
+    for _ in range(checkouts):
+        items = [
+            {'product_id': product_id, 'quantity': rng.randint(1, 3), 'unit_price': 1}
+            for product_id in rng.sample(product_ids, rng.randint(1, min(3, len(product_ids))))
+        ]
+        for item in items:
+            item['subtotal'] = item['quantity'] * item['unit_price']
+
+        started = time.perf_counter()
+        try:
+            sale_model.checkout(user_id, items, "Cash", notes=f"stress {run_id}")
+            stats['accepted'] += 1
+        except InsufficientStockError:
+            stats['rejected'] += 1
+        except Exception as e:
+            stats['errors'].append(str(e))
+        stats['latencies'].append(time.perf_counter() - started)
+
+    return stats
+
+
+def setup(cursor, run_id, product_count, stock):
+    """Create the scratch products and pick the user that owns the sales"""
+    cursor.execute("SELECT user_id FROM users WHERE is_active = TRUE ORDER BY user_id LIMIT 1")
+    row = cursor.fetchone()
+    if not row:
+        raise RuntimeError("No active user found; create one before running the harness")
+    user_id = row[0]
+
+    product_ids = []
+    for i in range(product_count):
+        cursor.execute("""
+            INSERT INTO products (product_name, description, unit_price, cost_price, stock_quantity, reorder_level)
+            VALUES (%s, %s, 1, 1, %s, 0)
+            RETURNING product_id
+        """, (f"Stress {run_id} #{i + 1}", "Created by stress_pos.py", stock))
+        product_ids.append(cursor.fetchone()[0])
+    return user_id, product_ids
+
+
+def verify(cursor, run_id, product_ids, stock, accepted):
+    """Check stock against recorded sales; returns a list of problems"""
+    problems = []
+
+    cursor.execute("""
+        SELECT p.product_id, p.stock_quantity, COALESCE(SUM(si.quantity), 0)
+        FROM products p
+        LEFT JOIN sale_items si ON si.product_id = p.product_id
+        WHERE p.product_id = ANY(%s)
+        GROUP BY p.product_id, p.stock_quantity
+        ORDER BY p.product_id
+    """, (product_ids,))
+    for product_id, final_stock, sold in cursor.fetchall():
+        print(f"  Product {product_id}: sold {sold}, final stock {final_stock}")
+        if final_stock < 0:
+            problems.append(f"product {product_id} went negative ({final_stock})")
+        if stock - sold != final_stock:
+            problems.append(f"product {product_id}: {stock} - {sold} sold != {final_stock} in stock")
+
+    cursor.execute("SELECT COUNT(*) FROM sales WHERE notes = %s", (f"stress {run_id}",))
+    sale_rows = cursor.fetchone()[0]
+    if sale_rows != accepted:
+        problems.append(f"{sale_rows} sale rows for {accepted} accepted checkouts")
+
+    return problems
+
+
+def cleanup(conn, run_id, product_ids):
+    """Remove every scratch row created by the harness"""
+    conn.rollback()
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            DELETE FROM sale_items
+            WHERE sale_id IN (SELECT sale_id FROM sales WHERE notes = %s)
+        """, (f"stress {run_id}",))
+        cursor.execute("DELETE FROM sales WHERE notes = %s", (f"stress {run_id}",))
+        if product_ids:
+            cursor.execute("DELETE FROM products WHERE product_id = ANY(%s)", (product_ids,))
+    conn.commit()
+
+
+def run_stress(terminals, checkouts, product_count, stock):
+    """Run the harness and return True when stock stayed consistent"""
+    from database.db_connector import DatabaseConnection
+    from database.schema import apply_schema_updates
+
+    run_id = uuid.uuid4().hex[:6]
+    conn = psycopg2.connect(**get_db_config())
+    cursor = conn.cursor()
+    product_ids = []
+
+    try:
+        # Checkout writes the medication columns added by the schema updates
+        apply_schema_updates(DatabaseConnection())
+
+        user_id, product_ids = setup(cursor, run_id, product_count, stock)
+        conn.commit()
+
+        print(f"{terminals} terminals x {checkouts} checkouts over {product_count} products "
+              f"with {stock} units each")
+
+        started = time.perf_counter()
+        with multiprocessing.Pool(terminals) as pool:
+            results = pool.starmap(terminal, [
+                (i, run_id, user_id, product_ids, checkouts) for i in range(terminals)
+            ])
+        elapsed = time.perf_counter() - started
+
+        accepted = sum(r['accepted'] for r in results)
+        rejected = sum(r['rejected'] for r in results)
+        errors = [error for r in results for error in r['errors']]
+        latencies = sorted(latency for r in results for latency in r['latencies'])
+
+        print(f"\nAccepted: {accepted}, rejected for stock: {rejected}, errors: {len(errors)}")
+        print(f"Throughput: {(accepted + rejected) / elapsed:.1f} checkouts/s "
+              f"({accepted / elapsed:.1f} sales/s) over {elapsed:.1f} s")
+        if latencies:
+            p50 = latencies[len(latencies) // 2] * 1000
+            p95 = latencies[int(len(latencies) * 0.95) - 1] * 1000
+            print(f"Latency: p50 {p50:.1f} ms, p95 {p95:.1f} ms, max {latencies[-1] * 1000:.1f} ms")
+        for error in errors[:10]:
+            print(f"Error: {error}")
+
+        print("\nStock check:")
+        problems = verify(cursor, run_id, product_ids, stock, accepted)
+        conn.commit()
+        for problem in problems:
+            print(f"Problem: {problem}")
+
+        return not problems and not errors
+    finally:
+        cleanup(conn, run_id, product_ids)
+        cursor.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stress checkout from several simulated POS terminals")
+    parser.add_argument("--terminals", type=int, default=8, help="number of terminal processes")
+    parser.add_argument("--checkouts", type=int, default=200, help="checkouts per terminal")
+    parser.add_argument("--products", type=int, default=5, help="scratch products to sell")
+    parser.add_argument("--stock", type=int, default=300, help="starting stock per product")
+    args = parser.parse_args()
+
+    print("POS Checkout Stress Harness")
+    print("===========================")
+    success = run_stress(args.terminals, args.checkouts, args.products, args.stock)
+    print(f"\nStress run {'passed' if success else 'FAILED'}!")
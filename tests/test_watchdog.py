@@ -0,0 +1,71 @@
+"""
+Tests for StallWatchdog.find_handler, fed with synthetic UI-thread stacks.
+"""
+import os
+import unittest
+from traceback import FrameSummary
+
+try:
+    from utils.watchdog import PROJECT_ROOT, StallWatchdog
+except ImportError:  # PyQt5 not installed
+    StallWatchdog = None
+
+
+def project_frame(path, name):
+    """A stack frame in one of our own files"""
+    return FrameSummary(os.path.join(PROJECT_ROOT, *path.split('/')), 1, name)
+
+
+def library_frame(name):
+    """A stack frame in an installed library"""
+    return FrameSummary(os.path.join('site-packages', 'psycopg2', '__init__.py'), 1, name)
+
+
+@unittest.skipIf(StallWatchdog is None, "PyQt5 is not installed")
+class FindHandlerTest(unittest.TestCase):
+
+    def test_names_the_slot_not_main_module(self):
+        stack = [
+            project_frame('main.py', '<module>'),
+            project_frame('main.py', 'main'),
+            project_frame('pos.py', 'complete_sale'),
+            library_frame('connect'),
+        ]
+        self.assertEqual(StallWatchdog.find_handler(stack), 'pos.complete_sale')
+
+    def test_names_the_innermost_project_frame(self):
+        stack = [
+            project_frame('main.py', '<module>'),
+            project_frame('pos.py', 'complete_sale'),
+            project_frame('database/models.py', 'checkout'),
+        ]
+        self.assertEqual(StallWatchdog.find_handler(stack), 'database.models.checkout')
+
+    def test_charges_modal_dialog_stalls_to_the_dialog(self):
+        stack = [
+            project_frame('main.py', '<module>'),
+            project_frame('main.py', 'main'),
+            project_frame('ui/main_window.py', 'show_audit_logs'),
+            library_frame('exec_'),
+            project_frame('ui/audit_logs_dialog.py', 'load_logs'),
+        ]
+        self.assertEqual(StallWatchdog.find_handler(stack), 'ui.audit_logs_dialog.load_logs')
+
+    def test_ignores_the_watchdog_itself(self):
+        stack = [
+            project_frame('main.py', 'main'),
+            project_frame('ui/reports.py', 'generate_report'),
+            project_frame('utils/watchdog.py', 'beat'),
+        ]
+        self.assertEqual(StallWatchdog.find_handler(stack), 'ui.reports.generate_report')
+
+    def test_event_loop_when_no_project_frame(self):
+        stack = [
+            project_frame('main.py', '<module>'),
+            library_frame('exec_'),
+        ]
+        self.assertEqual(StallWatchdog.find_handler(stack), 'event loop')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,128 @@
 from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, 
-                           QTableWidget, QTableWidgetItem, QDateEdit, QComboBox,
+                           QTableView, QDateEdit, QComboBox, QLineEdit,
                            QGroupBox, QFormLayout, QHeaderView, QMessageBox)
-from PyQt5.QtCore import Qt, QDate
+from PyQt5.QtCore import Qt, QDate, pyqtSignal, QAbstractTableModel, QModelIndex
 from PyQt5.QtGui import QIcon
 
 import datetime
 from utils.audit import AuditTrail
 from utils.export import ExportUtility
+from utils.loader import DataLoader, BusyIndicator
 from database.db_connector import DatabaseConnection
 
+class AuditLogTableModel(QAbstractTableModel):
+    """Table model that fetches audit logs one keyset page at a time as the view scrolls"""
+    
+    load_failed = pyqtSignal(str)
+    
+    HEADERS = ["ID", "Timestamp", "User", "Action Type", "Table", "Record ID", "Details", "IP Address"]
+    PAGE_SIZE = 200
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.audit_trail = AuditTrail()
+        self.rows = []
+        self.pending_rows = []
+        self.filters = None
+        self.archive_month = None
+        self.has_more = False
+        
+        self.loader = DataLoader(self)
+        self.loader.rows_loaded.connect(self.pending_rows.extend)
+        self.loader.load_finished.connect(self.page_loaded)
+        self.loader.load_failed.connect(self.page_failed)
+    
+    def set_filters(self, filters):
+        """Drop the loaded rows and start again from the first page"""
+        self.beginResetModel()
+        self.rows = []
+        self.filters = filters
+        self.archive_month = None
+        self.has_more = True
+        self.endResetModel()
+        self.fetch_page()
+    
+    def set_archive(self, month, filters):
+        """Show an archived month instead of the live log; it is read in one go"""
+        self.beginResetModel()
+        self.rows = []
+        self.filters = filters
+        self.archive_month = month
+        self.has_more = False
+        self.endResetModel()
+        self.pending_rows.clear()
+        self.loader.load_function(self.audit_trail.get_archived_logs, month, filters)
+    
+    def fetch_page(self):
+        """Load the page that follows the last loaded row"""
+        self.pending_rows.clear()
+        search = self.filters.get('search') if self.filters else None
+        if search:
+            # Search results are ranked, so they page on (rank, timestamp, log_id)
+            after = (self.rows[-1][9], self.rows[-1][1], self.rows[-1][0]) if self.rows else None
+            self.loader.load_function(
+                self.audit_trail.search_audit_logs, search, self.filters, after, self.PAGE_SIZE
+            )
+            return
+        after = (self.rows[-1][1], self.rows[-1][0]) if self.rows else None
+        self.loader.load_function(
+            self.audit_trail.get_audit_logs_page, self.filters, after, self.PAGE_SIZE
+        )
+    
+    def page_loaded(self, total):
+        """Append the page that just arrived"""
+        self.has_more = self.archive_month is None and total == self.PAGE_SIZE
+        if self.pending_rows:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(self.pending_rows) - 1)
+            self.rows.extend(self.pending_rows)
+            self.endInsertRows()
+        self.pending_rows.clear()
+    
+    def page_failed(self, message):
+        self.has_more = False
+        self.pending_rows.clear()
+        self.load_failed.emit(message)
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more and not self.loader.busy
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self.fetch_page()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role != Qt.DisplayRole:
+            return None
+        return self.display_row(index.row())[index.column()]
+    
+    def display_row(self, row):
+        """Get the texts shown on a row, in column order"""
+        # Search results carry their rank as an extra, hidden column
+        log_id, timestamp, action_type, table_affected, record_id, details, ip, username, full_name = self.rows[row][:9]
+        return [
+            str(log_id),
+            timestamp.strftime("%Y-%m-%d %H:%M:%S"),
+            f"{username} ({full_name})",
+            action_type,
+            table_affected or "",
+            str(record_id) if record_id else "",
+            details or "",
+            ip or ""
+        ]
+
+
 class AuditLogsDialog(QDialog):
     """Dialog for viewing audit logs"""
     
@@ -17,6 +131,10 @@ class AuditLogsDialog(QDialog):
         self.db = DatabaseConnection()
         self.audit_trail = AuditTrail()
         self.export_utility = ExportUtility()
+        self.model = AuditLogTableModel(self)
+        self.model.load_failed.connect(self.logs_load_failed)
+        self.model.rowsInserted.connect(self.update_count_label)
+        self.model.modelReset.connect(self.update_count_label)
         self.init_ui()
         self.load_filters()
         self.load_logs()
@@ -33,6 +151,16 @@ class AuditLogsDialog(QDialog):
         filters_group = QGroupBox("Filters")
         filters_layout = QHBoxLayout(filters_group)
         
+        # Source: the live log or one of the months archived out of the database
+        source_form = QFormLayout()
+        
+        self.source_filter = QComboBox()
+        self.source_filter.addItem("Live Log", None)
+        self.source_filter.currentIndexChanged.connect(self.source_changed)
+        source_form.addRow("Source:", self.source_filter)
+        
+        filters_layout.addLayout(source_form)
+        
         # Date range
         date_form = QFormLayout()
         
@@ -75,6 +203,17 @@ class AuditLogsDialog(QDialog):
         
         filters_layout.addLayout(table_form)
         
+        # Free-text search over the action details
+        search_form = QFormLayout()
+        
+        self.search_edit = QLineEdit()
+        self.search_edit.setPlaceholderText("Invoice number, product name...")
+        self.search_edit.setClearButtonEnabled(True)
+        self.search_edit.returnPressed.connect(self.load_logs)
+        search_form.addRow("Search:", self.search_edit)
+        
+        filters_layout.addLayout(search_form)
+        
         # Filter button
         filter_btn_layout = QVBoxLayout()
         filter_btn_layout.addStretch()
@@ -87,21 +226,28 @@ class AuditLogsDialog(QDialog):
         
         main_layout.addWidget(filters_group)
         
-        # Logs table
-        self.logs_table = QTableWidget()
-        self.logs_table.setColumnCount(8)
-        self.logs_table.setHorizontalHeaderLabels([
-            "ID", "Timestamp", "User", "Action Type", "Table", "Record ID", "Details", "IP Address"
-        ])
-        self.logs_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        # Logs table; rows are fetched page by page as the view scrolls
+        self.logs_table = QTableView()
+        self.logs_table.setModel(self.model)
+        self.logs_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         self.logs_table.horizontalHeader().setSectionResizeMode(6, QHeaderView.Stretch)
-        self.logs_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.logs_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.logs_table.setColumnWidth(1, 140)
+        self.logs_table.setColumnWidth(2, 180)
+        self.logs_table.setSelectionBehavior(QTableView.SelectRows)
+        self.logs_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.logs_table.verticalHeader().setVisible(False)
         main_layout.addWidget(self.logs_table)
         
+        self.busy_indicator = BusyIndicator(text="Loading audit logs...")
+        self.busy_indicator.attach(self.model.loader)
+        main_layout.addWidget(self.busy_indicator)
+        
         # Buttons
         buttons_layout = QHBoxLayout()
         
+        self.count_label = QLabel()
+        buttons_layout.addWidget(self.count_label)
+        
         export_btn = QPushButton("Export to Excel")
         export_btn.setIcon(QIcon("resources/icons/excel.png"))
         export_btn.clicked.connect(self.export_logs)
@@ -121,129 +267,92 @@ class AuditLogsDialog(QDialog):
         main_layout.addLayout(buttons_layout)
     
     def load_filters(self):
-        """Load filter options from database"""
+        """Load filter options from the audit dimension lookup table"""
         try:
-            # Load users
-            user_query = """
-                SELECT DISTINCT u.user_id, u.username
-                FROM audit_logs l
-                JOIN users u ON l.user_id = u.user_id
-                ORDER BY u.username
-            """
-            users = self.db.execute_query(user_query, fetchall=True)
+            dimensions = self.audit_trail.get_filter_dimensions()
             
-            for user_id, username in users:
+            for user_id, username in dimensions['users']:
                 self.user_filter.addItem(username, user_id)
             
-            # Load action types
-            action_query = """
-                SELECT DISTINCT action_type
-                FROM audit_logs
-                ORDER BY action_type
-            """
-            actions = self.db.execute_query(action_query, fetchall=True)
+            for action_type in dimensions['action_types']:
+                self.action_filter.addItem(action_type, action_type)
             
-            for action in actions:
-                self.action_filter.addItem(action[0], action[0])
+            for table in dimensions['tables']:
+                self.table_filter.addItem(table, table)
             
-            # Load tables
-            table_query = """
-                SELECT DISTINCT table_affected
-                FROM audit_logs
-                WHERE table_affected IS NOT NULL
-                ORDER BY table_affected
-            """
-            tables = self.db.execute_query(table_query, fetchall=True)
-            
-            for table in tables:
-                self.table_filter.addItem(table[0], table[0])
+            for archive in self.audit_trail.get_archived_months():
+                self.source_filter.addItem(f"Archive {archive['month']} ({archive['rows']} logs)",
+                                           archive['month'])
             
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load filter options: {str(e)}")
     
+    def source_changed(self):
+        """An archive covers a whole month, so the date range only applies to the live log"""
+        live = self.source_filter.currentData() is None
+        self.date_from.setEnabled(live)
+        self.date_to.setEnabled(live)
+        self.load_logs()
+    
     def load_logs(self):
-        """Load audit logs based on filters"""
-        try:
-            # Get filter values
-            date_from = self.date_from.date().toString("yyyy-MM-dd")
-            date_to = self.date_to.date().toString("yyyy-MM-dd")
-            user_id = self.user_filter.currentData()
-            action_type = self.action_filter.currentData()
-            table_affected = self.table_filter.currentData()
-            
-            # Build filters
-            filters = {
-                'date_from': date_from,
-                'date_to': date_to
-            }
-            
-            if user_id is not None:
-                filters['user_id'] = user_id
-            
-            if action_type is not None:
-                filters['action_type'] = action_type
-            
-            if table_affected is not None:
-                filters['table_affected'] = table_affected
-            
-            # Get logs
-            logs = self.audit_trail.get_audit_logs(filters, limit=1000)
-            
-            # Update table
-            self.logs_table.setRowCount(0)
-            
-            for row_idx, log in enumerate(logs):
-                self.logs_table.insertRow(row_idx)
-                
-                log_id, timestamp, action_type, table_affected, record_id, details, ip, username, full_name = log
-                
-                # Log ID
-                self.logs_table.setItem(row_idx, 0, QTableWidgetItem(str(log_id)))
-                
-                # Timestamp
-                self.logs_table.setItem(row_idx, 1, QTableWidgetItem(timestamp.strftime("%Y-%m-%d %H:%M:%S")))
-                
-                # User
-                user_item = QTableWidgetItem(f"{username} ({full_name})")
-                self.logs_table.setItem(row_idx, 2, user_item)
-                
-                # Action Type
-                self.logs_table.setItem(row_idx, 3, QTableWidgetItem(action_type))
-                
-                # Table
-                self.logs_table.setItem(row_idx, 4, QTableWidgetItem(table_affected or ""))
-                
-                # Record ID
-                self.logs_table.setItem(row_idx, 5, QTableWidgetItem(str(record_id) if record_id else ""))
-                
-                # Details
-                self.logs_table.setItem(row_idx, 6, QTableWidgetItem(details or ""))
-                
-                # IP Address
-                self.logs_table.setItem(row_idx, 7, QTableWidgetItem(ip or ""))
-            
-            self.logs_table.resizeColumnsToContents()
-            self.logs_table.horizontalHeader().setSectionResizeMode(6, QHeaderView.Stretch)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load audit logs: {str(e)}")
+        """Start loading audit logs based on filters"""
+        # Get filter values
+        date_from = self.date_from.date().toPyDate()
+        date_to = self.date_to.date().toPyDate()
+        user_id = self.user_filter.currentData()
+        action_type = self.action_filter.currentData()
+        table_affected = self.table_filter.currentData()
+        
+        # Build filters
+        filters = {
+            'date_from': date_from,
+            'date_to': date_to
+        }
+        
+        if user_id is not None:
+            filters['user_id'] = user_id
+        
+        if action_type is not None:
+            filters['action_type'] = action_type
+        
+        if table_affected is not None:
+            filters['table_affected'] = table_affected
+        
+        search = self.search_edit.text().strip()
+        if search:
+            filters['search'] = search
+        
+        archive_month = self.source_filter.currentData()
+        if archive_month is not None:
+            # Archived months are read from their file only when asked for
+            self.model.set_archive(archive_month, filters)
+            return
+        
+        # The first page loads in the background; the rest follow as the user scrolls
+        self.model.set_filters(filters)
+    
+    def update_count_label(self, *args):
+        """Show how many logs are loaded so far"""
+        count = self.model.rowCount()
+        more = " (scroll for more)" if self.model.has_more else ""
+        kind = "matching logs" if self.model.filters and self.model.filters.get('search') else "logs"
+        self.count_label.setText(f"{count} {kind} loaded{more}")
+    
+    def logs_load_failed(self, message):
+        """Report a failed background load"""
+        QMessageBox.critical(self, "Error", f"Failed to load audit logs: {message}")
+    
+    def done(self, result):
+        """Cancel any background load before closing"""
+        self.model.loader.cancel()
+        super().done(result)
     
     def export_logs(self):
         """Export audit logs to Excel"""
         try:
-            # Get data from table
-            data = []
-            headers = []
-            
-            for col in range(self.logs_table.columnCount()):
-                headers.append(self.logs_table.horizontalHeaderItem(col).text())
-            
-            for row in range(self.logs_table.rowCount()):
-                row_data = []
-                for col in range(self.logs_table.columnCount()):
-                    item = self.logs_table.item(row, col)
-                    row_data.append(item.text() if item else "")
-                data.append(row_data)
+            # Export the logs loaded so far
+            headers = list(self.model.HEADERS)
+            data = [self.model.display_row(row) for row in range(self.model.rowCount())]
             
             # Export to Excel
             self.export_utility.export_to_excel(
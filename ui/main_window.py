@@ -1,16 +1,28 @@
+import logging
+
 from PyQt5.QtWidgets import (QMainWindow, QTabWidget, QWidget, QVBoxLayout, 
                             QHBoxLayout, QLabel, QPushButton, QAction, QStatusBar, QMessageBox, QFrame)
 from PyQt5.QtCore import Qt, QDate, QTime, QTimer
 from PyQt5.QtGui import QIcon, QFont, QPixmap
 
-from ui.inventory_management import InventoryManagementWidget
-from ui.pos import POSWidget
-from ui.reports import ReportsWidget
+from inventory_management import InventoryManagementWidget
+from pos import POSWidget
+from reports import ReportsWidget
 from ui.user_management import UserManagementWidget
 from ui.supplier_management import SupplierManagementWidget
 from database.db_connector import DatabaseConnection
 from ui.settings_dialog import SettingsDialog
 from ui.audit_logs_dialog import AuditLogsDialog
+from ui.stall_report_dialog import StallReportDialog
+from utils.audit import close_audit_sink
+from utils.connectivity import get_connectivity_monitor
+from utils.loader import DataLoader, cancel_all_loaders
+from utils.stock_alerts import start_stock_alert_listener, stop_stock_alert_listener
+from database.models import ProductModel
+from database.sales_summary import fold_daily_sales_deltas
+
+# How often sales rollup deltas are folded into the summary
+SUMMARY_FOLD_INTERVAL_MS = 60 * 1000
 
 class MainWindow(QMainWindow):
     """Main application window with tabbed interface"""
@@ -19,14 +31,40 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.user = user
         self.db = DatabaseConnection()
+        self.connectivity = get_connectivity_monitor()
+        self.connectivity.online_changed.connect(self.connectivity_changed)
+        self.connectivity.replay_finished.connect(self.offline_sales_replayed)
+        self.connectivity.replay_stuck.connect(self.offline_replay_stuck)
+        self.management_tabs_added = False
         self.init_ui()
         
+        # Stock alerts pushed by the database, for the roles managing inventory
+        if self.user['role'] in ["Admin", "Pharmacist"]:
+            self.new_alerts = []
+            self.alert_debounce = QTimer(self)
+            self.alert_debounce.setSingleShot(True)
+            self.alert_debounce.setInterval(500)
+            self.alert_debounce.timeout.connect(self.show_new_alerts)
+            self.alert_count_loader = DataLoader(self)
+            self.alert_count_loader.rows_loaded.connect(self.update_alert_badge)
+            self.stock_alerts = start_stock_alert_listener()
+            self.stock_alerts.alert_received.connect(self.stock_alert_received)
+            self.stock_alerts.listening.connect(self.refresh_alert_count)
+            self.refresh_alert_count()
+        
         # Start clock timer
         self.update_clock()
         self.timer = QTimer(self)
         self.timer.timeout.connect(self.update_clock)
         self.timer.start(1000)  # Update every second
         
+        # Checkouts only append rollup deltas; fold them in away from the checkout path
+        self.summary_fold_loader = DataLoader(self)
+        self.summary_fold_loader.load_failed.connect(self.summary_fold_failed)
+        self.summary_fold_timer = QTimer(self)
+        self.summary_fold_timer.timeout.connect(self.fold_sales_summary)
+        self.summary_fold_timer.start(SUMMARY_FOLD_INTERVAL_MS)
+        
         # Show in full screen mode
         self.showMaximized()  # This will maximize the window
     
@@ -131,6 +169,15 @@ class MainWindow(QMainWindow):
         header_layout.addLayout(date_time_layout)
         header_layout.addSpacing(20)
         
+        # Alert badge: low stock and expiring products, kept current by notifications
+        self.alerts_button = QPushButton("Alerts: 0")
+        self.alerts_button.setIcon(QIcon("resources/icons/alert.png"))
+        self.alerts_button.setToolTip("Low stock and expiring products - click to open Inventory")
+        self.alerts_button.clicked.connect(self.open_inventory_tab)
+        self.alerts_button.setVisible(self.user['role'] in ["Admin", "Pharmacist"])
+        header_layout.addWidget(self.alerts_button)
+        header_layout.addSpacing(10)
+        
         # User info and logout - simplified
         user_layout = QHBoxLayout()
         
@@ -164,6 +211,29 @@ class MainWindow(QMainWindow):
         content_layout.setContentsMargins(15, 15, 15, 15)
         content_layout.setSpacing(10)
         
+        # Stock alert banner, shown without blocking the window
+        self.alert_banner = QFrame()
+        self.alert_banner.setObjectName("alertBanner")
+        self.alert_banner.setStyleSheet("""
+            #alertBanner {
+                background-color: #fdf2e9;
+                border: 1px solid #e67e22;
+                border-radius: 3px;
+            }
+        """)
+        banner_layout = QHBoxLayout(self.alert_banner)
+        banner_layout.setContentsMargins(10, 5, 10, 5)
+        self.alert_banner_label = QLabel()
+        banner_layout.addWidget(self.alert_banner_label, 1)
+        view_alerts_button = QPushButton("View")
+        view_alerts_button.clicked.connect(self.open_inventory_tab)
+        banner_layout.addWidget(view_alerts_button)
+        dismiss_alerts_button = QPushButton("Dismiss")
+        dismiss_alerts_button.clicked.connect(self.alert_banner.hide)
+        banner_layout.addWidget(dismiss_alerts_button)
+        self.alert_banner.hide()
+        content_layout.addWidget(self.alert_banner)
+        
         # Create tab widget - simplified
         self.tab_widget = QTabWidget()
         self.tab_widget.setTabPosition(QTabWidget.North)
@@ -206,12 +276,19 @@ class MainWindow(QMainWindow):
     
     def add_tabs_based_on_role(self):
         """Add tabs based on user role"""
-        role = self.user['role']
-        
         # POS tab - available to all roles
         pos_widget = POSWidget(self.user)
         self.tab_widget.addTab(pos_widget, self.create_tab_icon("resources/icons/pos.png"), "POINT OF SALE")
         
+        # Only selling works offline; the other tabs are added once the server is back
+        if self.connectivity.online:
+            self.add_management_tabs()
+    
+    def add_management_tabs(self):
+        """Add the tabs that need the database server, based on user role"""
+        role = self.user['role']
+        self.management_tabs_added = True
+        
         # Inventory tab - available to Admin and Pharmacist
         if role in ["Admin", "Pharmacist"]:
             inventory_widget = InventoryManagementWidget(self.user)
@@ -232,6 +309,114 @@ class MainWindow(QMainWindow):
             supplier_widget = SupplierManagementWidget(self.user)
             self.tab_widget.addTab(supplier_widget, self.create_tab_icon("resources/icons/suppliers.png"), "SUPPLIERS")
     
+    def connectivity_changed(self, online):
+        """Reflect offline mode in the status bar"""
+        if online:
+            self.status_bar.showMessage("Connected to the database server", 5000)
+            if not self.management_tabs_added:
+                self.add_management_tabs()
+        else:
+            self.status_bar.showMessage("Offline - sales are saved on this terminal")
+    
+    def offline_sales_replayed(self, replayed, conflicts, quarantined):
+        """Report offline sales sent to the server, any stock they overdrew and any it refused"""
+        if replayed:
+            self.status_bar.showMessage(f"Sent {replayed} offline sale(s) to the server", 10000)
+        if quarantined:
+            lines = [f"• {sale['invoice_number']} ({sale['sale_date'][:16].replace('T', ' ')}): {sale['error']}"
+                     for sale in quarantined]
+            QMessageBox.warning(
+                self,
+                "Offline Sales Not Sent",
+                "The server refused these offline sales. They are kept on this terminal "
+                "and will be tried again the next time the application starts:\n\n"
+                + "\n".join(lines)
+                + "\n\nPlease contact your administrator."
+            )
+        if not conflicts:
+            return
+        
+        lines = []
+        for conflict in conflicts:
+            name = conflict['product_name'] or f"Product {conflict['product_id']}"
+            if conflict['available'] is None:
+                lines.append(f"• {name}: sold {conflict['requested']}, product no longer exists")
+            else:
+                lines.append(f"• {name}: sold {conflict['requested']}, only {conflict['available']} in stock")
+        QMessageBox.warning(
+            self,
+            "Offline Sales Stock Conflicts",
+            "Offline sales were recorded, but these products were sold beyond the server's stock "
+            "(stock has been set to zero):\n\n" + "\n".join(lines)
+            + "\n\nPlease recount these products in Inventory."
+        )
+    
+    def offline_replay_stuck(self, pending, message):
+        """Warn that offline sales could not be sent although the server is back"""
+        QMessageBox.warning(
+            self,
+            "Offline Sales Not Sent",
+            f"The database server is reachable again, but {pending} sale(s) made offline "
+            f"could not be sent to it:\n\n{message}\n\n"
+            "New sales are saved on the server. The offline sales are kept on this terminal "
+            "and will keep being retried in the background."
+        )
+    
+    def fold_sales_summary(self):
+        """Fold pending sales rollup deltas on a loader thread"""
+        if self.connectivity.online and not self.summary_fold_loader.busy:
+            self.summary_fold_loader.load_function(lambda: [fold_daily_sales_deltas(self.db)])
+    
+    def summary_fold_failed(self, message):
+        # Reports still count pending deltas; the next tick tries again
+        logging.error(f"Sales summary fold failed: {message}")
+    
+    def stock_alert_received(self, alert):
+        """Collect a pushed stock alert; bursts (a checkout, the daily check) show as one banner"""
+        self.new_alerts.append(alert)
+        self.alert_debounce.start()
+    
+    def show_new_alerts(self):
+        """Show the alerts received since the last banner and recount the badge"""
+        alerts, self.new_alerts = self.new_alerts, []
+        if len(alerts) == 1:
+            alert = alerts[0]
+            if alert['alert'] == "low_stock":
+                text = (f"Low stock: {alert['product_name']} has {alert['stock_quantity']} left "
+                        f"(reorder level {alert['reorder_level']})")
+            elif alert['alert'] == "expired":
+                text = f"Expired: {alert['product_name']} expired on {alert['expiry_date']}"
+            else:
+                text = f"Expiring soon: {alert['product_name']} expires on {alert['expiry_date']}"
+        else:
+            low_stock = sum(1 for alert in alerts if alert['alert'] == "low_stock")
+            text = f"{len(alerts)} new stock alerts: {low_stock} low stock, {len(alerts) - low_stock} expiring or expired"
+        self.alert_banner_label.setText(text)
+        self.alert_banner.show()
+        self.refresh_alert_count()
+    
+    def refresh_alert_count(self):
+        """Recount the alert badge in the background"""
+        self.alert_count_loader.load_function(lambda: [ProductModel().count_stock_alerts()])
+    
+    def update_alert_badge(self, rows):
+        counts = rows[0]
+        total = counts['low_stock'] + counts['expiring']
+        self.alerts_button.setText(f"Alerts: {total}")
+        self.alerts_button.setToolTip(
+            f"{counts['low_stock']} low stock, {counts['expiring']} expiring or expired - click to open Inventory"
+        )
+        self.alerts_button.setStyleSheet("QPushButton { background-color: #e67e22; color: white; }" if total else "")
+    
+    def open_inventory_tab(self):
+        """Switch to the Stock Alerts of the Inventory tab; only admins and pharmacists have it"""
+        for index in range(self.tab_widget.count()):
+            if self.tab_widget.tabText(index) == "INVENTORY":
+                self.tab_widget.setCurrentIndex(index)
+                self.tab_widget.widget(index).show_stock_alerts()
+                break
+        self.alert_banner.hide()
+    
     def create_tab_icon(self, icon_path):
         """Create a properly sized icon for tabs"""
         return QIcon(icon_path)
@@ -291,6 +476,10 @@ class MainWindow(QMainWindow):
         audit_action.triggered.connect(self.show_audit_logs)
         tools_menu.addAction(audit_action)
         
+        stall_action = QAction(QIcon("resources/icons/audit.png"), "UI Stall Report", self)
+        stall_action.triggered.connect(self.show_stall_report)
+        tools_menu.addAction(stall_action)
+        
         # Help menu
         help_menu = menu_bar.addMenu("&Help")
         
@@ -318,6 +507,11 @@ class MainWindow(QMainWindow):
         dialog = AuditLogsDialog(self)
         dialog.exec_()
     
+    def show_stall_report(self):
+        """Open the UI stall report dialog"""
+        dialog = StallReportDialog(self)
+        dialog.exec_()
+    
     def show_about(self):
         """Show about dialog - simplified"""
         about_box = QMessageBox(self)
@@ -357,7 +551,15 @@ class MainWindow(QMainWindow):
     
     def closeEvent(self, event):
         """Handle window close event"""
+        if hasattr(self, 'stock_alerts'):
+            # The listener outlives this window when logging out
+            self.stock_alerts.alert_received.disconnect(self.stock_alert_received)
+            self.stock_alerts.listening.disconnect(self.refresh_alert_count)
         if not hasattr(self, 'login_window') or not self.login_window.isVisible():
+            cancel_all_loaders()
+            stop_stock_alert_listener()
+            # Queued audit entries need the pool, so they go out first
+            close_audit_sink()
             self.db.close_all_connections()
             event.accept()
         else:
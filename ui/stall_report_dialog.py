@@ -0,0 +1,123 @@
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                           QTableWidget, QTableWidgetItem, QHeaderView, QTextEdit, QSplitter)
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QIcon, QFont
+
+import traceback
+from utils.watchdog import get_watchdog
+
+class StallReportDialog(QDialog):
+    """Dialog ranking the handlers that blocked the UI the longest"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.summary = []
+        self.init_ui()
+        self.load_summary()
+
+    def init_ui(self):
+        """Initialize the UI components"""
+        self.setWindowTitle("UI Stall Report")
+        self.setMinimumSize(800, 500)
+
+        main_layout = QVBoxLayout(self)
+
+        self.info_label = QLabel()
+        main_layout.addWidget(self.info_label)
+
+        splitter = QSplitter(Qt.Vertical)
+
+        # Offenders table
+        self.stalls_table = QTableWidget()
+        self.stalls_table.setColumnCount(6)
+        self.stalls_table.setHorizontalHeaderLabels([
+            "Handler", "Stalls", "Total (ms)", "Worst (ms)", "Average (ms)", "Last Seen"
+        ])
+        self.stalls_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        self.stalls_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.stalls_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.stalls_table.setSelectionMode(QTableWidget.SingleSelection)
+        self.stalls_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.stalls_table.itemSelectionChanged.connect(self.show_stack)
+        splitter.addWidget(self.stalls_table)
+
+        # Stack of the worst stall for the selected handler
+        self.stack_view = QTextEdit()
+        self.stack_view.setReadOnly(True)
+        self.stack_view.setFont(QFont("Courier New", 9))
+        self.stack_view.setPlaceholderText("Select a handler to see the stack of its worst stall")
+        splitter.addWidget(self.stack_view)
+
+        main_layout.addWidget(splitter)
+
+        # Buttons
+        buttons_layout = QHBoxLayout()
+
+        refresh_btn = QPushButton("Refresh")
+        refresh_btn.setIcon(QIcon("resources/icons/refresh.png"))
+        refresh_btn.clicked.connect(self.load_summary)
+        buttons_layout.addWidget(refresh_btn)
+
+        reset_btn = QPushButton("Reset")
+        reset_btn.clicked.connect(self.reset_summary)
+        buttons_layout.addWidget(reset_btn)
+
+        buttons_layout.addStretch()
+
+        close_btn = QPushButton("Close")
+        close_btn.clicked.connect(self.accept)
+        buttons_layout.addWidget(close_btn)
+
+        main_layout.addLayout(buttons_layout)
+
+    def load_summary(self):
+        """Load the ranked stall totals from the watchdog"""
+        watchdog = get_watchdog()
+        self.stalls_table.setRowCount(0)
+        self.stack_view.clear()
+
+        if watchdog is None:
+            self.summary = []
+            self.info_label.setText("The UI stall watchdog is disabled (see [watchdog] in config.ini).")
+            return
+
+        self.summary = watchdog.get_summary()
+        self.info_label.setText(
+            f"Stalls longer than {watchdog.threshold_ms} ms this session, worst offenders first. "
+            f"Full stacks are written to logs/ui_stalls_*.log."
+        )
+
+        for row_idx, row in enumerate(self.summary):
+            self.stalls_table.insertRow(row_idx)
+            self.stalls_table.setItem(row_idx, 0, QTableWidgetItem(row['handler']))
+
+            for col, value in ((1, str(row['count'])),
+                               (2, f"{row['total_ms']:.0f}"),
+                               (3, f"{row['worst_ms']:.0f}"),
+                               (4, f"{row['average_ms']:.0f}")):
+                item = QTableWidgetItem(value)
+                item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.stalls_table.setItem(row_idx, col, item)
+
+            last_seen = row['last_seen'].strftime("%H:%M:%S") if row['last_seen'] else ""
+            self.stalls_table.setItem(row_idx, 5, QTableWidgetItem(last_seen))
+
+    def show_stack(self):
+        """Show the stack captured for the selected handler's worst stall"""
+        row_idx = self.stalls_table.currentRow()
+        if row_idx < 0 or row_idx >= len(self.summary):
+            self.stack_view.clear()
+            return
+
+        stack = self.summary[row_idx]['worst_stack']
+        if stack:
+            self.stack_view.setPlainText("".join(traceback.format_list(stack)))
+        else:
+            self.stack_view.setPlainText("No stack was sampled for this stall.")
+
+    def reset_summary(self):
+        """Clear the collected totals"""
+        watchdog = get_watchdog()
+        if watchdog is not None:
+            watchdog.reset()
+        self.load_summary()
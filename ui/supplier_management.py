@@ -7,6 +7,7 @@ from PyQt5.QtGui import QIcon, QFont
 
 from database.db_connector import DatabaseConnection
 from utils.auth import Authentication
+from utils.loader import DataLoader, BusyIndicator
 
 class SupplierDialog(QDialog):
     """Dialog for adding or editing suppliers"""
@@ -193,6 +194,10 @@ class SupplierManagementWidget(QWidget):
         self.user = user
         self.db = DatabaseConnection()
         self.auth = Authentication()
+        self.loader = DataLoader(self)
+        self.loader.rows_loaded.connect(self.append_suppliers)
+        self.loader.load_finished.connect(self.suppliers_loaded)
+        self.loader.load_failed.connect(self.suppliers_load_failed)
         self.init_ui()
         self.load_suppliers()
     
@@ -223,6 +228,10 @@ class SupplierManagementWidget(QWidget):
         self.suppliers_table.setEditTriggers(QTableWidget.NoEditTriggers)
         main_layout.addWidget(self.suppliers_table)
         
+        self.busy_indicator = BusyIndicator(text="Loading suppliers...")
+        self.busy_indicator.attach(self.loader)
+        main_layout.addWidget(self.busy_indicator)
+        
         # Buttons
         buttons_layout = QHBoxLayout()
         
@@ -241,90 +250,81 @@ class SupplierManagementWidget(QWidget):
         main_layout.addLayout(buttons_layout)
     
     def load_suppliers(self):
-     """Load suppliers from database into table"""
-     connection = None
-     cursor = None
-     try:
-        # Get a direct connection
-        connection = self.db.get_connection()
-        cursor = connection.cursor()
-        
+        """Start loading suppliers from database into table"""
+        self.suppliers_table.setRowCount(0)
         query = """
             SELECT supplier_id, name, contact_person, phone, email, address
             FROM suppliers
             ORDER BY name
         """
-        cursor.execute(query)
-        suppliers = cursor.fetchall()
-        
-        self.suppliers_table.setRowCount(0)
-        
-        for row_idx, supplier in enumerate(suppliers):
+        self.loader.load_query(query)
+    
+    def append_suppliers(self, suppliers):
+        """Append a chunk of loaded suppliers to the table"""
+        for supplier in suppliers:
+            row_idx = self.suppliers_table.rowCount()
             self.suppliers_table.insertRow(row_idx)
             
             supplier_id, name, contact_person, phone, email, address = supplier
-            
+        
             # Supplier ID
             self.suppliers_table.setItem(row_idx, 0, QTableWidgetItem(str(supplier_id)))
-            
+        
             # Name
             self.suppliers_table.setItem(row_idx, 1, QTableWidgetItem(name))
-            
+        
             # Contact Person
             self.suppliers_table.setItem(row_idx, 2, QTableWidgetItem(contact_person or ""))
-            
+        
             # Phone
             self.suppliers_table.setItem(row_idx, 3, QTableWidgetItem(phone or ""))
-            
+        
             # Email
             self.suppliers_table.setItem(row_idx, 4, QTableWidgetItem(email or ""))
-            
+        
             # Store address in a hidden role for tooltip
             if address:
                 self.suppliers_table.item(row_idx, 1).setToolTip(f"Address: {address}")
-            
+        
             # Actions
             actions_widget = QWidget()
             actions_layout = QHBoxLayout(actions_widget)
             actions_layout.setContentsMargins(2, 2, 2, 2)
             actions_layout.setSpacing(2)
-            
+        
             view_btn = QPushButton()
             view_btn.setIcon(QIcon("resources/icons/view.png"))
             view_btn.setToolTip("View Supplier Details")
             view_btn.setMaximumWidth(30)
             view_btn.clicked.connect(lambda _, sid=supplier_id: self.view_supplier(sid))
             actions_layout.addWidget(view_btn)
-            
+        
             edit_btn = QPushButton()
             edit_btn.setIcon(QIcon("resources/icons/edit.png"))
             edit_btn.setToolTip("Edit Supplier")
             edit_btn.setMaximumWidth(30)
             edit_btn.clicked.connect(lambda _, sid=supplier_id: self.edit_supplier(sid))
             actions_layout.addWidget(edit_btn)
-            
+        
             delete_btn = QPushButton()
             delete_btn.setIcon(QIcon("resources/icons/delete.png"))
             delete_btn.setToolTip("Delete Supplier")
             delete_btn.setMaximumWidth(30)
             delete_btn.clicked.connect(lambda _, sid=supplier_id, sname=name: self.delete_supplier(sid, sname))
             actions_layout.addWidget(delete_btn)
-            
-            self.suppliers_table.setCellWidget(row_idx, 5, actions_widget)
         
+            self.suppliers_table.setCellWidget(row_idx, 5, actions_widget)
+    
+    def suppliers_loaded(self, total):
+        """Finish the table once all suppliers have arrived"""
         self.suppliers_table.resizeColumnsToContents()
         self.suppliers_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        
-     except Exception as e:
-        print(f"Error loading suppliers: {str(e)}")
-        import traceback
-        print(traceback.format_exc())
-        QMessageBox.critical(self, "Error", f"Failed to load suppliers: {str(e)}")
-     finally:
-        if cursor:
-            cursor.close()
-        if connection:
-            self.db.release_connection(connection)
+        self.filter_suppliers()
+    
+    def suppliers_load_failed(self, message):
+        """Report a failed background load"""
+        print(f"Error loading suppliers: {message}")
+        QMessageBox.critical(self, "Error", f"Failed to load suppliers: {message}")
     
     def filter_suppliers(self):
         """Filter suppliers based on search text"""
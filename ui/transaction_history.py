@@ -1,10 +1,125 @@
-from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, 
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QTableWidget, QTableView,
                            QTableWidgetItem, QPushButton, QLabel, QLineEdit,
                            QDateEdit, QComboBox, QMessageBox, QHeaderView, QFrame,QWidget)
-from PyQt5.QtCore import Qt, QDate, pyqtSignal
-from PyQt5.QtGui import QIcon
+from PyQt5.QtCore import Qt, QDate, pyqtSignal, QAbstractTableModel, QModelIndex
+from PyQt5.QtGui import QIcon, QBrush
 import datetime
-# Add to your imports
+from database.models import SaleModel
+from utils.loader import DataLoader, BusyIndicator
+
+class TransactionTableModel(QAbstractTableModel):
+    """Table model that fetches sales one keyset page at a time as the view scrolls"""
+    
+    load_failed = pyqtSignal(str)
+    
+    HEADERS = ["ID", "Invoice #", "Date", "Cashier", "Amount", "Payment Method", "Status"]
+    STATUS_COLUMN = 6
+    PAGE_SIZE = 100
+    
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.sale_model = SaleModel()
+        self.rows = []
+        self.pending_rows = []
+        self.filters = None
+        self.has_more = False
+        
+        self.loader = DataLoader(self)
+        self.loader.rows_loaded.connect(self.pending_rows.extend)
+        self.loader.load_finished.connect(self.page_loaded)
+        self.loader.load_failed.connect(self.page_failed)
+    
+    def set_filters(self, start_date, end_date, invoice_prefix=None, status=None):
+        """Drop the loaded rows and start again from the first page"""
+        self.beginResetModel()
+        self.rows = []
+        self.filters = (start_date, end_date, invoice_prefix, status)
+        self.has_more = True
+        self.endResetModel()
+        self.fetch_page()
+    
+    def fetch_page(self):
+        """Load the page that follows the last loaded row"""
+        after = (self.rows[-1][2], self.rows[-1][0]) if self.rows else None
+        start_date, end_date, invoice_prefix, status = self.filters
+        self.pending_rows.clear()
+        self.loader.load_function(
+            self.sale_model.get_sales_page,
+            start_date, end_date, invoice_prefix, status, after, self.PAGE_SIZE
+        )
+    
+    def page_loaded(self, total):
+        """Append the page that just arrived"""
+        self.has_more = total == self.PAGE_SIZE
+        if self.pending_rows:
+            first = len(self.rows)
+            self.beginInsertRows(QModelIndex(), first, first + len(self.pending_rows) - 1)
+            self.rows.extend(self.pending_rows)
+            self.endInsertRows()
+        self.pending_rows.clear()
+    
+    def page_failed(self, message):
+        self.has_more = False
+        self.pending_rows.clear()
+        self.load_failed.emit(message)
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.has_more and not self.loader.busy
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if self.canFetchMore(parent):
+            self.fetch_page()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.HEADERS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        
+        sale_id, invoice_number, sale_date, cashier, total_amount, payment_method, status = self.rows[index.row()]
+        column = index.column()
+        
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return str(sale_id)
+            elif column == 1:
+                return invoice_number
+            elif column == 2:
+                return sale_date.strftime('%Y-%m-%d %H:%M')
+            elif column == 3:
+                return cashier
+            elif column == 4:
+                return f"₱{float(total_amount):.2f}"
+            elif column == 5:
+                return payment_method
+            elif column == 6:
+                return status
+        elif role == Qt.TextAlignmentRole and column == 4:
+            return Qt.AlignRight | Qt.AlignVCenter
+        elif role == Qt.ForegroundRole and column == self.STATUS_COLUMN and status == "Voided":
+            return QBrush(Qt.red)
+        
+        return None
+    
+    def sale_at(self, row):
+        """Get the raw sale tuple shown on a row"""
+        return self.rows[row]
+    
+    def set_status(self, row, status):
+        """Update the status shown on a row after it changed in the database"""
+        self.rows[row] = self.rows[row][:self.STATUS_COLUMN] + (status,)
+        index = self.index(row, self.STATUS_COLUMN)
+        self.dataChanged.emit(index, index)
+
 
 class TransactionHistoryDialog(QDialog):
     """Dialog for viewing transaction history, voiding sales, and reprinting receipts"""
@@ -18,6 +133,11 @@ class TransactionHistoryDialog(QDialog):
         self.auth = auth
         self.parent_widget = parent
         
+        self.model = TransactionTableModel(self)
+        self.model.load_failed.connect(self.transactions_load_failed)
+        self.model.rowsInserted.connect(self.update_count_label)
+        self.model.modelReset.connect(self.update_count_label)
+        
         self.setWindowTitle("Transaction History")
         self.setMinimumSize(900, 600)
         self.setWindowIcon(QIcon("resources/icons/history.png"))
@@ -47,10 +167,11 @@ class TransactionHistoryDialog(QDialog):
         self.date_to.setDate(QDate.currentDate())
         filter_layout.addWidget(self.date_to)
         
-        # Invoice number search
+        # Invoice number search (prefix match so the invoice index can be used)
         filter_layout.addWidget(QLabel("Invoice #:"))
         self.invoice_search = QLineEdit()
-        self.invoice_search.setPlaceholderText("Search by invoice number...")
+        self.invoice_search.setPlaceholderText("Invoice number starts with, e.g. INV-20250131")
+        self.invoice_search.returnPressed.connect(self.load_transactions)
         filter_layout.addWidget(self.invoice_search)
         
         # Status filter
@@ -67,136 +188,109 @@ class TransactionHistoryDialog(QDialog):
         
         main_layout.addWidget(filter_frame)
         
-        # Transactions table
-        self.transactions_table = QTableWidget()
-        self.transactions_table.setColumnCount(8)
-        self.transactions_table.setHorizontalHeaderLabels([
-            "ID", "Invoice #", "Date", "Cashier", "Amount", "Payment Method", "Status", "Actions"
-        ])
-        self.transactions_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeToContents)
+        # Transactions table; rows are fetched page by page as the view scrolls
+        self.transactions_table = QTableView()
+        self.transactions_table.setModel(self.model)
+        self.transactions_table.horizontalHeader().setSectionResizeMode(QHeaderView.Interactive)
         self.transactions_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
-        self.transactions_table.setSelectionBehavior(QTableWidget.SelectRows)
-        self.transactions_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.transactions_table.setSelectionBehavior(QTableView.SelectRows)
+        self.transactions_table.setSelectionMode(QTableView.SingleSelection)
+        self.transactions_table.setEditTriggers(QTableView.NoEditTriggers)
+        self.transactions_table.verticalHeader().setVisible(False)
+        self.transactions_table.doubleClicked.connect(self.view_selected_transaction)
+        self.transactions_table.selectionModel().selectionChanged.connect(self.update_action_buttons)
         main_layout.addWidget(self.transactions_table)
         
-        # Button row
+        self.busy_indicator = BusyIndicator(text="Loading transactions...")
+        self.busy_indicator.attach(self.model.loader)
+        main_layout.addWidget(self.busy_indicator)
+        
+        # Button row; actions apply to the selected transaction
         button_layout = QHBoxLayout()
         
+        self.count_label = QLabel()
+        button_layout.addWidget(self.count_label)
+        button_layout.addStretch()
+        
+        self.view_btn = QPushButton("View Details")
+        self.view_btn.setIcon(QIcon("resources/icons/view.png"))
+        self.view_btn.clicked.connect(self.view_selected_transaction)
+        button_layout.addWidget(self.view_btn)
+        
+        self.print_btn = QPushButton("Print Receipt")
+        self.print_btn.setIcon(QIcon("resources/icons/print.png"))
+        self.print_btn.clicked.connect(self.print_selected_receipt)
+        button_layout.addWidget(self.print_btn)
+        
+        self.void_btn = QPushButton("Void Transaction")
+        self.void_btn.setIcon(QIcon("resources/icons/cancel.png"))
+        self.void_btn.clicked.connect(self.void_selected_transaction)
+        button_layout.addWidget(self.void_btn)
+        
         self.close_btn = QPushButton("Close")
         self.close_btn.setIcon(QIcon("resources/icons/close.png"))
         self.close_btn.clicked.connect(self.reject)
         button_layout.addWidget(self.close_btn)
         
         main_layout.addLayout(button_layout)
+        self.model.modelReset.connect(self.update_action_buttons)
+        self.update_action_buttons()
         
     def load_transactions(self):
-        """Load transactions based on filters"""
-        try:
-            # Clear the table
-            self.transactions_table.setRowCount(0)
-            
-            # Get filter values
-            date_from = self.date_from.date().toString("yyyy-MM-dd")
-            date_to = self.date_to.date().toString("yyyy-MM-dd")
-            invoice_number = self.invoice_search.text().strip()
-            status_filter = self.status_filter.currentText()
-            
-            # Build query
-            query = """
-                SELECT s.sale_id, s.invoice_number, s.sale_date, u.full_name, 
-                       s.total_amount, s.payment_method, s.status
-                FROM sales s
-                JOIN users u ON s.user_id = u.user_id
-                WHERE s.sale_date BETWEEN %s AND %s
-            """
-            params = [f"{date_from} 00:00:00", f"{date_to} 23:59:59"]
-            
-            if invoice_number:
-                query += " AND s.invoice_number LIKE %s"
-                params.append(f"%{invoice_number}%")
-            
-            if status_filter != "All":
-                query += " AND s.status = %s"
-                params.append(status_filter)
-            
-            query += " ORDER BY s.sale_date DESC"
-            
-            # Execute query
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
-            cursor.execute(query, params)
-            transactions = cursor.fetchall()
-            cursor.close()
-            self.db.release_connection(connection)
-            
-            # Populate table
-            for row_idx, transaction in enumerate(transactions):
-                sale_id, invoice_number, sale_date, cashier, total_amount, payment_method, status = transaction
-                
-                self.transactions_table.insertRow(row_idx)
-                
-                # ID
-                self.transactions_table.setItem(row_idx, 0, QTableWidgetItem(str(sale_id)))
-                
-                # Invoice Number
-                self.transactions_table.setItem(row_idx, 1, QTableWidgetItem(invoice_number))
-                
-                # Date
-                date_item = QTableWidgetItem(sale_date.strftime('%Y-%m-%d %H:%M'))
-                self.transactions_table.setItem(row_idx, 2, date_item)
-                
-                # Cashier
-                self.transactions_table.setItem(row_idx, 3, QTableWidgetItem(cashier))
-                
-                # Amount
-                amount_item = QTableWidgetItem(f"₱{float(total_amount):.2f}")
-                amount_item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
-                self.transactions_table.setItem(row_idx, 4, amount_item)
-                
-                # Payment Method
-                self.transactions_table.setItem(row_idx, 5, QTableWidgetItem(payment_method))
-                
-                # Status
-                status_item = QTableWidgetItem(status)
-                if status == "Voided":
-                    status_item.setForeground(Qt.red)
-                self.transactions_table.setItem(row_idx, 6, status_item)
-                
-                # Actions
-                actions_widget = QWidget()
-                actions_layout = QHBoxLayout(actions_widget)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                actions_layout.setSpacing(5)
-                
-                # View details button
-                view_btn = QPushButton()
-                view_btn.setIcon(QIcon("resources/icons/view.png"))
-                view_btn.setToolTip("View Details")
-                view_btn.setMaximumWidth(30)
-                view_btn.clicked.connect(lambda _, id=sale_id: self.view_transaction_details(id))
-                actions_layout.addWidget(view_btn)
-                
-                # Print receipt button
-                print_btn = QPushButton()
-                print_btn.setIcon(QIcon("resources/icons/print.png"))
-                print_btn.setToolTip("Print Receipt")
-                print_btn.setMaximumWidth(30)
-                print_btn.clicked.connect(lambda _, id=sale_id, inv=invoice_number: self.print_receipt(id, inv))
-                actions_layout.addWidget(print_btn)
-                
-                # Void transaction button (only for completed transactions)
-                if status == "Completed":
-                    void_btn = QPushButton()
-                    void_btn.setIcon(QIcon("resources/icons/cancel.png"))
-                    void_btn.setToolTip("Void Transaction")
-                    void_btn.setMaximumWidth(30)
-                    void_btn.clicked.connect(lambda _, id=sale_id, row=row_idx: self.void_transaction(id, row))
-                    actions_layout.addWidget(void_btn)
-                
-                self.transactions_table.setCellWidget(row_idx, 7, actions_widget)
-            
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load transactions: {str(e)}")
+        """Start loading transactions based on filters"""
+        invoice_prefix = self.invoice_search.text().strip() or None
+        status_filter = self.status_filter.currentText()
+        
+        self.model.set_filters(
+            self.date_from.date().toPyDate(),
+            self.date_to.date().toPyDate(),
+            invoice_prefix,
+            None if status_filter == "All" else status_filter
+        )
+    
+    def transactions_load_failed(self, message):
+        """Report a failed background load"""
+        QMessageBox.critical(self, "Error", f"Failed to load transactions: {message}")
+    
+    def update_count_label(self, *args):
+        """Show how many transactions are loaded so far"""
+        count = self.model.rowCount()
+        more = " (scroll for more)" if self.model.has_more else ""
+        self.count_label.setText(f"{count} transactions loaded{more}")
+    
+    def selected_row(self):
+        """Get the selected table row, or None"""
+        rows = self.transactions_table.selectionModel().selectedRows()
+        return rows[0].row() if rows else None
+    
+    def update_action_buttons(self, *args):
+        """Enable the action buttons that apply to the selected transaction"""
+        row = self.selected_row()
+        has_selection = row is not None
+        self.view_btn.setEnabled(has_selection)
+        self.print_btn.setEnabled(has_selection)
+        self.void_btn.setEnabled(has_selection and self.model.sale_at(row)[6] == "Completed")
+    
+    def view_selected_transaction(self, *args):
+        row = self.selected_row()
+        if row is not None:
+            self.view_transaction_details(self.model.sale_at(row)[0])
+    
+    def print_selected_receipt(self):
+        row = self.selected_row()
+        if row is not None:
+            sale = self.model.sale_at(row)
+            self.print_receipt(sale[0], sale[1])
+    
+    def void_selected_transaction(self):
+        row = self.selected_row()
+        if row is not None:
+            self.void_transaction(self.model.sale_at(row)[0], row)
+    
+    def done(self, result):
+        """Cancel any background load before closing"""
+        self.model.loader.cancel()
+        super().done(result)
     
     def view_transaction_details(self, sale_id):
         """View the details of a transaction"""
@@ -271,71 +365,23 @@ class TransactionHistoryDialog(QDialog):
         
         if reply == QMessageBox.Yes:
             try:
-                connection = self.db.get_connection()
-                cursor = connection.cursor()
+                # Stock restore, status change and audit row commit together
+                invoice_number = SaleModel().void_sale(sale_id, self.user['user_id'])
+                
+                if invoice_number is None:
+                    QMessageBox.warning(self, "Void Transaction",
+                                        "This transaction was not found or has already been voided.")
+                    self.load_transactions()
+                    return
+                
+                # Update table row
+                self.model.set_status(row, "Voided")
+                self.update_action_buttons()
                 
-                try:
-                    # Begin transaction
-                    connection.begin()
-                    
-                    # Get sale items to restore inventory
-                    cursor.execute("""
-                        SELECT product_id, quantity FROM sale_items
-                        WHERE sale_id = %s
-                    """, (sale_id,))
-                    
-                    items = cursor.fetchall()
-                    
-                    # Restore inventory
-                    for product_id, quantity in items:
-                        cursor.execute("""
-                            UPDATE products
-                            SET stock_quantity = stock_quantity + %s
-                            WHERE product_id = %s
-                        """, (quantity, product_id))
-                    
-                    # Mark sale as voided
-                    cursor.execute("""
-                        UPDATE sales
-                        SET status = 'Voided', void_date = NOW(), voided_by = %s
-                        WHERE sale_id = %s
-                    """, (self.user['user_id'], sale_id))
-                    
-                    # Commit transaction
-                    connection.commit()
-                    
-                    # Log activity
-                    self.auth.log_activity(
-                        self.user['user_id'],
-                        "void",
-                        "sales",
-                        sale_id,
-                        f"Voided sale #{sale_id}"
-                    )
-                    
-                    # Update table row
-                    self.transactions_table.item(row, 6).setText("Voided")
-                    self.transactions_table.item(row, 6).setForeground(Qt.red)
-                    
-                    # Remove void button
-                    actions_widget = self.transactions_table.cellWidget(row, 7)
-                    for i in reversed(range(actions_widget.layout().count())):
-                        widget = actions_widget.layout().itemAt(i).widget()
-                        if widget and widget.toolTip() == "Void Transaction":
-                            widget.deleteLater()
-                    
-                    # Emit signal
-                    self.transaction_cancelled.emit(sale_id)
-                    
-                    QMessageBox.information(self, "Success", "Transaction has been voided successfully.")
-                    
-                except Exception as e:
-                    connection.rollback()
-                    raise e
+                # Emit signal
+                self.transaction_cancelled.emit(sale_id)
                 
-                finally:
-                    cursor.close()
-                    self.db.release_connection(connection)
+                QMessageBox.information(self, "Success", f"Transaction {invoice_number} has been voided successfully.")
                 
             except Exception as e:
                 QMessageBox.critical(self, "Void Error", f"Failed to void transaction: {str(e)}")
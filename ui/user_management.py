@@ -7,6 +7,7 @@ from PyQt5.QtGui import QIcon, QFont, QColor
 
 from database.db_connector import DatabaseConnection # Assuming this path is correct for your project
 from utils.auth import Authentication             # Assuming this path is correct for your project
+from utils.loader import DataLoader, BusyIndicator
 import datetime                                   # For created_at timestamp
 import traceback                                  # For detailed error logging
 
@@ -281,6 +282,10 @@ class UserManagementWidget(QWidget):
         self.user = current_user_session 
         self.db = DatabaseConnection()
         self.auth = Authentication()
+        self.loader = DataLoader(self)
+        self.loader.rows_loaded.connect(self.append_users)
+        self.loader.load_finished.connect(self.users_loaded)
+        self.loader.load_failed.connect(self.users_load_failed)
         self.init_ui()
         self.load_users() 
     
@@ -337,6 +342,10 @@ class UserManagementWidget(QWidget):
         self.users_table.setShowGrid(True) 
         main_layout.addWidget(self.users_table)
         
+        self.busy_indicator = BusyIndicator(text="Loading users...")
+        self.busy_indicator.attach(self.loader)
+        main_layout.addWidget(self.busy_indicator)
+        
         buttons_layout = QHBoxLayout()
         add_user_btn = QPushButton(" Add New User") 
         add_user_btn.setIcon(QIcon("resources/icons/add_user.png")) # Replace with your actual icon path
@@ -352,74 +361,71 @@ class UserManagementWidget(QWidget):
         main_layout.addLayout(buttons_layout)
     
     def load_users(self): 
-        """Load users from the database and populate the table."""
-        connection = None
-        cursor = None
-        try:
-            connection = self.db.get_connection()
-            cursor = connection.cursor()
-            query = "SELECT user_id, username, full_name, role, is_active FROM users ORDER BY username ASC"
-            cursor.execute(query)
-            all_users_data = cursor.fetchall()
+        """Start loading users from the database into the table."""
+        self.users_table.setSortingEnabled(False)
+        self.users_table.setRowCount(0) 
+        query = "SELECT user_id, username, full_name, role, is_active FROM users ORDER BY username ASC"
+        self.loader.load_query(query)
+    
+    def append_users(self, user_records):
+        """Append a chunk of loaded user records to the table."""
+        for user_record_tuple in user_records:
+            row_idx = self.users_table.rowCount()
+            self.users_table.insertRow(row_idx)
+            user_id, username, full_name, role, is_active_db_val = user_record_tuple
             
-            self.users_table.setRowCount(0) 
-            self.users_table.setSortingEnabled(False)
-
-            for row_idx, user_record_tuple in enumerate(all_users_data):
-                self.users_table.insertRow(row_idx)
-                user_id, username, full_name, role, is_active_db_val = user_record_tuple
-                
-                self.users_table.setItem(row_idx, 0, QTableWidgetItem(str(user_id)))
-                self.users_table.setItem(row_idx, 1, QTableWidgetItem(username))
-                self.users_table.setItem(row_idx, 2, QTableWidgetItem(full_name))
-                self.users_table.setItem(row_idx, 3, QTableWidgetItem(role))
-                
-                is_active_bool = bool(is_active_db_val)
-                status_text = "Active" if is_active_bool else "Inactive"
-                status_item = QTableWidgetItem(status_text)
-                status_item.setForeground(QColor("#2ECC71") if is_active_bool else QColor("#E74C3C"))
-                status_item.setData(Qt.UserRole, is_active_bool) 
-                self.users_table.setItem(row_idx, 4, status_item)
-                
-                actions_widget_container = QWidget()
-                actions_layout_hbox = QHBoxLayout(actions_widget_container)
-                actions_layout_hbox.setContentsMargins(5,2,5,2) 
-                actions_layout_hbox.setSpacing(5) 
-                
-                edit_btn = QPushButton()
-                edit_btn.setIcon(QIcon("resources/icons/edit.png")) # Replace with your actual icon path
-                edit_btn.setToolTip(f"Edit details for user: {username}")
-                edit_btn.setFixedSize(28, 28) 
-                edit_btn.clicked.connect(lambda checked=False, uid_to_edit=user_id: self.edit_user(uid_to_edit)) 
-                actions_layout_hbox.addWidget(edit_btn)
-                
-                allow_delete = True
-                if user_id == self.user['user_id']:
-                    allow_delete = False
-                if role == "Admin" and self.user['role'] != "Admin":
-                    allow_delete = False
-                
-                if allow_delete:
-                    delete_btn = QPushButton()
-                    delete_btn.setIcon(QIcon("resources/icons/delete.png")) # Replace with your actual icon path
-                    delete_btn.setToolTip(f"Delete user: {username}")
-                    delete_btn.setFixedSize(28, 28)
-                    delete_btn.clicked.connect(lambda checked=False, uid=user_id, uname=username: \
-                                               self.delete_user(uid, uname)) 
-                    actions_layout_hbox.addWidget(delete_btn)
-                
-                actions_layout_hbox.addStretch() 
-                self.users_table.setCellWidget(row_idx, 5, actions_widget_container)
+            self.users_table.setItem(row_idx, 0, QTableWidgetItem(str(user_id)))
+            self.users_table.setItem(row_idx, 1, QTableWidgetItem(username))
+            self.users_table.setItem(row_idx, 2, QTableWidgetItem(full_name))
+            self.users_table.setItem(row_idx, 3, QTableWidgetItem(role))
             
-            self.users_table.setSortingEnabled(True)
-            self.filter_users() 
-
-        except Exception as e:
-            QMessageBox.critical(self, "Error Loading Users", 
-                                 f"An unexpected error occurred while loading the user list: {str(e)}\n\n{traceback.format_exc()}")
-        finally:
-            if cursor: cursor.close()
-            if connection: self.db.release_connection(connection)
+            is_active_bool = bool(is_active_db_val)
+            status_text = "Active" if is_active_bool else "Inactive"
+            status_item = QTableWidgetItem(status_text)
+            status_item.setForeground(QColor("#2ECC71") if is_active_bool else QColor("#E74C3C"))
+            status_item.setData(Qt.UserRole, is_active_bool) 
+            self.users_table.setItem(row_idx, 4, status_item)
+            
+            actions_widget_container = QWidget()
+            actions_layout_hbox = QHBoxLayout(actions_widget_container)
+            actions_layout_hbox.setContentsMargins(5,2,5,2) 
+            actions_layout_hbox.setSpacing(5) 
+            
+            edit_btn = QPushButton()
+            edit_btn.setIcon(QIcon("resources/icons/edit.png")) # Replace with your actual icon path
+            edit_btn.setToolTip(f"Edit details for user: {username}")
+            edit_btn.setFixedSize(28, 28) 
+            edit_btn.clicked.connect(lambda checked=False, uid_to_edit=user_id: self.edit_user(uid_to_edit)) 
+            actions_layout_hbox.addWidget(edit_btn)
+            
+            allow_delete = True
+            if user_id == self.user['user_id']:
+                allow_delete = False
+            if role == "Admin" and self.user['role'] != "Admin":
+                allow_delete = False
+            
+            if allow_delete:
+                delete_btn = QPushButton()
+                delete_btn.setIcon(QIcon("resources/icons/delete.png")) # Replace with your actual icon path
+                delete_btn.setToolTip(f"Delete user: {username}")
+                delete_btn.setFixedSize(28, 28)
+                delete_btn.clicked.connect(lambda checked=False, uid=user_id, uname=username: \
+                                           self.delete_user(uid, uname)) 
+                actions_layout_hbox.addWidget(delete_btn)
+            
+            actions_layout_hbox.addStretch() 
+            self.users_table.setCellWidget(row_idx, 5, actions_widget_container)
+    
+    def users_loaded(self, total):
+        """Re-enable sorting and apply the filters once every user has arrived."""
+        self.users_table.setSortingEnabled(True)
+        self.filter_users() 
+    
+    def users_load_failed(self, message):
+        """Report a failed background load of the user list."""
+        self.users_table.setSortingEnabled(True)
+        QMessageBox.critical(self, "Error Loading Users", 
+                             f"An unexpected error occurred while loading the user list: {message}")
     
     def filter_users(self): 
         """Filter the visibility of rows in the users table based on current filter settings."""
@@ -1,6 +1,205 @@
 from database.db_connector import DatabaseConnection
+from database.offline_store import get_offline_store
+from database.audit_partitions import load_manifest, read_audit_archive
+from database.schema import AUDIT_SEARCH_VECTOR
+import atexit
 import logging
-from datetime import datetime
+import os
+import queue
+import re
+import threading
+import time
+import psycopg2.extras
+from configparser import ConfigParser
+from datetime import datetime, timedelta
+
+_sink = None
+_sink_lock = threading.Lock()
+
+
+class AuditSink:
+    """
+    Writes audit entries from a background thread in multi-row batches
+    
+    log() only appends to an in-memory queue, so callers never wait on the
+    database. The writer thread flushes every flush_interval_ms or as soon as
+    batch_size entries are waiting, with one INSERT per batch. A batch the
+    server rejects (e.g. while offline) is spilled to the local offline store
+    and written later, and close() drains the queue before the application
+    exits, so entries are never dropped.
+    """
+    
+    COLUMNS = "(user_id, action_type, table_affected, record_id, action_details, ip_address, timestamp)"
+    
+    def __init__(self, flush_interval_ms=500, batch_size=100, spill_retry_seconds=30):
+        self.db = DatabaseConnection()
+        self.store = get_offline_store()
+        self.flush_interval = flush_interval_ms / 1000
+        self.batch_size = batch_size
+        self.spill_retry_seconds = spill_retry_seconds
+        self.queue = queue.Queue()
+        self.closed = False
+        # The batch the writer is inserting (or retrying) right now
+        self.in_flight = None
+        self.in_flight_lock = threading.Lock()
+        # Spilled entries are retried right away, then at most every spill_retry_seconds
+        self.next_spill_retry = 0
+        self.thread = threading.Thread(target=self.run, name="audit-sink", daemon=True)
+        self.thread.start()
+    
+    def log(self, user_id, action_type, table_affected, record_id, action_details, ip_address=None):
+        """Queue an audit entry; the time of the action is taken now, not at flush"""
+        entry = [user_id, action_type, table_affected, record_id, action_details, ip_address, datetime.now()]
+        if self.closed:
+            # Too late for the writer thread; write it directly
+            self.write_or_spill([entry])
+        else:
+            self.queue.put(entry)
+    
+    def flush(self, timeout=5):
+        """Wait until everything queued so far has been written (or spilled)"""
+        done = threading.Event()
+        self.queue.put(done)
+        return done.wait(timeout)
+    
+    def close(self, timeout=10):
+        """Flush the queue and stop the writer thread"""
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join(timeout)
+        
+        # The writer did not finish in time; keep the batch it is stuck on and
+        # what it had not taken yet. Should its insert still go through before
+        # the process exits, that batch is written twice rather than lost.
+        with self.in_flight_lock:
+            leftover = list(self.in_flight or [])
+            self.in_flight = None
+        while True:
+            try:
+                item = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            if isinstance(item, list):
+                leftover.append(item)
+        if leftover:
+            logging.warning(f"Audit sink did not drain in time, spilling {len(leftover)} entries")
+            self.spill(leftover)
+    
+    def run(self):
+        """Writer thread: collect batches and write them until close()"""
+        stopping = False
+        while not stopping:
+            batch = []
+            waiters = []
+            deadline = None
+            while len(batch) < self.batch_size:
+                # Wait for the first entry, then give the batch flush_interval to fill up
+                timeout = self.flush_interval if deadline is None else deadline - time.monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                if isinstance(item, threading.Event):
+                    waiters.append(item)
+                    break
+                batch.append(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+            
+            if batch:
+                with self.in_flight_lock:
+                    self.in_flight = batch
+                self.write_or_spill(batch)
+                with self.in_flight_lock:
+                    self.in_flight = None
+            for waiter in waiters:
+                waiter.set()
+            if time.monotonic() >= self.next_spill_retry:
+                self.write_spilled()
+    
+    def write(self, entries):
+        """Insert a batch of entries with a single statement"""
+        with self.db.transaction() as cursor:
+            psycopg2.extras.execute_values(
+                cursor,
+                f"INSERT INTO audit_logs {self.COLUMNS} VALUES %s",
+                [tuple(entry) for entry in entries]
+            )
+    
+    def write_or_spill(self, entries):
+        try:
+            self.write(entries)
+        except Exception as e:
+            logging.error(f"Error writing {len(entries)} audit entries, keeping them locally: {e}")
+            self.spill(entries)
+    
+    def spill(self, entries):
+        try:
+            self.store.spill_audit_entries(entries)
+            self.next_spill_retry = time.monotonic() + self.spill_retry_seconds
+        except Exception as e:
+            # Last resort: the entries at least end up in the application log
+            logging.error(f"Error spilling audit entries: {e}")
+            for entry in entries:
+                logging.error(f"Unwritten audit entry: {entry}")
+    
+    def write_spilled(self):
+        """Move entries spilled earlier to the server, oldest first"""
+        try:
+            while True:
+                last_id, entries = self.store.get_spilled_audit_entries(self.batch_size)
+                if not entries:
+                    self.next_spill_retry = float('inf')
+                    return
+                self.write(entries)
+                self.store.delete_spilled_audit_entries(last_id)
+                logging.info(f"Wrote {len(entries)} spilled audit entries")
+        except Exception as e:
+            logging.warning(f"Spilled audit entries not written yet: {e}")
+            self.next_spill_retry = time.monotonic() + self.spill_retry_seconds
+
+
+def get_audit_config():
+    """Read the [audit] section of config.ini"""
+    config = ConfigParser()
+    config.read(os.path.join(os.path.dirname(os.path.dirname(__file__)), 'config.ini'))
+    return config
+
+
+def get_archive_dir():
+    """Get the directory holding archived audit log months"""
+    project_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    archive_dir = get_audit_config().get('audit', 'archive_dir', fallback='archives/audit_logs')
+    # Relative paths are taken from the project directory, like config.ini itself
+    return os.path.join(project_dir, archive_dir)
+
+
+def get_audit_sink():
+    """Get the application-wide audit sink, configured from [audit] in config.ini"""
+    global _sink
+    with _sink_lock:
+        if _sink is None:
+            config = get_audit_config()
+            _sink = AuditSink(
+                config.getint('audit', 'flush_interval_ms', fallback=500),
+                config.getint('audit', 'batch_size', fallback=100)
+            )
+            atexit.register(_sink.close)
+        return _sink
+
+
+def close_audit_sink():
+    """Write out every queued audit entry; call before the connection pool closes"""
+    if _sink is not None:
+        _sink.close()
+
 
 class AuditTrail:
     """Utility class for audit trail operations"""
@@ -20,25 +219,13 @@ class AuditTrail:
         - action_details: Details of the action
         - ip_address: Optional IP address of the user
         
-        Returns:
-        - int: ID of the created log entry
+        The entry is queued on the audit sink and written in the background.
         """
         try:
-            query = """
-                INSERT INTO audit_logs 
-                (user_id, action_type, table_affected, record_id, action_details, ip_address)
-                VALUES (%s, %s, %s, %s, %s, %s)
-                RETURNING log_id
-            """
-            return self.db.execute_query(
-                query, 
-                (user_id, action_type, table_affected, record_id, action_details, ip_address),
-                fetchone=True
-            )[0]
+            get_audit_sink().log(user_id, action_type, table_affected, record_id, action_details, ip_address)
         except Exception as e:
             logging.error(f"Error logging activity: {e}")
             # Don't raise the exception, just log it
-            return None
     
     def get_audit_logs(self, filters=None, limit=100, offset=0):
         """
@@ -53,41 +240,18 @@ class AuditTrail:
         - list: List of audit log records
         """
         try:
-            query = """
+            conditions, params = self.build_filter_conditions(filters)
+            query = f"""
                 SELECT l.log_id, l.timestamp, l.action_type, l.table_affected, 
                        l.record_id, l.action_details, l.ip_address,
                        u.username, u.full_name
                 FROM audit_logs l
                 JOIN users u ON l.user_id = u.user_id
-                WHERE 1=1
+                WHERE {conditions}
+                ORDER BY l.timestamp DESC, l.log_id DESC
+                LIMIT %s OFFSET %s
             """
             
-            params = []
-            
-            if filters:
-                if 'user_id' in filters and filters['user_id']:
-                    query += " AND l.user_id = %s"
-                    params.append(filters['user_id'])
-                
-                if 'action_type' in filters and filters['action_type']:
-                    query += " AND l.action_type = %s"
-                    params.append(filters['action_type'])
-                
-                if 'table_affected' in filters and filters['table_affected']:
-                    query += " AND l.table_affected = %s"
-                    params.append(filters['table_affected'])
-                
-                if 'date_from' in filters and filters['date_from']:
-                    query += " AND l.timestamp::date >= %s"
-                    params.append(filters['date_from'])
-                
-                if 'date_to' in filters and filters['date_to']:
-                    query += " AND l.timestamp::date <= %s"
-                    params.append(filters['date_to'])
-            
-            query += " ORDER BY l.timestamp DESC"
-            query += " LIMIT %s OFFSET %s"
-            
             params.extend([limit, offset])
             
             return self.db.execute_query(query, params, fetchall=True)
@@ -96,6 +260,203 @@ class AuditTrail:
             logging.error(f"Error getting audit logs: {e}")
             raise
     
+    def get_audit_logs_page(self, filters=None, after=None, limit=100):
+        """
+        Get one page of audit logs, newest first, using keyset pagination
+        
+        Parameters:
+        - filters: Same filters as get_audit_logs
+        - after: (timestamp, log_id) of the last row of the previous page
+        - limit: Maximum number of logs to return
+        
+        Returns:
+        - list: List of audit log records
+        """
+        try:
+            conditions, params = self.build_filter_conditions(filters)
+            
+            # Each page is an index range scan, however deep the user scrolls
+            if after:
+                conditions += " AND (l.timestamp, l.log_id) < (%s, %s)"
+                params.extend(after)
+            
+            query = f"""
+                SELECT l.log_id, l.timestamp, l.action_type, l.table_affected, 
+                       l.record_id, l.action_details, l.ip_address,
+                       u.username, u.full_name
+                FROM audit_logs l
+                JOIN users u ON l.user_id = u.user_id
+                WHERE {conditions}
+                ORDER BY l.timestamp DESC, l.log_id DESC
+                LIMIT %s
+            """
+            params.append(limit)
+            
+            return self.db.execute_query(query, params, fetchall=True)
+            
+        except Exception as e:
+            logging.error(f"Error getting audit logs page: {e}")
+            raise
+    
+    def search_audit_logs(self, text, filters=None, after=None, limit=100):
+        """
+        Get one page of audit logs whose details match a free-text search
+        
+        Every word of the text must appear in action_details, as a word or the
+        start of one, so partial invoice numbers and product names match. Matches
+        come best first, then newest first, and are paged by keyset like
+        get_audit_logs_page; the GIN index on action_details finds them.
+        
+        Parameters:
+        - text: Words to search for
+        - filters: Same filters as get_audit_logs
+        - after: (rank, timestamp, log_id) of the last row of the previous page
+        - limit: Maximum number of logs to return
+        
+        Returns:
+        - list: List of audit log records, each followed by its rank
+        """
+        words = re.findall(r"\w+", text or "")
+        if not words:
+            return []
+        
+        try:
+            conditions, params = self.build_filter_conditions(filters)
+            rank = f"ts_rank({AUDIT_SEARCH_VECTOR}, q.query)::float8"
+            
+            if after:
+                conditions += f" AND ({rank}, l.timestamp, l.log_id) < (%s, %s, %s)"
+                params.extend(after)
+            
+            query = f"""
+                SELECT l.log_id, l.timestamp, l.action_type, l.table_affected, 
+                       l.record_id, l.action_details, l.ip_address,
+                       u.username, u.full_name, {rank} AS rank
+                FROM audit_logs l
+                JOIN users u ON l.user_id = u.user_id
+                CROSS JOIN to_tsquery('simple', %s) AS q(query)
+                WHERE {AUDIT_SEARCH_VECTOR} @@ q.query AND {conditions}
+                ORDER BY rank DESC, l.timestamp DESC, l.log_id DESC
+                LIMIT %s
+            """
+            # Prefix match on every word; \w+ leaves nothing tsquery would parse as syntax
+            tsquery = " & ".join(f"{word.lower()}:*" for word in words)
+            params = [tsquery] + params + [limit]
+            
+            return self.db.execute_query(query, params, fetchall=True)
+            
+        except Exception as e:
+            logging.error(f"Error searching audit logs: {e}")
+            raise
+    
+    def get_filter_dimensions(self):
+        """
+        Get the values the audit log filters can take
+        
+        Reads the audit_log_dimensions lookup table, which a trigger keeps in
+        step with audit_logs, so the cost depends on the number of distinct
+        values rather than the size of the log.
+        
+        Returns:
+        - dict: users (list of (user_id, username)), action_types and tables (lists of str)
+        """
+        try:
+            users = self.db.execute_query("""
+                SELECT u.user_id, u.username
+                FROM audit_log_dimensions d
+                JOIN users u ON u.user_id = d.value::integer
+                WHERE d.dimension = 'user'
+                ORDER BY u.username
+            """, fetchall=True)
+            
+            values = self.db.execute_query("""
+                SELECT dimension, value
+                FROM audit_log_dimensions
+                WHERE dimension IN ('action_type', 'table_affected')
+                ORDER BY dimension, value
+            """, fetchall=True)
+            
+            return {
+                'users': users,
+                'action_types': [value for dimension, value in values if dimension == 'action_type'],
+                'tables': [value for dimension, value in values if dimension == 'table_affected']
+            }
+        except Exception as e:
+            logging.error(f"Error getting audit filter values: {e}")
+            raise
+    
+    def get_archived_months(self):
+        """
+        Get the months that were archived out of the database
+        
+        Returns:
+        - list: manifest entries (month, file, rows, sha256, archived_at), newest first
+        """
+        try:
+            return sorted(load_manifest(get_archive_dir()), key=lambda e: e['month'], reverse=True)
+        except Exception as e:
+            logging.error(f"Error reading audit archive manifest: {e}")
+            return []
+    
+    def get_archived_logs(self, month, filters=None):
+        """
+        Get the audit logs of an archived month
+        
+        Parameters:
+        - month: 'YYYY-MM' as returned by get_archived_months
+        - filters: Optional user_id, action_type and table_affected filters
+        
+        Returns:
+        - list: List of audit log records, newest first
+        """
+        try:
+            return read_audit_archive(get_archive_dir(), month, filters)
+        except Exception as e:
+            logging.error(f"Error reading archived audit logs for {month}: {e}")
+            raise
+    
+    def build_filter_conditions(self, filters):
+        """
+        Build the WHERE conditions for the audit log filters
+        
+        Dates are compared as a half-open timestamp range rather than
+        timestamp::date, so the (timestamp, log_id) indexes can be used.
+        
+        Returns:
+        - tuple: (SQL conditions, list of parameters)
+        """
+        conditions = ["TRUE"]
+        params = []
+        filters = filters or {}
+        
+        if filters.get('user_id'):
+            conditions.append("l.user_id = %s")
+            params.append(filters['user_id'])
+        
+        if filters.get('action_type'):
+            conditions.append("l.action_type = %s")
+            params.append(filters['action_type'])
+        
+        if filters.get('table_affected'):
+            conditions.append("l.table_affected = %s")
+            params.append(filters['table_affected'])
+        
+        if filters.get('date_from'):
+            conditions.append("l.timestamp >= %s")
+            params.append(self.as_date(filters['date_from']))
+        
+        if filters.get('date_to'):
+            conditions.append("l.timestamp < %s")
+            params.append(self.as_date(filters['date_to']) + timedelta(days=1))
+        
+        return " AND ".join(conditions), params
+    
+    def as_date(self, value):
+        """Accept a date or a 'YYYY-MM-DD' string"""
+        if isinstance(value, str):
+            return datetime.strptime(value, "%Y-%m-%d").date()
+        return value
+    
     def get_user_activity(self, user_id, limit=50):
         """
         Get recent activity for a specific user
@@ -1,7 +1,10 @@
 import hashlib
 import os
 import logging
+import psycopg2
 from database.db_connector import DatabaseConnection
+from database.offline_store import get_offline_store
+from utils.audit import get_audit_sink
 
 class Authentication:
     """Handles user authentication and password management"""
@@ -55,29 +58,63 @@ class Authentication:
          self.log_activity(user[0], "login", "users", user[0], "User logged in")
         
         # Return user info (excluding password)
-         return {
+         user_info = {
             'user_id': user[0],
             'username': user[1],
             'role': user[3],
             'full_name': user[4]
         }
+         
+        # Remember the login so it also works while the server is unreachable
+         try:
+            get_offline_store().remember_user(user_info, password)
+         except Exception as e:
+            logging.error(f"Error caching credentials for offline login: {e}")
+         
+         return user_info
             
+        except psycopg2.OperationalError as e:
+         logging.warning(f"Database unreachable during login, using cached credentials: {e}")
+         return self.login_offline(username, password)
         except Exception as e:
          logging.error(f"Error during login: {e}")
          return None
     
+    def login_offline(self, username, password):
+        """Authenticate against the credentials cached by earlier online logins"""
+        try:
+            user = get_offline_store().verify_user(username, password)
+            if not user:
+                logging.warning(f"Failed offline login attempt for user: {username}")
+            return user
+        except Exception as e:
+            logging.error(f"Error during offline login: {e}")
+            return None
+    
     def log_activity(self, user_id, action_type, table_affected, record_id, details):
-        """Log user activity to the audit_logs table"""
+        """Log user activity to the audit_logs table (queued, written in the background)"""
         try:
-            query = """
-                INSERT INTO audit_logs 
-                (user_id, action_type, table_affected, record_id, action_details)
-                VALUES (%s, %s, %s, %s, %s)
-            """
-            self.db.execute_query(query, (user_id, action_type, table_affected, record_id, details))
+            get_audit_sink().log(user_id, action_type, table_affected, record_id, details)
         except Exception as e:
             logging.error(f"Error logging activity: {e}")
     
+    # Roles allowed to perform restricted actions
+    PERMISSIONS = {
+        'cancel_transaction': ('Admin', 'Pharmacist'),
+    }
+    
+    def check_permission(self, user_id, permission):
+        """Check whether an active user's role grants a restricted action"""
+        try:
+            query = "SELECT role FROM users WHERE user_id = %s AND is_active = TRUE"
+            result = self.db.execute_query(query, (user_id,), fetchone=True)
+            if not result:
+                return False
+            return result[0] in self.PERMISSIONS.get(permission, ())
+        except Exception as e:
+            logging.error(f"Error checking permission {permission}: {e}")
+            return False
+    
     def create_initial_admin(self):
      """Create initial admin user if no users exist"""
      try:
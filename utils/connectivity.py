@@ -0,0 +1,140 @@
+"""
+Database connectivity monitor for offline mode.
+
+While the application is offline a QTimer probes PostgreSQL in the
+background. Once the probe succeeds, the sales journaled offline are
+replayed, also in the background, before the monitor reports the
+application online again. Widgets follow the state through online_changed.
+
+Sales the server refuses are quarantined by the replay and reported, so
+they can't hold the rest back. If the replay itself keeps failing while the
+server answers, the monitor goes online anyway after MAX_REPLAY_FAILURES
+tries, reports the stuck sales through replay_stuck and keeps retrying
+them in the background.
+"""
+import logging
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from database.db_connector import DatabaseConnection
+from database.models import SaleModel
+from database.offline_store import get_offline_store
+from utils.loader import DataLoader
+
+MAX_REPLAY_FAILURES = 3
+
+_monitor = None
+
+
+class ConnectivityMonitor(QObject):
+    """Tracks whether the database is reachable and drains the offline journal"""
+    online_changed = pyqtSignal(bool)
+    # Sales replayed, stock conflict dicts, quarantined sale dicts
+    replay_finished = pyqtSignal(int, list, list)
+    # Sales still waiting, error of the last replay
+    replay_stuck = pyqtSignal(int, str)
+
+    def __init__(self, online=True, interval_ms=15000, parent=None):
+        super().__init__(parent)
+        self.online = online
+        self.store = get_offline_store()
+        self.replay_result = None
+        self.replay_failures = 0
+
+        self.probe_loader = DataLoader(self)
+        self.probe_loader.load_finished.connect(self.probe_succeeded)
+        self.probe_loader.load_failed.connect(self.probe_failed)
+
+        self.replay_loader = DataLoader(self)
+        self.replay_loader.rows_loaded.connect(self.store_replay_result)
+        self.replay_loader.load_finished.connect(self.replay_done)
+        self.replay_loader.load_failed.connect(self.replay_failed)
+
+        self.timer = QTimer(self)
+        self.timer.setInterval(interval_ms)
+        self.timer.timeout.connect(self.check)
+        # Sales refused in an earlier session get another try, the data may have been fixed
+        self.store.release_failed_sales()
+        if not online:
+            self.timer.start()
+        elif self.store.get_pending_count():
+            # Sales journaled in an earlier offline session are still waiting
+            QTimer.singleShot(0, self.check)
+
+    def go_offline(self, reason=""):
+        """Switch to offline mode, e.g. after a checkout lost its connection"""
+        if not self.online:
+            return
+        logging.warning(f"Database unreachable, switching to offline mode: {reason}")
+        self.online = False
+        self.timer.start()
+        self.online_changed.emit(False)
+
+    def check(self):
+        """Probe the database unless a probe or replay is still running"""
+        if self.probe_loader.busy or self.replay_loader.busy:
+            return
+        self.probe_loader.load_function(self.probe)
+
+    def probe(self):
+        """Run on a loader thread; raises while the server is unreachable"""
+        DatabaseConnection().execute_query("SELECT 1", fetchone=True)
+        return []
+
+    def probe_succeeded(self, total):
+        logging.info("Database reachable again, replaying offline sales")
+        self.replay_result = None
+        self.replay_loader.load_function(self.replay)
+
+    def probe_failed(self, message):
+        # Still offline; the timer tries again
+        pass
+
+    def replay(self):
+        """Run on a loader thread; returns one row holding the replay result"""
+        return [self.store.replay_pending(SaleModel())]
+
+    def store_replay_result(self, rows):
+        self.replay_result = rows[0]
+
+    def replay_done(self, total):
+        replayed, conflicts, quarantined = self.replay_result or (0, [], [])
+        self.replay_failures = 0
+        self.timer.stop()
+        if not self.online:
+            self.online = True
+            self.online_changed.emit(True)
+        self.replay_finished.emit(replayed, conflicts, quarantined)
+
+    def replay_failed(self, message):
+        # Sales that were not marked replayed stay in the journal for the next try
+        logging.error(f"Offline sales replay failed: {message}")
+        self.replay_failures += 1
+        if not self.timer.isActive():
+            # A replay started online (journal left from an earlier session) retries on the timer too
+            self.timer.start()
+        if self.replay_failures < MAX_REPLAY_FAILURES:
+            return
+
+        # The server answers but won't take the journal; sell online meanwhile
+        # and keep retrying on the timer, which stays running
+        if not self.online:
+            logging.warning(f"Going online with offline sales still unsent after "
+                            f"{self.replay_failures} failed replays")
+            self.online = True
+            self.online_changed.emit(True)
+        if self.replay_failures == MAX_REPLAY_FAILURES:
+            self.replay_stuck.emit(self.store.get_pending_count(), message)
+
+
+def install_connectivity_monitor(online, interval_ms=15000, parent=None):
+    """Create the application-wide connectivity monitor"""
+    global _monitor
+    if _monitor is None:
+        _monitor = ConnectivityMonitor(online, interval_ms, parent)
+    return _monitor
+
+
+def get_connectivity_monitor():
+    """Get the connectivity monitor, creating an online one if none was installed"""
+    return install_connectivity_monitor(True)
@@ -0,0 +1,253 @@
+"""
+Background data loading for table widgets.
+
+Queries run on QThreadPool workers and their rows are handed back to the UI
+thread in chunks through Qt signals, so widgets never block on the network.
+Starting a new load on a DataLoader cancels the request it supersedes (the
+running statement is cancelled on the server as well), which keeps quickly
+changing filters from piling up queries.
+"""
+import logging
+import threading
+import weakref
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+from PyQt5.QtWidgets import QProgressBar
+
+from database.db_connector import DatabaseConnection
+
+DEFAULT_CHUNK_SIZE = 200
+
+# Tokens of every request still in flight, used to cancel them all on exit
+_active_tokens = weakref.WeakSet()
+
+
+class CancelToken:
+    """Cancellation state shared between a DataLoader and its worker"""
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._connection = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def attach(self, connection):
+        """Remember the connection the worker is using so it can be cancelled"""
+        with self._lock:
+            self._connection = connection
+        # A cancel that raced the attach still has to reach the server
+        if self.cancelled:
+            self._cancel_statement()
+
+    def detach(self):
+        with self._lock:
+            self._connection = None
+
+    def cancel(self):
+        """Mark the request as superseded and abort its running statement"""
+        self._event.set()
+        self._cancel_statement()
+
+    def _cancel_statement(self):
+        with self._lock:
+            if self._connection is not None:
+                try:
+                    self._connection.cancel()
+                except Exception as e:
+                    logging.error(f"Error cancelling background query: {e}")
+
+
+class LoaderSignals(QObject):
+    """Signals emitted by a worker; every signal carries its request generation"""
+    chunk = pyqtSignal(int, list)
+    finished = pyqtSignal(int, int)
+    error = pyqtSignal(int, str)
+
+
+class LoaderTask(QRunnable):
+    """
+    Worker that fetches rows for one load request.
+
+    Either `execute` (a callable that runs its statements on a cursor, leaving
+    the rows to stream on it) or `fetch_function` (a callable that returns the
+    rows itself) must be given. Exactly one of finished/error is always
+    emitted, even for cancelled requests, so the owner can release the signals.
+    """
+
+    def __init__(self, generation, signals, token, execute=None,
+                 fetch_function=None, args=(), chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__()
+        self.generation = generation
+        self.signals = signals
+        self.token = token
+        self.execute = execute
+        self.fetch_function = fetch_function
+        self.args = args
+        self.chunk_size = chunk_size
+        self.total = 0
+
+    def run(self):
+        try:
+            if not self.token.cancelled:
+                if self.execute is not None:
+                    self.stream_cursor()
+                else:
+                    self.stream_list(self.fetch_function(*self.args) or [])
+            self.signals.finished.emit(self.generation, self.total)
+        except Exception as e:
+            if self.token.cancelled:
+                # Cancelling the statement surfaces here as a QueryCanceled error
+                self.signals.finished.emit(self.generation, self.total)
+            else:
+                logging.error(f"Background load failed: {e}")
+                self.signals.error.emit(self.generation, str(e))
+
+    def stream_cursor(self):
+        """Run the statement and emit its rows in chunks"""
+        db = DatabaseConnection()
+        connection = db.get_connection()
+        cursor = None
+        self.token.attach(connection)
+        try:
+            cursor = connection.cursor()
+            self.execute(cursor)
+            while not self.token.cancelled:
+                rows = cursor.fetchmany(self.chunk_size)
+                if not rows:
+                    break
+                self.total += len(rows)
+                self.signals.chunk.emit(self.generation, list(rows))
+        finally:
+            self.token.detach()
+            if cursor:
+                cursor.close()
+            try:
+                # Loads are read-only; end the transaction before pooling
+                connection.rollback()
+            except Exception:
+                pass
+            db.release_connection(connection)
+
+    def stream_list(self, rows):
+        """Emit an already fetched result list in chunks"""
+        rows = list(rows)
+        for start in range(0, len(rows), self.chunk_size):
+            if self.token.cancelled:
+                break
+            chunk = rows[start:start + self.chunk_size]
+            self.total += len(chunk)
+            self.signals.chunk.emit(self.generation, chunk)
+
+
+class DataLoader(QObject):
+    """
+    Runs load requests for one widget on the global thread pool.
+
+    Only the latest request is delivered: starting a new one cancels the
+    previous request and any late signals from it are ignored.
+    """
+    rows_loaded = pyqtSignal(list)
+    load_finished = pyqtSignal(int)
+    load_failed = pyqtSignal(str)
+    busy_changed = pyqtSignal(bool)
+
+    def __init__(self, parent=None, chunk_size=DEFAULT_CHUNK_SIZE):
+        super().__init__(parent)
+        self.chunk_size = chunk_size
+        self.pool = QThreadPool.globalInstance()
+        self.generation = 0
+        self.token = None
+        self.busy = False
+        # Signal holders of requests still running, released when they report back
+        self.pending_signals = {}
+
+    def load_query(self, query, params=None):
+        """Run a single SQL query in the background"""
+        self.load_cursor(lambda cursor: cursor.execute(query, params))
+
+    def load_cursor(self, execute):
+        """Run `execute(cursor)` in the background and stream the rows it leaves"""
+        self.start_task(execute=execute)
+
+    def load_function(self, fetch_function, *args):
+        """Call a function returning a list of rows in the background"""
+        self.start_task(fetch_function=fetch_function, args=args)
+
+    def start_task(self, **task_kwargs):
+        self.cancel_pending()
+        self.generation += 1
+        self.token = CancelToken()
+        _active_tokens.add(self.token)
+
+        signals = LoaderSignals()
+        signals.chunk.connect(self.on_chunk)
+        signals.finished.connect(self.on_finished)
+        signals.error.connect(self.on_error)
+        self.pending_signals[self.generation] = signals
+
+        task = LoaderTask(self.generation, signals, self.token,
+                          chunk_size=self.chunk_size, **task_kwargs)
+        self.set_busy(True)
+        self.pool.start(task)
+
+    def cancel_pending(self):
+        """Cancel the in-flight request, if any"""
+        if self.token is not None:
+            self.token.cancel()
+            self.token = None
+
+    def cancel(self):
+        """Cancel the in-flight request and clear the busy state"""
+        self.cancel_pending()
+        self.set_busy(False)
+
+    def is_current(self, generation):
+        return generation == self.generation and self.token is not None
+
+    def on_chunk(self, generation, rows):
+        if self.is_current(generation):
+            self.rows_loaded.emit(rows)
+
+    def on_finished(self, generation, total):
+        self.pending_signals.pop(generation, None)
+        if self.is_current(generation):
+            self.token = None
+            self.set_busy(False)
+            self.load_finished.emit(total)
+
+    def on_error(self, generation, message):
+        self.pending_signals.pop(generation, None)
+        if self.is_current(generation):
+            self.token = None
+            self.set_busy(False)
+            self.load_failed.emit(message)
+
+    def set_busy(self, busy):
+        if busy != self.busy:
+            self.busy = busy
+            self.busy_changed.emit(busy)
+
+
+class BusyIndicator(QProgressBar):
+    """Indeterminate progress bar shown while a DataLoader is working"""
+
+    def __init__(self, parent=None, text="Loading..."):
+        super().__init__(parent)
+        self.setRange(0, 0)
+        self.setTextVisible(True)
+        self.setFormat(text)
+        self.setMaximumHeight(14)
+        self.setVisible(False)
+
+    def attach(self, loader):
+        loader.busy_changed.connect(self.setVisible)
+
+
+def cancel_all_loaders(wait_msecs=2000):
+    """Cancel every in-flight load and wait briefly for the workers to exit"""
+    for token in list(_active_tokens):
+        token.cancel()
+    QThreadPool.globalInstance().waitForDone(wait_msecs)
@@ -0,0 +1,131 @@
+"""
+Background listener for stock alert notifications.
+
+A plain Python thread keeps its own connection (outside the pool) LISTENing
+on the stock_alerts channel and re-emits every notification as a Qt signal,
+so widgets learn about low stock and expiring products as they happen
+instead of polling products. The connection is reopened after a failure;
+alerts sent while it was down are not replayed, so `listening` is emitted on
+every (re)connect for the owner to recount. The daily expiry check runs at
+start and then hourly, on a loader thread.
+
+The same connection listens for changes to closed days of sales made on
+other terminals, and drops the cached reports covering them; on every
+(re)connect the whole report cache is dropped, since some may have been missed.
+"""
+import json
+import logging
+import select
+import threading
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from database.db_connector import DatabaseConnection
+from database.report_cache import INVALIDATION_CHANNEL, get_report_cache, sales_changed_elsewhere
+from database.stock_alerts import STOCK_ALERT_CHANNEL, run_daily_expiry_check
+from utils.loader import DataLoader
+
+POLL_SECONDS = 1.0
+RECONNECT_SECONDS = 15
+DAILY_CHECK_INTERVAL_MS = 60 * 60 * 1000
+
+_listener = None
+
+
+class StockAlertListener(QObject):
+    """Turns stock_alerts notifications into Qt signals"""
+    # Decoded notification payload
+    alert_received = pyqtSignal(dict)
+    listening = pyqtSignal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self.listen, name="stock-alert-listener", daemon=True)
+
+        self.check_loader = DataLoader(self)
+        self.check_loader.load_failed.connect(self.daily_check_failed)
+        self.check_timer = QTimer(self)
+        self.check_timer.setInterval(DAILY_CHECK_INTERVAL_MS)
+        self.check_timer.timeout.connect(self.run_daily_check)
+
+    def start(self):
+        self.thread.start()
+        self.check_timer.start()
+        QTimer.singleShot(0, self.run_daily_check)
+
+    def stop(self):
+        self.stop_event.set()
+        self.check_timer.stop()
+        self.thread.join(timeout=POLL_SECONDS * 2)
+
+    def run_daily_check(self):
+        """Notify products that entered the expiry window today; a no-op once done for the day"""
+        if not self.check_loader.busy:
+            self.check_loader.load_function(self.daily_check)
+
+    def daily_check(self):
+        """Run on a loader thread; returns no rows"""
+        run_daily_expiry_check(DatabaseConnection())
+        return []
+
+    def daily_check_failed(self, message):
+        # The hourly timer tries again
+        logging.error(f"Daily expiry check failed: {message}")
+
+    def listen(self):
+        """Run on the listener thread until stop()"""
+        while not self.stop_event.is_set():
+            connection = None
+            try:
+                connection = DatabaseConnection().create_connection()
+                connection.autocommit = True
+                with connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {STOCK_ALERT_CHANNEL}")
+                    cursor.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+                # Changes made while nobody was listening are unknown
+                get_report_cache().clear()
+                self.listening.emit()
+
+                while not self.stop_event.is_set():
+                    if select.select([connection], [], [], POLL_SECONDS) == ([], [], []):
+                        continue
+                    connection.poll()
+                    while connection.notifies:
+                        notify = connection.notifies.pop(0)
+                        if notify.channel == INVALIDATION_CHANNEL:
+                            sales_changed_elsewhere(notify.payload)
+                        else:
+                            self.deliver(notify.payload)
+            except Exception as e:
+                logging.error(f"Stock alert listener disconnected: {e}")
+                self.stop_event.wait(RECONNECT_SECONDS)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.close()
+                    except Exception:
+                        pass
+
+    def deliver(self, payload):
+        try:
+            self.alert_received.emit(json.loads(payload))
+        except ValueError:
+            logging.error(f"Ignoring malformed stock alert: {payload}")
+
+
+def start_stock_alert_listener():
+    """Start the application-wide stock alert listener; it outlives the windows using it"""
+    global _listener
+    if _listener is None:
+        _listener = StockAlertListener()
+        _listener.start()
+    return _listener
+
+
+def stop_stock_alert_listener():
+    """Stop the listener, e.g. before the connection pool is closed"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,212 @@
+"""
+UI stall watchdog.
+
+A QTimer heartbeat runs on the Qt event loop while a plain Python thread
+watches it. When a beat is late by more than the configured threshold, the
+watchdog thread grabs the UI thread's Python stack with sys._current_frames()
+so we can see what was blocking the loop. Once the loop recovers the stall is
+written, with its duration and context, to logs/ui_stalls_YYYYMMDD.log and
+added to per-handler totals shown in the UI Stall Report.
+"""
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from PyQt5.QtCore import QObject, QTimer
+from PyQt5.QtWidgets import QApplication
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_watchdog = None
+
+
+class StallWatchdog(QObject):
+    """Detects event-loop stalls and records where the UI thread was stuck"""
+
+    def __init__(self, threshold_ms=200, interval_ms=50, parent=None):
+        super().__init__(parent)
+        self.threshold_ms = threshold_ms
+        self.interval_ms = interval_ms
+        self.ui_thread_id = threading.get_ident()
+
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.last_beat = time.monotonic()
+        self.captured_stack = None
+        # handler -> {'count', 'total_ms', 'worst_ms', 'worst_stack', 'last_seen'}
+        self.stats = {}
+
+        self.logger = self.create_stall_logger()
+
+        self.heartbeat = QTimer(self)
+        self.heartbeat.setInterval(interval_ms)
+        self.heartbeat.timeout.connect(self.beat)
+        self.thread = threading.Thread(target=self.watch, name="ui-stall-watchdog", daemon=True)
+
+    def create_stall_logger(self):
+        """Set up the dedicated stall log file"""
+        if not os.path.exists('logs'):
+            os.makedirs('logs')
+
+        logger = logging.getLogger('ui_stalls')
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        if not logger.handlers:
+            log_filename = f"logs/ui_stalls_{datetime.now().strftime('%Y%m%d')}.log"
+            file_handler = logging.FileHandler(log_filename)
+            file_handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+            logger.addHandler(file_handler)
+        return logger
+
+    def start(self):
+        """Start the heartbeat and the watching thread"""
+        self.last_beat = time.monotonic()
+        self.heartbeat.start()
+        self.thread.start()
+        logging.info(f"UI stall watchdog started (threshold {self.threshold_ms} ms)")
+
+    def stop(self):
+        """Stop watching and write the session summary to the stall log"""
+        self.stop_event.set()
+        self.heartbeat.stop()
+        summary = self.get_summary()
+        if summary:
+            self.logger.info("Session summary (worst offenders by total stall time):")
+            for row in summary:
+                self.logger.info(
+                    f"  {row['handler']}: {row['count']} stalls, "
+                    f"total {row['total_ms']:.0f} ms, worst {row['worst_ms']:.0f} ms"
+                )
+
+    def beat(self):
+        """Heartbeat tick on the UI thread; records the stall that just ended, if any"""
+        now = time.monotonic()
+        with self.lock:
+            gap_ms = (now - self.last_beat) * 1000
+            self.last_beat = now
+            stack = self.captured_stack
+            self.captured_stack = None
+
+        late_ms = gap_ms - self.interval_ms
+        if late_ms >= self.threshold_ms:
+            self.record_stall(late_ms, stack)
+
+    def watch(self):
+        """Watchdog thread: capture the UI stack as soon as a beat is overdue"""
+        poll_seconds = max(self.threshold_ms / 4, 10) / 1000
+        while not self.stop_event.wait(poll_seconds):
+            with self.lock:
+                last_beat = self.last_beat
+                already_captured = self.captured_stack is not None
+            late_ms = (time.monotonic() - last_beat) * 1000 - self.interval_ms
+            if late_ms < self.threshold_ms or already_captured:
+                continue
+
+            frame = sys._current_frames().get(self.ui_thread_id)
+            if frame is None:
+                continue
+            stack = traceback.extract_stack(frame)
+            del frame
+
+            with self.lock:
+                # Only keep the sample if the loop is still stuck in the same stall
+                if self.last_beat == last_beat and self.captured_stack is None:
+                    self.captured_stack = stack
+
+    def record_stall(self, duration_ms, stack):
+        """Log a finished stall and add it to the per-handler totals"""
+        handler = self.find_handler(stack) if stack else "unknown (not sampled)"
+        context = self.describe_context()
+
+        entry = self.stats.setdefault(handler, {
+            'count': 0, 'total_ms': 0.0, 'worst_ms': 0.0, 'worst_stack': None, 'last_seen': None
+        })
+        entry['count'] += 1
+        entry['total_ms'] += duration_ms
+        entry['last_seen'] = datetime.now()
+        if duration_ms > entry['worst_ms']:
+            entry['worst_ms'] = duration_ms
+            entry['worst_stack'] = stack
+
+        message = f"UI stalled for {duration_ms:.0f} ms in {handler} [{context}]"
+        if stack:
+            message += "\n" + "".join(traceback.format_list(stack)).rstrip()
+        self.logger.warning(message)
+
+    @staticmethod
+    def find_handler(stack):
+        """
+        Name the application function that was running when the loop stalled.
+
+        This is the innermost frame of our own code, so a stall inside a modal
+        dialog is charged to the dialog's slot rather than to whatever opened
+        it with exec_(). main.py (app start-up and the event loop) and this
+        file are never named.
+        """
+        this_file = os.path.abspath(__file__)
+        for frame in reversed(stack):
+            filename = os.path.abspath(frame.filename)
+            if (not filename.startswith(PROJECT_ROOT) or 'site-packages' in filename
+                    or filename == this_file):
+                continue
+            module = os.path.splitext(os.path.relpath(filename, PROJECT_ROOT))[0]
+            module = module.replace(os.sep, '.')
+            if module == 'main':
+                continue
+            return f"{module}.{frame.name}"
+        return "event loop"
+
+    def describe_context(self):
+        """Describe what the user was looking at (UI thread only)"""
+        window = QApplication.activeWindow()
+        focus = QApplication.focusWidget()
+        parts = []
+        if window is not None:
+            parts.append(f"window={window.windowTitle() or type(window).__name__}")
+        if focus is not None:
+            parts.append(f"focus={type(focus).__name__}")
+        return ", ".join(parts) or "no active window"
+
+    def get_summary(self):
+        """
+        Get the stall totals ranked by total stall time
+
+        Returns:
+        - list: dicts with handler, count, total_ms, worst_ms, average_ms, worst_stack, last_seen
+        """
+        rows = []
+        for handler, entry in self.stats.items():
+            rows.append({
+                'handler': handler,
+                'count': entry['count'],
+                'total_ms': entry['total_ms'],
+                'worst_ms': entry['worst_ms'],
+                'average_ms': entry['total_ms'] / entry['count'],
+                'worst_stack': entry['worst_stack'],
+                'last_seen': entry['last_seen'],
+            })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def reset(self):
+        """Clear the collected totals"""
+        self.stats.clear()
+
+
+def install_watchdog(app, threshold_ms=200, interval_ms=50):
+    """Create and start the application-wide stall watchdog"""
+    global _watchdog
+    if _watchdog is None:
+        _watchdog = StallWatchdog(threshold_ms, interval_ms, parent=app)
+        _watchdog.start()
+        app.aboutToQuit.connect(_watchdog.stop)
+    return _watchdog
+
+
+def get_watchdog():
+    """Get the running watchdog, or None when it is disabled"""
+    return _watchdog